@@ -0,0 +1,41 @@
+from collections import namedtuple
+from typing import Dict
+
+Achievement = namedtuple('Achievement', ['id', 'code', 'category', 'template'])
+
+# id хранится в user_achievements: существующие id не менять и не переиспользовать, новые - только в конец.
+# template - текст для пользователя; переводы и правки формулировок не трогают строки пользователей.
+ACHIEVEMENT_CATALOG = [
+    Achievement(1, 'water_first_glass', 'physical', '💧 Первый стакан'),
+    Achievement(2, 'water_halfway', 'physical', '💧 Полпути к норме'),
+    Achievement(3, 'water_goal', 'physical', '💧 Норма воды выполнена'),
+    Achievement(4, 'sleep_quality', 'physical', '😴 Качественный сон 7-8 часов'),
+    Achievement(5, 'sleep_long', 'physical', '😴 Длинный здоровый сон 8-9 часов'),
+    Achievement(6, 'steps_goal', 'physical', '🏃 10000 шагов выполнены'),
+    Achievement(7, 'quick_workout', 'physical', '💪 Быстрая тренировка выполнена'),
+    Achievement(8, 'mood_great', 'mental', '😊 Отличное настроение'),
+    Achievement(9, 'mood_honest', 'mental', '😢 Честно отметил плохое настроение'),
+    Achievement(10, 'calm', 'mental', '😌 Спокойствие и умиротворение'),
+    Achievement(11, 'breathing', 'mental', '🎭 Выполнил дыхательную практику'),
+    Achievement(12, 'meditation', 'mental', '🧘 Попробовал медитацию'),
+    Achievement(13, 'mood_note', 'mental', '📝 Добавил заметку к настроению'),
+    Achievement(14, 'pomodoro', 'social', '🍅 Pomodoro сессия завершена'),
+    Achievement(15, 'habit_created', 'social', '🎯 Создал привычку'),
+    Achievement(16, 'other', 'other', '🏅 Достижение'),
+]
+
+ACHIEVEMENTS_BY_CODE: Dict[str, Achievement] = {achievement.code: achievement for achievement in ACHIEVEMENT_CATALOG}
+ACHIEVEMENTS_BY_ID: Dict[int, Achievement] = {achievement.id: achievement for achievement in ACHIEVEMENT_CATALOG}
+
+def achievement_id(code: str) -> int:
+    try:
+        return ACHIEVEMENTS_BY_CODE[code].id
+    except KeyError:
+        raise ValueError(f"Неизвестное достижение: {code}") from None
+
+def legacy_achievement_id(text: str) -> int:
+    # Старые строки из таблицы achievements: точное совпадение с шаблоном или шаблон с уточнением после ':'
+    for achievement in ACHIEVEMENT_CATALOG:
+        if text == achievement.template or text.startswith(achievement.template + ':'):
+            return achievement.id
+    return ACHIEVEMENTS_BY_CODE['other'].id
@@ -0,0 +1,183 @@
+import math
+import sqlite3
+import datetime
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NAN = float('nan')
+
+TREND_METRICS = (
+    'water', 'sleep_hours', 'sleep_quality', 'steps', 'workout_minutes',
+    'mood_score', 'pomodoro_minutes', 'meditation_minutes',
+)
+
+@dataclass
+class UserHistory:
+    # Колонки плотные: индекс i соответствует дню start + i, NaN - нет данных за день
+    start: int
+    length: int
+    columns: Dict[str, array]
+    mood_codes: array
+    moods: List[str]
+
+    def date(self, index: int) -> str:
+        return datetime.date.fromordinal(self.start + index).isoformat()
+
+def history_since(days: Optional[int]) -> str:
+    return (datetime.date.today() - datetime.timedelta(days=days - 1)).isoformat() if days else '0000-00-00'
+
+def build_history(rows: Sequence[Sequence], moods: Iterable[str], metrics: Sequence[str] = TREND_METRICS) -> UserHistory:
+    # rows - (date, *metrics) по возрастанию даты, moods - настроения по возрастанию даты
+    start = datetime.date.fromisoformat(rows[0][0]).toordinal() if rows else 0
+    length = datetime.date.fromisoformat(rows[-1][0]).toordinal() - start + 1 if rows else 0
+    columns = {metric: array('d', [NAN]) * length for metric in metrics}
+    for row in rows:
+        index = datetime.date.fromisoformat(row[0]).toordinal() - start
+        for position, metric in enumerate(metrics, 1):
+            if row[position] is not None:
+                columns[metric][index] = row[position]
+
+    vocabulary: Dict[str, int] = {}
+    codes = array('H', (vocabulary.setdefault(mood, len(vocabulary)) for mood in moods))
+    return UserHistory(start, length, columns, codes, list(vocabulary))
+
+def load_history(conn: sqlite3.Connection, user_id: int, days: Optional[int] = None,
+                 metrics: Sequence[str] = TREND_METRICS) -> UserHistory:
+    since = history_since(days)
+    rows = conn.execute(f'''
+        SELECT date, {', '.join(metrics)} FROM daily_rollup
+        WHERE user_id = ? AND date >= ?
+        ORDER BY date
+    ''', (user_id, since)).fetchall() if metrics else []
+    moods = conn.execute('''
+        SELECT mood FROM mood_tracking
+        WHERE user_id = ? AND date >= ? AND mood IS NOT NULL
+        ORDER BY date
+    ''', (user_id, since))
+    return build_history(rows, (mood for (mood,) in moods), metrics)
+
+def transition_matrix(history: UserHistory) -> List[List[int]]:
+    size = len(history.moods)
+    if len(history.mood_codes) < 2:
+        return [[0] * size for _ in range(size)]
+    if np is not None:
+        codes = np.frombuffer(history.mood_codes, dtype=np.uint16).astype(np.intp)
+        counts = np.bincount(codes[:-1] * size + codes[1:], minlength=size * size)
+        return counts.reshape(size, size).tolist()
+    pairs = Counter(zip(history.mood_codes, history.mood_codes[1:]))
+    return [[pairs.get((row, column), 0) for column in range(size)] for row in range(size)]
+
+def rolling_mean(values: array, window: int) -> List[float]:
+    # Среднее за последние window дней без учета дней без данных
+    if np is not None:
+        column = np.frombuffer(values, dtype=np.float64)
+        present = ~np.isnan(column)
+        sums = np.concatenate(([0.0], np.cumsum(np.where(present, column, 0.0))))
+        counts = np.concatenate(([0], np.cumsum(present)))
+        lagged = np.maximum(np.arange(1, len(column) + 1) - window, 0)
+        window_sums = sums[1:] - sums[lagged]
+        window_counts = counts[1:] - counts[lagged]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(window_counts > 0, window_sums / window_counts, np.nan).tolist()
+
+    result = []
+    total = 0.0
+    count = 0
+    for index, value in enumerate(values):
+        if value == value:
+            total += value
+            count += 1
+        if index >= window:
+            dropped = values[index - window]
+            if dropped == dropped:
+                total -= dropped
+                count -= 1
+        result.append(total / count if count else NAN)
+    return result
+
+def correlation(x: array, y: array) -> Optional[float]:
+    if np is not None:
+        left = np.frombuffer(x, dtype=np.float64)
+        right = np.frombuffer(y, dtype=np.float64)
+        mask = ~(np.isnan(left) | np.isnan(right))
+        if mask.sum() < 3:
+            return None
+        left, right = left[mask], right[mask]
+        if left.std() == 0 or right.std() == 0:
+            return None
+        return float(np.corrcoef(left, right)[0, 1])
+
+    pairs = [(a, b) for a, b in zip(x, y) if a == a and b == b]
+    if len(pairs) < 3:
+        return None
+    mean_x = sum(a for a, _ in pairs) / len(pairs)
+    mean_y = sum(b for _, b in pairs) / len(pairs)
+    covariance = sum((a - mean_x) * (b - mean_y) for a, b in pairs)
+    spread_x = math.sqrt(sum((a - mean_x) ** 2 for a, _ in pairs))
+    spread_y = math.sqrt(sum((b - mean_y) ** 2 for _, b in pairs))
+    if spread_x == 0 or spread_y == 0:
+        return None
+    return covariance / (spread_x * spread_y)
+
+def percentiles(values: array, quantiles: Sequence[int] = (25, 50, 75, 90)) -> Dict[int, float]:
+    if np is not None:
+        column = np.frombuffer(values, dtype=np.float64)
+        column = column[~np.isnan(column)]
+        if not len(column):
+            return {}
+        return dict(zip(quantiles, np.percentile(column, quantiles).tolist()))
+
+    column = sorted(value for value in values if value == value)
+    if not column:
+        return {}
+    result = {}
+    for quantile in quantiles:
+        rank = quantile / 100 * (len(column) - 1)
+        lower = math.floor(rank)
+        upper = min(lower + 1, len(column) - 1)
+        result[quantile] = column[lower] + (column[upper] - column[lower]) * (rank - lower)
+    return result
+
+def mood_patterns(history: UserHistory) -> Dict[str, object]:
+    matrix = transition_matrix(history)
+    transitions = {
+        f"{history.moods[row]}→{history.moods[column]}": count
+        for row, counts in enumerate(matrix)
+        for column, count in enumerate(counts)
+        if count
+    }
+    return {
+        'mood_transitions': transitions,
+        'total_records': len(history.mood_codes),
+        'moods': history.moods,
+        'transition_matrix': matrix,
+    }
+
+def trend_report(history: UserHistory, window: int = 7) -> Dict[str, object]:
+    columns = history.columns
+    report = {
+        'days': history.length,
+        'start_date': history.date(0) if history.length else None,
+        'rolling_window': window,
+        'rolling': {},
+        'percentiles': {},
+        'correlations': {},
+    }
+    for metric, values in columns.items():
+        series = rolling_mean(values, window)
+        latest = series[-1] if series else NAN
+        report['rolling'][metric] = None if latest != latest else round(latest, 2)
+        report['percentiles'][metric] = {q: round(v, 2) for q, v in percentiles(values).items()}
+    if 'mood_score' in columns:
+        for name, metric in (('sleep_mood', 'sleep_hours'), ('steps_mood', 'steps')):
+            if metric in columns:
+                value = correlation(columns[metric], columns['mood_score'])
+                report['correlations'][name] = None if value is None else round(value, 3)
+    return report
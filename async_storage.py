@@ -0,0 +1,184 @@
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+
+import storage
+from config import DB_EXECUTOR_WORKERS, DB_BULK_CHUNK_SIZE
+
+_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix='db')
+
+async def _run(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+async def _iterate(iterator: Iterator, chunk_size: int = DB_BULK_CHUNK_SIZE) -> AsyncIterator:
+    # Синхронный генератор хранилища вычитывается пачками в пуле потоков, цикл событий не блокируется
+    while True:
+        chunk = await _run(list, itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        for item in chunk:
+            yield item
+
+def shutdown_executor(wait: bool = True) -> None:
+    _executor.shutdown(wait=wait)
+
+async def ensure_user(user_id: int) -> None:
+    return await _run(storage.ensure_user, user_id)
+
+async def get_user_data(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_user_data, user_id)
+
+async def update_water(user_id: int, amount: int) -> None:
+    return await _run(storage.update_water, user_id, amount)
+
+async def update_sleep(user_id: int, hours: float, quality: int) -> None:
+    return await _run(storage.update_sleep, user_id, hours, quality)
+
+async def update_steps(user_id: int, steps: int, workout_minutes: int) -> None:
+    return await _run(storage.update_steps, user_id, steps, workout_minutes)
+
+async def set_mood(user_id: int, mood: str, emoji: str) -> None:
+    return await _run(storage.set_mood, user_id, mood, emoji)
+
+async def add_pomodoro_session(user_id: int, duration: int, session_type: str, completed: bool, task_description: str) -> int:
+    return await _run(storage.add_pomodoro_session, user_id, duration, session_type, completed, task_description)
+
+async def get_pomodoro_stats(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_pomodoro_stats, user_id)
+
+async def add_habit(user_id: int, name: str, description: str, frequency: str) -> int:
+    return await _run(storage.add_habit, user_id, name, description, frequency)
+
+async def get_habits(user_id: int) -> List[Dict[str, Any]]:
+    return await _run(storage.get_habits, user_id)
+
+async def update_habit_completion(user_id: int, habit_id: int, completed: bool) -> None:
+    return await _run(storage.update_habit_completion, user_id, habit_id, completed)
+
+async def get_habit_streaks(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_habit_streaks, user_id)
+
+async def save_goal(user_id: int, name: str, description: str, deadline: str) -> int:
+    return await _run(storage.save_goal, user_id, name, description, deadline)
+
+async def get_goals(user_id: int) -> List[Dict[str, Any]]:
+    return await _run(storage.get_goals, user_id)
+
+async def update_goal_progress(user_id: int, goal_id: int, progress: int) -> None:
+    return await _run(storage.update_goal_progress, user_id, goal_id, progress)
+
+async def get_achievements(user_id: int, limit: int = 20) -> List[str]:
+    return await _run(storage.get_achievements, user_id, limit)
+
+async def get_achievements_page(user_id: int, limit: int = 10, category: Optional[str] = None,
+                                after: Optional[Tuple[str, int]] = None) -> Dict[str, Any]:
+    return await _run(storage.get_achievements_page, user_id, limit, category, after)
+
+async def add_achievement(user_id: int, code: str) -> None:
+    return await _run(storage.add_achievement, user_id, code)
+
+async def get_water_history(user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+    return await _run(storage.get_water_history, user_id, days)
+
+async def get_sleep_history(user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+    return await _run(storage.get_sleep_history, user_id, days)
+
+async def get_activity_history(user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+    return await _run(storage.get_activity_history, user_id, days)
+
+async def get_mood_history(user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+    return await _run(storage.get_mood_history, user_id, days)
+
+async def get_daily_rollup(user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+    return await _run(storage.get_daily_rollup, user_id, days)
+
+async def get_weekly_rollup(user_id: int, weeks: int = 4) -> List[Dict[str, Any]]:
+    return await _run(storage.get_weekly_rollup, user_id, weeks)
+
+async def get_monthly_rollup(user_id: int, months: int = 6) -> List[Dict[str, Any]]:
+    return await _run(storage.get_monthly_rollup, user_id, months)
+
+async def get_mood_stats(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_mood_stats, user_id)
+
+async def get_pomodoro_history(user_id: int, days: int = 30) -> List[Dict[str, Any]]:
+    return await _run(storage.get_pomodoro_history, user_id, days)
+
+async def get_all_user_data(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_all_user_data, user_id)
+
+async def get_streak_data(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_streak_data, user_id)
+
+def iter_user_ids() -> AsyncIterator[int]:
+    return _iterate(storage.iter_user_ids())
+
+def get_user_data_many(user_ids: Iterable[int]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    return _iterate(storage.get_user_data_many(user_ids))
+
+def get_streak_data_many(user_ids: Iterable[int]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    return _iterate(storage.get_streak_data_many(user_ids))
+
+async def add_workout(user_id: int, workout_type: str, duration: int, calories: int) -> None:
+    return await _run(storage.add_workout, user_id, workout_type, duration, calories)
+
+async def get_workout_data(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_workout_data, user_id)
+
+async def add_sos_usage(user_id: int) -> None:
+    return await _run(storage.add_sos_usage, user_id)
+
+async def get_mood_patterns(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_mood_patterns, user_id)
+
+async def get_user_trends(user_id: int, days: Optional[int] = 365) -> Dict[str, Any]:
+    return await _run(storage.get_user_trends, user_id, days)
+
+async def get_mood_data(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_mood_data, user_id)
+
+async def get_sleep_data(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_sleep_data, user_id)
+
+async def get_physical_overview(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_physical_overview, user_id)
+
+async def add_mood_note(user_id: int, note: str) -> None:
+    return await _run(storage.add_mood_note, user_id, note)
+
+async def get_meditation_data(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_meditation_data, user_id)
+
+async def get_social_overview(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_social_overview, user_id)
+
+async def get_goal_progress(user_id: int, goal_id: int) -> int:
+    return await _run(storage.get_goal_progress, user_id, goal_id)
+
+async def update_habit(user_id: int, habit_id: int, **kwargs) -> None:
+    return await _run(storage.update_habit, user_id, habit_id, **kwargs)
+
+async def delete_habit(user_id: int, habit_id: int) -> None:
+    return await _run(storage.delete_habit, user_id, habit_id)
+
+async def save_pomodoro_session(user_id: int, duration: int, session_type: str, completed: bool, task_description: str, date: str) -> int:
+    return await _run(storage.save_pomodoro_session, user_id, duration, session_type, completed, task_description, date)
+
+async def save_active_pomodoro(user_id: int, state: str, deadline: Optional[float], paused_remaining: Optional[float],
+                               task: str, chat_id: int, message_id: int) -> None:
+    return await _run(storage.save_active_pomodoro, user_id, state, deadline, paused_remaining, task, chat_id, message_id)
+
+async def delete_active_pomodoro(user_id: int) -> None:
+    return await _run(storage.delete_active_pomodoro, user_id)
+
+async def get_active_pomodoros() -> List[Dict[str, Any]]:
+    return await _run(storage.get_active_pomodoros)
+
+async def complete_overdue_pomodoros(now: float, work_seconds: int, break_seconds: int) -> List[Dict[str, Any]]:
+    return await _run(storage.complete_overdue_pomodoros, now, work_seconds, break_seconds)
+
+async def get_user_overview(user_id: int) -> Dict[str, Any]:
+    return await _run(storage.get_user_overview, user_id)
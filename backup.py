@@ -0,0 +1,155 @@
+import os
+import gzip
+import time
+import shutil
+import sqlite3
+import logging
+import datetime
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+from config import BACKUP_DIR, BACKUP_PAGES_PER_STEP, BACKUP_STEP_PAUSE_MS, BACKUP_KEEP_LAST, BACKUP_KEEP_DAYS
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = '.db.gz'
+TIMESTAMP_FORMAT = '%Y%m%d-%H%M%S'
+MAX_RESTARTS = 3
+
+class _CopyRestarted(Exception):
+    pass
+
+def snapshot_prefix(db_path: str) -> str:
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+def online_copy(source_path: str, target_path: str, pages: int = BACKUP_PAGES_PER_STEP,
+                pause_ms: int = BACKUP_STEP_PAUSE_MS) -> int:
+    # Копия по pages страниц за шаг: между шагами блокировка источника отпускается,
+    # и записи бота не ждут окончания всей копии
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    state = {'remaining': None, 'restarts': 0, 'total': 0}
+
+    def progress(status: int, remaining: int, total: int) -> None:
+        if state['remaining'] is not None and remaining >= state['remaining']:
+            # Источник изменило другое соединение - SQLite начал копию заново, шаг ничего не продвинул
+            state['restarts'] += 1
+            if state['restarts'] > MAX_RESTARTS:
+                raise _CopyRestarted()
+        state['remaining'] = remaining
+        state['total'] = total
+        if remaining and pause_ms:
+            time.sleep(pause_ms / 1000)
+
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except _CopyRestarted:
+            # Слишком частые записи: копируем за один шаг (в WAL читатель не блокирует писателей)
+            logger.warning(f"Копия {source_path} перезапускалась {MAX_RESTARTS} раз, копирование одним шагом")
+            source.backup(target)
+            state['total'] = target.execute('PRAGMA page_count').fetchone()[0]
+        return state['total']
+    finally:
+        target.close()
+        source.close()
+
+def compress(raw_path: str, snapshot_path: str) -> None:
+    partial = snapshot_path + '.part'
+    with open(raw_path, 'rb') as raw, gzip.open(partial, 'wb', compresslevel=6) as packed:
+        shutil.copyfileobj(raw, packed, 1024 * 1024)
+    os.replace(partial, snapshot_path)
+
+def list_snapshots(backup_dir: str, prefix: str) -> List[Tuple[datetime.datetime, str]]:
+    # Снимки от новых к старым; время берется из имени файла
+    snapshots = []
+    if not os.path.isdir(backup_dir):
+        return snapshots
+    for name in os.listdir(backup_dir):
+        if not (name.startswith(prefix + '-') and name.endswith(SNAPSHOT_SUFFIX)):
+            continue
+        stamp = name[len(prefix) + 1:-len(SNAPSHOT_SUFFIX)]
+        try:
+            created = datetime.datetime.strptime(stamp, TIMESTAMP_FORMAT)
+        except ValueError:
+            continue
+        snapshots.append((created, os.path.join(backup_dir, name)))
+    snapshots.sort(reverse=True)
+    return snapshots
+
+def apply_retention(backup_dir: str, prefix: str, keep_last: int = BACKUP_KEEP_LAST,
+                    keep_days: int = BACKUP_KEEP_DAYS, now: Optional[datetime.datetime] = None) -> List[str]:
+    # Храним keep_last последних снимков и по одному (самому свежему) за каждый из keep_days дней
+    now = now or datetime.datetime.now()
+    horizon = (now - datetime.timedelta(days=keep_days)).date()
+    kept_days = set()
+    removed = []
+    for index, (created, path) in enumerate(list_snapshots(backup_dir, prefix)):
+        day = created.date()
+        if index < keep_last:
+            kept_days.add(day)
+            continue
+        if day > horizon and day not in kept_days:
+            kept_days.add(day)
+            continue
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            logger.warning(f"Не удалось удалить старую резервную копию {path}: {e}")
+    return removed
+
+def create_snapshot(db_path: str, backup_dir: str = BACKUP_DIR, pages: int = BACKUP_PAGES_PER_STEP,
+                    pause_ms: int = BACKUP_STEP_PAUSE_MS) -> str:
+    os.makedirs(backup_dir, exist_ok=True)
+    prefix = snapshot_prefix(db_path)
+    stamp = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+    snapshot_path = os.path.join(backup_dir, f'{prefix}-{stamp}{SNAPSHOT_SUFFIX}')
+
+    handle, raw_path = tempfile.mkstemp(prefix=f'{prefix}-', suffix='.db.tmp', dir=backup_dir)
+    os.close(handle)
+    try:
+        started = time.perf_counter()
+        page_count = online_copy(db_path, raw_path, pages, pause_ms)
+        compress(raw_path, snapshot_path)
+        logger.info(
+            f"Снимок {snapshot_path}: {page_count} страниц, "
+            f"{os.path.getsize(raw_path)} -> {os.path.getsize(snapshot_path)} байт "
+            f"за {time.perf_counter() - started:.2f} с"
+        )
+    finally:
+        os.remove(raw_path)
+
+    for path in apply_retention(backup_dir, prefix):
+        logger.info(f"Удалена устаревшая резервная копия: {path}")
+    return snapshot_path
+
+def verify_snapshot(snapshot_path: str) -> bool:
+    backup_dir = os.path.dirname(snapshot_path) or '.'
+    handle, raw_path = tempfile.mkstemp(suffix='.verify.db', dir=backup_dir)
+    try:
+        with os.fdopen(handle, 'wb') as raw, gzip.open(snapshot_path, 'rb') as packed:
+            shutil.copyfileobj(packed, raw, 1024 * 1024)
+        conn = sqlite3.connect(raw_path)
+        try:
+            result = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+        finally:
+            conn.close()
+    except (OSError, EOFError, sqlite3.DatabaseError) as e:
+        result = [str(e)]
+    finally:
+        os.remove(raw_path)
+
+    if result == ['ok']:
+        logger.info(f"Резервная копия проверена: {snapshot_path}")
+        return True
+    # Битый снимок убираем из ротации, чтобы его не взяли для восстановления
+    logger.error(f"Резервная копия {snapshot_path} повреждена: {'; '.join(result[:5])}")
+    os.replace(snapshot_path, snapshot_path + '.corrupt')
+    return False
+
+def verify_in_background(snapshot_path: str) -> threading.Thread:
+    thread = threading.Thread(target=verify_snapshot, args=(snapshot_path,), name='db-backup-verify', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import random
+import tempfile
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+HISTORY_DAYS = 7
+METHODS = [('get_user_data', 'get_user_data_many'), ('get_user_streaks', 'get_user_streaks_many')]
+
+def seed(db: DatabaseManager) -> None:
+    rnd = random.Random(0)
+    today = datetime.date.today()
+    # Одна транзакция на весь прогон: get_connection реентерабелен и фиксирует на внешнем выходе
+    with db.get_connection():
+        for user_id in range(1, USERS + 1):
+            db.ensure_user_exists(user_id)
+            for offset in range(HISTORY_DAYS):
+                day = (today - datetime.timedelta(days=offset)).isoformat()
+                db.update_water_intake(user_id, day, rnd.randrange(1, 10))
+                db.update_mood_data(user_id, day, rnd.choice(['Отлично', 'Хорошо', 'Нормально', 'Плохо']), '🙂')
+            db.add_user_achievement(user_id, 'pomodoro', today.isoformat())
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'bulk.db'), write_behind=False)
+        started = time.perf_counter()
+        seed(db)
+        print(f'{USERS} пользователей за {time.perf_counter() - started:.1f} с')
+
+        user_ids = list(db.iter_user_ids())
+        for single, bulk in METHODS:
+            started = time.perf_counter()
+            expected = [(user_id, getattr(db, single)(user_id)) for user_id in user_ids]
+            single_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            actual = list(getattr(db, bulk)(user_ids))
+            bulk_time = time.perf_counter() - started
+
+            status = '✅' if actual == expected else '❌ результаты различаются'
+            print(f'{bulk:<24} поштучно {single_time:>7.2f} с   пачками {bulk_time:>7.2f} с   '
+                  f'x{single_time / bulk_time:>5.1f}  {status}')
+
+        db.close_connections()
+
+if __name__ == '__main__':
+    main()
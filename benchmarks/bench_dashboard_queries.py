@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import random
+import tempfile
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+
+USER_ID = 1
+HISTORY_DAYS = 365
+ITERATIONS = 500
+METHODS = ['get_user_data', 'get_comprehensive_user_data', 'get_user_overview']
+
+def seed(db: DatabaseManager) -> None:
+    rnd = random.Random(0)
+    today = datetime.date.today()
+    db.ensure_user_exists(USER_ID)
+    for offset in range(HISTORY_DAYS):
+        day = (today - datetime.timedelta(days=offset)).isoformat()
+        db.update_water_intake(USER_ID, day, rnd.randrange(1, 10))
+        db.update_sleep_data(USER_ID, day, rnd.choice([5.5, 6.5, 7.5, 8.5]), rnd.randrange(1, 6))
+        db.update_activity_data(USER_ID, day, rnd.randrange(2000, 14000), rnd.randrange(0, 40))
+        db.update_mood_data(USER_ID, day, rnd.choice(['Отлично', 'Хорошо', 'Нормально', 'Плохо']), '🙂')
+        for _ in range(rnd.randrange(0, 4)):
+            db.save_pomodoro_session(USER_ID, 25, 'work', True, 'задача', day)
+        db.add_user_achievement(USER_ID, 'pomodoro', day)
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'dashboard.db'), pool_size=1)
+        seed(db)
+        
+        for name in METHODS:
+            method = getattr(db, name)
+            statements = []
+            with db.get_connection() as conn:
+                conn.set_trace_callback(statements.append)
+                method(USER_ID)
+                conn.set_trace_callback(None)
+            
+            started = time.perf_counter()
+            for _ in range(ITERATIONS):
+                method(USER_ID)
+            elapsed = (time.perf_counter() - started) / ITERATIONS
+            print(f'{name:<30} запросов: {len(statements):>3}  {elapsed * 1000:>7.3f} мс/вызов')
+        
+        db.close_connections()
+
+if __name__ == '__main__':
+    main()
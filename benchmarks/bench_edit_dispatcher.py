@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import asyncio
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.error import RetryAfter
+
+from edit_dispatcher import EditDispatcher
+
+SESSIONS = int(os.getenv('BENCH_SESSIONS', '600'))
+SECONDS = float(os.getenv('BENCH_SECONDS', '6'))
+TICK = 1.0
+SERVER_RATE = 30
+LATENCY = 0.02
+
+class FakeTelegram:
+    # Сервер с лимитом SERVER_RATE правок в скользящем окне 1 с: сверх лимита - RetryAfter
+    def __init__(self):
+        self.window = deque()
+        self.accepted = 0
+        self.rejected = 0
+        self.lag = []
+
+    async def edit_message_text(self, chat_id, message_id, text, reply_markup=None, parse_mode=None):
+        await asyncio.sleep(LATENCY)
+        now = time.monotonic()
+        while self.window and now - self.window[0] > 1:
+            self.window.popleft()
+        if len(self.window) >= SERVER_RATE:
+            self.rejected += 1
+            raise RetryAfter(1)
+        self.window.append(now)
+        self.accepted += 1
+        self.lag.append(now - float(text))
+
+async def direct(bot: FakeTelegram) -> dict:
+    # Прежняя схема: каждый таймер сам вызывает edit_message_text, ошибки только логируются
+    tasks = set()
+
+    async def edit(chat_id):
+        try:
+            await bot.edit_message_text(chat_id=chat_id, message_id=1, text=str(time.monotonic()))
+        except RetryAfter:
+            pass
+
+    stop = time.monotonic() + SECONDS
+    while time.monotonic() < stop:
+        for chat_id in range(SESSIONS):
+            task = asyncio.create_task(edit(chat_id))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.sleep(TICK)
+    await asyncio.gather(*tasks)
+    return {}
+
+async def dispatched(bot: FakeTelegram) -> dict:
+    dispatcher = EditDispatcher(rate=25, burst=5, chat_rate=1, chat_burst=1)
+    stop = time.monotonic() + SECONDS
+    while time.monotonic() < stop:
+        for chat_id in range(SESSIONS):
+            dispatcher.submit(bot, chat_id, 1, str(time.monotonic()))
+        await asyncio.sleep(TICK)
+    stats = dispatcher.stats()
+    await dispatcher.close(timeout=0)
+    return {key: stats[key] for key in ('pending', 'max_pending', 'coalesced', 'retry_after')}
+
+class InstantBot:
+    def __init__(self):
+        self.sent = 0
+
+    async def edit_message_text(self, chat_id, message_id, text, reply_markup=None, parse_mode=None):
+        self.sent += 1
+
+async def backlog_cost(chats: int, per_chat: int) -> None:
+    # Цена выбора следующей правки при длинной очереди в чатах, упершихся в поканальный лимит
+    bot = InstantBot()
+    dispatcher = EditDispatcher(rate=1e6, burst=1000, chat_rate=20, chat_burst=1, concurrency=64)
+    for message_id in range(per_chat):
+        for chat_id in range(chats):
+            dispatcher.submit(bot, chat_id, message_id, 'x')
+    started = time.process_time()
+    await asyncio.sleep(2)
+    cpu = time.process_time() - started
+    await dispatcher.close(timeout=0)
+    print(f"очередь {chats * per_chat:>6} правок в {chats} чатах: отправлено {bot.sent}, "
+          f"{cpu / max(1, bot.sent) * 1e6:.1f} мкс CPU на правку")
+
+def measure(name, scenario) -> None:
+    bot = FakeTelegram()
+    extra = asyncio.run(scenario(bot))
+    lag = sorted(bot.lag)
+    p50 = lag[len(lag) // 2] if lag else 0.0
+    print(
+        f"{name:<12} попыток={bot.accepted + bot.rejected:>6} принято={bot.accepted:>5} "
+        f"429={bot.rejected:>6} задержка p50={p50:.2f}с  {extra}"
+    )
+
+if __name__ == '__main__':
+    print(f"{SESSIONS} сессий, обновление каждые {TICK:.0f} с, {SECONDS:.0f} с, лимит сервера {SERVER_RATE}/с")
+    measure('напрямую', direct)
+    measure('диспетчер', dispatched)
+    for per_chat in (20, 200, 1000):
+        asyncio.run(backlog_cost(50, per_chat))
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.ext import Application
+
+from pomodoro_timer import PomodoroSession, PomodoroJobs
+
+SESSIONS = int(os.getenv('BENCH_SESSIONS', '10000'))
+DURATION = float(os.getenv('BENCH_SECONDS', '20'))
+TICK = 10.0
+
+async def sleep_loops() -> dict:
+    # Прежняя схема: задача на пользователя, пробуждение раз в секунду
+    wakeups = 0
+    stop = time.time() + DURATION
+
+    async def loop():
+        nonlocal wakeups
+        remaining = 25 * 60
+        while time.time() < stop:
+            await asyncio.sleep(1)
+            wakeups += 1
+            remaining -= 1
+
+    await asyncio.gather(*(loop() for _ in range(SESSIONS)))
+    return {'wakeups': wakeups}
+
+async def job_queue() -> dict:
+    # Одна задача JobQueue на фазу: повтор с шагом обновления экрана, разовая задача к концу фазы.
+    # Приложение не инициализируется: сеть для запуска задач не нужна
+    application = Application.builder().token('0:bench').build()
+    scheduler = PomodoroJobs()
+    scheduler.attach(application.job_queue)
+    await application.job_queue.start()
+    wakeups = 0
+    now = time.time()
+
+    def arm(session):
+        when, expires = session.next_wakeup(tick=TICK)
+        scheduler.schedule(session.user_id, when, None if expires else TICK, lambda: fire(session))
+
+    async def fire(session):
+        nonlocal wakeups
+        wakeups += 1
+        if session.remaining() == 0:
+            scheduler.cancel(session.user_id)
+
+    for user_id in range(SESSIONS):
+        session = PomodoroSession(user_id=user_id, chat_id=user_id, message_id=1, task='')
+        session.start_phase('work', 25 * 60 - (user_id % 1000) * TICK / 1000, now)
+        arm(session)
+    armed_cpu = time.process_time()
+    await asyncio.sleep(DURATION)
+    stats = scheduler.stats()
+    stats['run_cpu'] = round(time.process_time() - armed_cpu, 2)
+    await application.job_queue.stop()
+    return {'wakeups': wakeups, **stats}
+
+def measure(name, coroutine) -> None:
+    started_wall, started_cpu = time.perf_counter(), time.process_time()
+    result = asyncio.run(coroutine())
+    wall, cpu = time.perf_counter() - started_wall, time.process_time() - started_cpu
+    print(f"{name:<20} сессий={SESSIONS} окно={DURATION:.0f}с  wall={wall:.2f}с cpu={cpu:.2f}с  {result}")
+
+if __name__ == '__main__':
+    measure('asyncio.sleep(1)', sleep_loops)
+    measure('JobQueue', job_queue)
@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import tempfile
+import datetime
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_STORAGE_PROFILES
+from database import ShardedDatabaseManager
+
+USERS = 400
+THREADS = 8
+OPS_PER_THREAD = 400
+HOLD_SECONDS = 1.0
+ROUTING_CALLS = 200000
+
+def open_shards(tmp: str, shards: int, pragmas: dict) -> ShardedDatabaseManager:
+    paths = [os.path.join(tmp, f'shard{shard}.db') for shard in range(shards)]
+    db = ShardedDatabaseManager(paths, pool_size=THREADS, pragmas=pragmas, write_behind=False)
+    for user_id in range(USERS):
+        db.ensure_user_exists(user_id)
+    return db
+
+def write(db: ShardedDatabaseManager, rnd: random.Random, today: str) -> None:
+    user_id = rnd.randrange(USERS)
+    if rnd.random() < 0.5:
+        db.update_water_intake(user_id, today, 1)
+    else:
+        db.save_pomodoro_session(user_id, 25, 'work', True, 'bench', today)
+
+def throughput(shards: int, pragmas: dict) -> float:
+    # Записи из THREADS потоков одного процесса
+    with tempfile.TemporaryDirectory() as tmp:
+        db = open_shards(tmp, shards, pragmas)
+        today = datetime.date.today().isoformat()
+
+        def worker(seed: int) -> None:
+            rnd = random.Random(seed)
+            for _ in range(OPS_PER_THREAD):
+                write(db, rnd, today)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        db.close_connections()
+        return THREADS * OPS_PER_THREAD / elapsed
+
+def blocked_writer(shards: int, pragmas: dict) -> dict:
+    # Долгая транзакция (бэкфилл, очистка) держит блокировку записи шарда 0 HOLD_SECONDS;
+    # считаем записи, прошедшие без ожидания этой блокировки
+    with tempfile.TemporaryDirectory() as tmp:
+        db = open_shards(tmp, shards, pragmas)
+        today = datetime.date.today().isoformat()
+        holder = sqlite3.connect(os.path.join(tmp, 'shard0.db'), timeout=30)
+        holder.execute('BEGIN IMMEDIATE')
+        released = time.perf_counter() + HOLD_SECONDS
+        latencies = []
+        lock = threading.Lock()
+
+        def worker(seed: int) -> None:
+            rnd = random.Random(seed)
+            while time.perf_counter() < released:
+                started = time.perf_counter()
+                write(db, rnd, today)
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        time.sleep(max(0.0, released - time.perf_counter()))
+        holder.rollback()
+        holder.close()
+        for thread in threads:
+            thread.join()
+        db.close_connections()
+        fast = sum(1 for latency in latencies if latency < HOLD_SECONDS / 10)
+        return {'writes': len(latencies), 'not_blocked': fast}
+
+def routing_cost() -> float:
+    # Цена маршрутизации вызова до шарда (без запроса к базе), мкс
+    with tempfile.TemporaryDirectory() as tmp:
+        db = ShardedDatabaseManager([os.path.join(tmp, f'shard{shard}.db') for shard in range(4)], write_behind=False)
+        for shard in db.shards:
+            shard.get_user_data = lambda user_id: None
+        started = time.perf_counter()
+        for user_id in range(ROUTING_CALLS):
+            db.get_user_data(user_id)
+        elapsed = time.perf_counter() - started
+        db.close_connections()
+        return elapsed / ROUTING_CALLS * 1e6
+
+if __name__ == '__main__':
+    profile = sys.argv[1] if len(sys.argv) > 1 else 'durable'
+    pragmas = DB_STORAGE_PROFILES[profile]
+    print(f'Маршрутизация вызова: {routing_cost():.2f} мкс')
+    print(f'{THREADS} потоков x {OPS_PER_THREAD} записей, {USERS} пользователей, профиль {profile}, CPU: {os.cpu_count()}')
+    for shards in (1, 2, 4, 8):
+        print(f'шардов: {shards}  {throughput(shards, pragmas):>8.0f} записей/с')
+    print(f'Шард 0 заблокирован долгой транзакцией на {HOLD_SECONDS:g} с')
+    for shards in (1, 2, 4, 8):
+        stats = blocked_writer(shards, pragmas)
+        print(f"шардов: {shards}  записей={stats['writes']:>6}  без ожидания={stats['not_blocked']:>6}")
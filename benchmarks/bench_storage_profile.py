@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import random
+import tempfile
+import datetime
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DB_STORAGE_PROFILES
+from database import DatabaseManager
+
+USERS = 200
+THREADS = 8
+OPS_PER_THREAD = 500
+
+def run_profile(name: str, pragmas: dict) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'bench.db'), pool_size=THREADS, pragmas=pragmas)
+        for user_id in range(USERS):
+            db.ensure_user_exists(user_id)
+        
+        today = datetime.date.today().isoformat()
+        errors = []
+        
+        def worker(seed: int) -> None:
+            rnd = random.Random(seed)
+            for _ in range(OPS_PER_THREAD):
+                user_id = rnd.randrange(USERS)
+                try:
+                    op = rnd.random()
+                    if op < 0.3:
+                        db.update_water_intake(user_id, today, 1)
+                    elif op < 0.4:
+                        db.update_activity_data(user_id, today, rnd.randrange(15000), 0)
+                    elif op < 0.5:
+                        db.save_pomodoro_session(user_id, 25, 'work', True, 'bench', today)
+                    else:
+                        db.get_user_data(user_id)
+                except Exception as e:
+                    errors.append(e)
+        
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        db.close_connections()
+        
+        total = THREADS * OPS_PER_THREAD
+        print(f'{name:<12} {total / elapsed:>10.0f} ops/s  {elapsed:>7.2f} s  ошибок: {len(errors)}')
+        for error in sorted(set(map(repr, errors))):
+            print(f'    {error}')
+
+if __name__ == '__main__':
+    profiles = sys.argv[1:] or list(DB_STORAGE_PROFILES)
+    print(f'{THREADS} потоков x {OPS_PER_THREAD} операций, {USERS} пользователей')
+    for profile in profiles:
+        run_profile(profile, DB_STORAGE_PROFILES[profile])
@@ -0,0 +1,157 @@
+import os
+import sys
+import math
+import time
+import random
+import inspect
+import tempfile
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from achievements import ACHIEVEMENT_CATALOG
+from database import DatabaseManager
+from memory_backend import MemoryBackend
+from storage_backend import StorageBackend
+
+USERS = 20
+OPERATIONS = 4000
+DAYS = 60
+ACHIEVEMENT_CODES = [achievement.code for achievement in ACHIEVEMENT_CATALOG]
+BULK_METHODS = [('get_user_data_many', 'get_user_data'), ('get_user_streaks_many', 'get_user_streaks')]
+MOODS = ['Отлично', 'Хорошо', 'Нормально', 'Не очень', 'Плохо', 'Устал']
+
+def workload(seed: int, created: dict):
+    rnd = random.Random(seed)
+    today = datetime.date.today()
+    habits = created.setdefault('habit', {})
+    goals = created.setdefault('goal', {})
+    for _ in range(OPERATIONS):
+        user_id = rnd.randrange(USERS)
+        date = (today - datetime.timedelta(days=rnd.randrange(DAYS))).isoformat()
+        op = rnd.random()
+        if op < 0.2:
+            yield 'update_water_intake', (user_id, date, rnd.randint(1, 3)), None
+        elif op < 0.3:
+            yield 'update_sleep_data', (user_id, date, rnd.choice([5, 6.5, 7, 8.5]), rnd.randint(1, 5)), None
+        elif op < 0.4:
+            yield 'update_activity_data', (user_id, date, rnd.randrange(15000), rnd.randrange(60)), None
+        elif op < 0.5:
+            yield 'update_mood_data', (user_id, date, rnd.choice(MOODS), '🙂'), None
+        elif op < 0.6:
+            yield 'save_pomodoro_session', (user_id, rnd.choice([5, 25]), 'work', rnd.random() < 0.8, 'задача', date), None
+        elif op < 0.65:
+            yield 'create_habit', (user_id, 'привычка', 'описание', 'daily'), ('habit', user_id)
+        elif op < 0.75 and habits.get(user_id):
+            yield 'update_habit_status', (user_id, rnd.choice(habits[user_id]), date, rnd.random() < 0.7), None
+        elif op < 0.78:
+            yield 'create_goal', (user_id, 'цель', 'описание', date), ('goal', user_id)
+        elif op < 0.8 and goals.get(user_id):
+            yield 'update_goal_progress', (user_id, rnd.choice(goals[user_id]), rnd.randrange(100)), None
+        elif op < 0.85:
+            yield 'add_user_achievement', (user_id, rnd.choice(ACHIEVEMENT_CODES), date), None
+        elif op < 0.9:
+            yield 'add_workout_session', (user_id, date, 'бег', rnd.randrange(10, 60), 200), None
+        elif op < 0.92:
+            yield 'add_mood_note', (user_id, date, 'заметка'), None
+        elif op < 0.93 and habits.get(user_id):
+            habit_id = habits[user_id].pop()
+            yield 'delete_user_habit', (user_id, habit_id), None
+        else:
+            yield 'ensure_user_exists', (user_id,), None
+
+def apply(backend: StorageBackend, seed: int) -> float:
+    # id, выданные бэкендом, попадают в created и используются следующими операциями
+    created = {}
+    started = time.perf_counter()
+    for name, args, remember in workload(seed, created):
+        result = getattr(backend, name)(*args)
+        if remember:
+            kind, user_id = remember
+            created[kind].setdefault(user_id, []).append(result)
+    return time.perf_counter() - started
+
+def read_methods():
+    for name, method in inspect.getmembers(StorageBackend, inspect.isfunction):
+        parameters = list(inspect.signature(method).parameters.values())[1:]
+        required = [parameter.name for parameter in parameters if parameter.default is inspect.Parameter.empty]
+        if name.startswith('get_') and required == ['user_id'] and name != 'get_user_snapshot':
+            yield name
+
+def normalize(value):
+    if isinstance(value, float):
+        return None if math.isnan(value) else round(value, 6)
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items() if key not in ('created_at', 'last_active')}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    return value
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = DatabaseManager(os.path.join(tmp, 'compare.db'), write_behind=False)
+        memory = MemoryBackend()
+        timings = {'sqlite': apply(sqlite, 7), 'memory': apply(memory, 7)}
+
+        mismatches = []
+        read_time = {'sqlite': 0.0, 'memory': 0.0}
+        for name in read_methods():
+            for user_id in range(USERS):
+                results = {}
+                for label, backend in (('sqlite', sqlite), ('memory', memory)):
+                    started = time.perf_counter()
+                    results[label] = normalize(getattr(backend, name)(user_id))
+                    read_time[label] += time.perf_counter() - started
+                if results['sqlite'] != results['memory']:
+                    mismatches.append((name, user_id, results['sqlite'], results['memory']))
+        
+        # Массовые варианты должны совпадать с поштучными вызовами того же бэкенда
+        user_ids = list(range(USERS + 3))
+        for label, backend in (('sqlite', sqlite), ('memory', memory)):
+            for bulk, single in BULK_METHODS:
+                expected = normalize([(user_id, getattr(backend, single)(user_id)) for user_id in user_ids])
+                actual = normalize(list(getattr(backend, bulk)(user_ids)))
+                if actual != expected:
+                    mismatches.append((f'{label}.{bulk}', '*', expected, actual))
+            expected = normalize([vars(backend.get_user_snapshot(user_id)) for user_id in user_ids])
+            actual = normalize([vars(snapshot) for snapshot in backend.get_user_snapshots_many(user_ids)])
+            if actual != expected:
+                mismatches.append((f'{label}.get_user_snapshots_many', '*', expected, actual))
+        
+        # Активные Pomodoro: просроченные фазы записываются в историю, остальные остаются как есть
+        now = time.time()
+        for label, backend in (('sqlite', sqlite), ('memory', memory)):
+            for user_id in range(USERS):
+                state = 'work' if user_id % 2 else 'break'
+                if user_id % 5 == 0:
+                    backend.save_active_pomodoro(user_id, state, None, 300.0, 'задача', user_id, 1)
+                else:
+                    backend.save_active_pomodoro(user_id, state, now + (user_id - 10) * 60, None, 'задача', user_id, 1)
+            backend.delete_active_pomodoro(1)
+        results = {
+            label: normalize([
+                backend.complete_overdue_pomodoros(now, 25 * 60, 5 * 60),
+                backend.get_active_pomodoros(),
+                [backend.get_pomodoro_stats(user_id) for user_id in range(USERS)],
+            ])
+            for label, backend in (('sqlite', sqlite), ('memory', memory))
+        }
+        if results['sqlite'] != results['memory']:
+            mismatches.append(('active_pomodoros', '*', results['sqlite'], results['memory']))
+        if list(sqlite.iter_user_ids()) != list(memory.iter_user_ids()):
+            mismatches.append(('iter_user_ids', '*', list(sqlite.iter_user_ids()), list(memory.iter_user_ids())))
+        sqlite.close_connections()
+
+    print(f'{OPERATIONS} записей, {USERS} пользователей')
+    for label in ('sqlite', 'memory'):
+        print(f'{label:<8} запись {timings[label] * 1e6 / OPERATIONS:>8.1f} мкс/оп   чтение {read_time[label]:>7.3f} с')
+    for name, user_id, expected, actual in mismatches[:10]:
+        print(f'❌ {name}({user_id}):\n    sqlite {expected}\n    memory {actual}')
+    if mismatches:
+        print(f'Расхождений: {len(mismatches)}')
+        return 1
+    print('✅ Бэкенды возвращают одинаковые результаты')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
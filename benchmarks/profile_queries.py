@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+from query_profiler import profiler
+from compare_backends import USERS, apply, read_methods
+
+def main() -> None:
+    # Смешанная нагрузка из compare_backends и все чтения по каждому пользователю;
+    # аргумент - путь для выгрузки полного отчета в CSV
+    profiler.enabled = True
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'profile.db'), write_behind=False)
+        profiler.reset()
+        apply(db, 7)
+        for name in read_methods():
+            for user_id in range(USERS):
+                getattr(db, name)(user_id)
+        db.close_connections()
+
+    print(profiler.format_report(15))
+    if len(sys.argv) > 1:
+        print(f'Отчет сохранен: {profiler.export(sys.argv[1])}')
+
+if __name__ == '__main__':
+    main()
@@ -14,7 +14,9 @@ from telegram.ext import (
     filters
 )
 
-from config import BOT_TOKEN
+from config import BOT_TOKEN, BACKUP_INTERVAL_HOURS, RETENTION_INTERVAL_HOURS
+from pomodoro_timer import scheduler, refresh
+from edit_dispatcher import dispatcher
 from handlers.common_handlers import (
     start_command,
     help_command,
@@ -27,6 +29,7 @@ from handlers.common_handlers import (
     detailed_stats_handler,
     all_achievements_handler,
 )
+from handlers.admin_handlers import dbstats_command, editstats_command
 from handlers.physical_handlers import (
     physical_menu_handler,
     water_track_handler,
@@ -111,6 +114,7 @@ from handlers.social_handlers import (
     handle_pomodoro_task_text,
     handle_habit_name_text,
     handle_habit_description_text,
+    restore_pomodoro_sessions,
 )
 
 def setup_logging():
@@ -136,6 +140,7 @@ def setup_logging():
     
     logging.getLogger("httpx").setLevel(logging.WARNING)
     logging.getLogger("telegram").setLevel(logging.WARNING)
+    logging.getLogger("apscheduler").setLevel(logging.WARNING)
     
     return logging.getLogger(__name__)
 
@@ -240,6 +245,8 @@ def setup_handlers(application: Application) -> None:
     application.add_handler(CommandHandler("menu", handle_main_menu))
     application.add_handler(CommandHandler("about", about_command))
     application.add_handler(CommandHandler("stats", progress_handler))
+    application.add_handler(CommandHandler("dbstats", dbstats_command))
+    application.add_handler(CommandHandler("editstats", editstats_command))
     
     # ==================== ГЛАВНОЕ МЕНЮ ====================
     application.add_handler(CallbackQueryHandler(physical_menu_handler, pattern='^physical$'))
@@ -253,7 +260,7 @@ def setup_handlers(application: Application) -> None:
     application.add_handler(CallbackQueryHandler(challenge_handler, pattern='^challenge$'))
     application.add_handler(CallbackQueryHandler(help_command, pattern='^help$'))
     application.add_handler(CallbackQueryHandler(detailed_stats_handler, pattern='^detailed_stats$'))
-    application.add_handler(CallbackQueryHandler(all_achievements_handler, pattern='^all_achievements$'))
+    application.add_handler(CallbackQueryHandler(all_achievements_handler, pattern='^all_achievements(:.+)?$'))
     
     # ==================== БЛОК "ТЕЛО" ====================
     application.add_handler(CallbackQueryHandler(water_track_handler, pattern='^water_track$'))
@@ -398,19 +405,36 @@ async def shutdown(application: Application) -> None:
     logger.info("Завершение работы бота...")
     
     try:
-        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
-        for task in tasks:
-            task.cancel()
+        # Сначала прекращается прием обновлений, затем application.stop() останавливает JobQueue,
+        # дождавшись уже запущенных задач; очередь правок досылается, пока бот еще открыт
+        if application.updater and application.updater.running:
+            await application.updater.stop()
+        if application.running:
+            await application.stop()
         
-        await asyncio.gather(*tasks, return_exceptions=True)
+        await dispatcher.close()
+        logger.info(f"Очередь правок сообщений: {dispatcher.stats()}")
+        logger.info(f"Обновление таймеров Pomodoro: {refresh.stats(dispatcher.counters['calls'])}")
         
-        await application.stop()
         await application.shutdown()
         
         logger.info("Бот успешно остановлен")
         
+        from query_profiler import profiler
+        if profiler.stats:
+            logger.info(f"Статистика SQL-запросов:\n{profiler.format_report(20)}")
+        
+        try:
+            from async_storage import shutdown_executor
+            shutdown_executor()
+        except ImportError:
+            pass
+        
         try:
-            from database import db
+            from storage import db
+            flushed = db.flush_pending_writes()
+            if flushed:
+                logger.info(f"Сброшено отложенных записей: {flushed}")
             if hasattr(db, 'close_connections'):
                 db.close_connections()
                 logger.info("Соединения с базой данных закрыты")
@@ -474,7 +498,7 @@ def check_dependencies() -> bool:
         return False
     
     try:
-        from database import db
+        from storage import db
         db.init_database()
         logger.info("База данных проверена/создана")
     except ImportError as e:
@@ -542,15 +566,43 @@ def check_requirements():
     logger.info("✅ Все зависимости установлены успешно")
     return True
 
-async def backup_database():
+async def backup_database(context=None) -> None:
     try:
-        from database import db
+        from storage import db
         if hasattr(db, 'create_backup'):
-            backup_path = db.create_backup()
+            loop = asyncio.get_running_loop()
+            backup_path = await loop.run_in_executor(None, db.create_backup)
             logger.info(f"Создана резервная копия базы данных: {backup_path}")
     except Exception as e:
         logger.error(f"Ошибка при создании резервной копии: {e}")
 
+async def compact_database(context=None) -> None:
+    try:
+        from storage import db
+        if hasattr(db, 'compact_storage'):
+            loop = asyncio.get_running_loop()
+            stats = await loop.run_in_executor(None, db.compact_storage)
+            logger.info(f"Очистка базы данных: {stats}")
+            if stats.get('needs_vacuum'):
+                logger.warning("База не в режиме auto_vacuum=INCREMENTAL: место не освобождается, выполните python manage.py compact")
+    except Exception as e:
+        logger.error(f"Ошибка при очистке базы данных: {e}")
+
+def setup_jobs(application: Application) -> None:
+    if application.job_queue is None:
+        logger.warning("JobQueue недоступна (нужен python-telegram-bot[job-queue]), задачи обслуживания базы и таймеры Pomodoro отключены")
+        return
+    
+    scheduler.attach(application.job_queue)
+    
+    interval = BACKUP_INTERVAL_HOURS * 3600
+    application.job_queue.run_repeating(backup_database, interval=interval, first=interval, name='db_backup')
+    logger.info(f"Резервное копирование по расписанию: каждые {BACKUP_INTERVAL_HOURS:g} ч")
+    
+    interval = RETENTION_INTERVAL_HOURS * 3600
+    application.job_queue.run_repeating(compact_database, interval=interval, first=600, name='db_compact')
+    logger.info(f"Очистка старых записей по расписанию: каждые {RETENTION_INTERVAL_HOURS:g} ч")
+
 async def main() -> None:
     
     try:
@@ -569,6 +621,8 @@ async def main() -> None:
         
         setup_handlers(application)
         
+        setup_jobs(application)
+        
         application.post_init = post_init
         
         logger.info("Запуск бота...")
@@ -576,6 +630,11 @@ async def main() -> None:
         await application.initialize()
         await application.start()
         
+        try:
+            await restore_pomodoro_sessions(application.bot)
+        except Exception as e:
+            logger.error(f"Ошибка при восстановлении Pomodoro сессий: {e}")
+        
         await application.updater.start_polling(
             allowed_updates=["message", "callback_query"],
             drop_pending_updates=True
@@ -0,0 +1,97 @@
+import sys
+import copy
+import time
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+def _sizeof(value: Any) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_sizeof(item) for item in value)
+    return size
+
+class UserDataCache:
+    def __init__(self, ttl: float = 60, max_entries: int = 10000, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple[int, str, str], Tuple[float, Any, int]]' = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self._user_keys: Dict[int, set] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def _drop(self, key: Tuple[int, str, str]) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+        keys = self._user_keys[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._user_keys[key[0]]
+    
+    def get_or_load(self, kind: str, user_id: int, loader: Callable[[], Any]) -> Any:
+        # Ключ включает дату, поэтому после полуночи данные перечитываются сами
+        key = (user_id, datetime.date.today().isoformat(), kind)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[1])
+            if entry:
+                self._drop(key)
+            self.misses += 1
+            generation = self._generations.get(user_id, 0)
+        
+        value = loader()
+        size = _sizeof(value)
+        
+        with self._lock:
+            # Запись, пришедшая во время загрузки, делает прочитанное значение устаревшим
+            if self._generations.get(user_id, 0) == generation and size <= self.max_bytes:
+                if key in self._entries:
+                    self._drop(key)
+                self._entries[key] = (now + self.ttl, copy.deepcopy(value), size)
+                self._user_keys.setdefault(user_id, set()).add(key)
+                self._bytes += size
+                while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                    self._drop(next(iter(self._entries)))
+                    self.evictions += 1
+        return value
+    
+    def invalidate(self, user_id: int, *kinds: str) -> None:
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in [key for key in self._user_keys.get(user_id, ()) if not kinds or key[2] in kinds]:
+                self._drop(key)
+                self.invalidations += 1
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self._user_keys.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -4,8 +4,82 @@ from dotenv import load_dotenv
 load_dotenv()
 
 BOT_TOKEN = os.getenv('BOT_TOKEN')
+ADMIN_IDS = {int(user_id) for user_id in os.getenv('ADMIN_IDS', '').split(',') if user_id.strip()}
 LOGO_PATH = 'assets/logo.png'
 DB_PATH = 'yaprosb_bot.db'
 BACKUP_DIR = 'backups'
 LOG_DIR = 'logs'
-LOG_LEVEL = 'INFO'
\ No newline at end of file
+LOG_LEVEL = 'INFO'
+ACHIEVEMENTS_PAGE_SIZE = 10
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', str(DB_POOL_SIZE)))
+
+DB_STORAGE_PROFILES = {
+    'performance': {
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,
+        'mmap_size': 134217728,
+        'temp_store': 'MEMORY',
+    },
+    'durable': {
+        'auto_vacuum': 'INCREMENTAL',
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -8000,
+        'temp_store': 'MEMORY',
+    },
+    'legacy': {},
+}
+DB_STORAGE_PROFILE = os.getenv('DB_STORAGE_PROFILE', 'performance')
+if DB_STORAGE_PROFILE not in DB_STORAGE_PROFILES:
+    raise ValueError(f"Неизвестный DB_STORAGE_PROFILE={DB_STORAGE_PROFILE!r}, допустимые: {', '.join(DB_STORAGE_PROFILES)}")
+DB_PRAGMAS = DB_STORAGE_PROFILES[DB_STORAGE_PROFILE]
+
+DB_SHARDS = int(os.getenv('DB_SHARDS', '1'))
+DB_SHARD_PATH = os.getenv('DB_SHARD_PATH', 'yaprosb_bot.shard{shard}.db')
+DB_SHARD_PATHS = [DB_SHARD_PATH.format(shard=shard) for shard in range(DB_SHARDS)]
+
+DB_MIGRATION_MODE = os.getenv('DB_MIGRATION_MODE', 'offline')
+DB_MIGRATION_BATCH_SIZE = int(os.getenv('DB_MIGRATION_BATCH_SIZE', '1000'))
+
+DB_WRITE_BEHIND = os.getenv('DB_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+DB_WRITE_BEHIND_INTERVAL_MS = int(os.getenv('DB_WRITE_BEHIND_INTERVAL_MS', '200'))
+DB_WRITE_BEHIND_MAX_EVENTS = int(os.getenv('DB_WRITE_BEHIND_MAX_EVENTS', '100'))
+
+DB_BULK_CHUNK_SIZE = int(os.getenv('DB_BULK_CHUNK_SIZE', '500'))
+
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '256'))
+DB_PROFILE = os.getenv('DB_PROFILE', 'false').lower() in ('1', 'true', 'yes')
+DB_PROFILE_SAMPLES = int(os.getenv('DB_PROFILE_SAMPLES', '1000'))
+
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+
+BACKUP_INTERVAL_HOURS = float(os.getenv('BACKUP_INTERVAL_HOURS', '6'))
+BACKUP_PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', '256'))
+BACKUP_STEP_PAUSE_MS = int(os.getenv('BACKUP_STEP_PAUSE_MS', '20'))
+BACKUP_KEEP_LAST = int(os.getenv('BACKUP_KEEP_LAST', '8'))
+BACKUP_KEEP_DAYS = int(os.getenv('BACKUP_KEEP_DAYS', '14'))
+
+RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', '365'))
+RETENTION_INTERVAL_HOURS = float(os.getenv('RETENTION_INTERVAL_HOURS', '24'))
+RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '1000'))
+RETENTION_VACUUM_PAGES = int(os.getenv('RETENTION_VACUUM_PAGES', '2000'))
+
+POMODORO_DISPLAY_TICKS = sorted(float(tick) for tick in os.getenv('POMODORO_DISPLAY_TICKS', '10,60').split(',') if tick.strip())
+POMODORO_MAX_EDITS_PER_MINUTE = float(os.getenv('POMODORO_MAX_EDITS_PER_MINUTE', '6'))
+POMODORO_EDIT_SHARE = float(os.getenv('POMODORO_EDIT_SHARE', '0.8'))
+POMODORO_JOB_CONCURRENCY = int(os.getenv('POMODORO_JOB_CONCURRENCY', '16'))
+
+EDIT_GLOBAL_RATE = float(os.getenv('EDIT_GLOBAL_RATE', '25'))
+EDIT_GLOBAL_BURST = int(os.getenv('EDIT_GLOBAL_BURST', '5'))
+EDIT_CHAT_RATE = float(os.getenv('EDIT_CHAT_RATE', '1'))
+EDIT_CHAT_BURST = int(os.getenv('EDIT_CHAT_BURST', '3'))
+EDIT_CONCURRENCY = int(os.getenv('EDIT_CONCURRENCY', '8'))
+EDIT_MEMORY_SIZE = int(os.getenv('EDIT_MEMORY_SIZE', '20000'))
+
+CACHE_TTL = float(os.getenv('CACHE_TTL', '60'))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '10000'))
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
@@ -1,205 +1,418 @@
 import sqlite3
 import os
+import queue
+import bisect
+import hashlib
+import inspect
 import datetime
+import functools
+import itertools
+import threading
 from contextlib import contextmanager
-from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from config import (
+    DB_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_PRAGMAS, DB_MIGRATION_MODE, DB_MIGRATION_BATCH_SIZE,
+    DB_WRITE_BEHIND, DB_WRITE_BEHIND_INTERVAL_MS, DB_WRITE_BEHIND_MAX_EVENTS, DB_SHARDS, DB_SHARD_PATHS,
+    DB_BULK_CHUNK_SIZE, DB_STATEMENT_CACHE_SIZE,
+    BACKUP_DIR, RETENTION_DAYS, RETENTION_BATCH_SIZE, RETENTION_VACUUM_PAGES,
+)
+from backup import create_snapshot, verify_in_background
+from achievements import ACHIEVEMENT_CATALOG, achievement_id
+from analytics import load_history, mood_patterns, trend_report
+from write_behind import WriteBehindQueue
+from pomodoro_timer import advance_overdue_pomodoro
+from query_profiler import ProfilingConnection
+from migrations import (
+    migrate, get_schema_version, rebuild_aggregates, rebuild_daily_rollup, recompute_streak, compact,
+    sync_achievement_catalog,
+    AGGREGATE_SOURCES, ROLLUP_SOURCES, STREAK_METRICS,
+)
+
+AGGREGATE_COLUMNS = [column for _, columns in AGGREGATE_SOURCES.values() for column, _, _ in columns]
+
+SNAPSHOT_WEEK_COLUMNS = '''
+    MAX(CASE WHEN date = :today THEN water END) AS water_today,
+    COUNT(water) AS water_week_days,
+    AVG(water) AS water_week_avg,
+    MAX(CASE WHEN date = :today THEN sleep_hours END) AS sleep_hours,
+    MAX(CASE WHEN date = :today THEN sleep_quality END) AS sleep_quality,
+    AVG(sleep_hours) AS sleep_week_avg_hours,
+    AVG(sleep_quality) AS sleep_week_avg_quality,
+    MAX(CASE WHEN date = :today THEN steps END) AS steps_today,
+    MAX(CASE WHEN date = :today THEN workout_minutes END) AS workout_today,
+    AVG(steps) AS steps_week_avg,
+    COUNT(steps) AS active_days_week,
+    MAX(CASE WHEN date = :today THEN pomodoros END) AS pomodoro_today,
+    MAX(CASE WHEN date = :today THEN pomodoro_minutes END) AS pomodoro_today_time,
+    COUNT(CASE WHEN pomodoros > 0 THEN 1 END) AS pomodoro_week_days
+'''
+
+SNAPSHOT_COLUMNS = '''
+    u.created_at, u.last_active, u.streak_days,
+    week.water_today, agg.water_total, week.water_week_days, week.water_week_avg,
+    week.sleep_hours, week.sleep_quality, week.sleep_week_avg_hours, week.sleep_week_avg_quality,
+    week.steps_today, agg.steps_total, week.workout_today, week.steps_week_avg, week.active_days_week,
+    mood.today AS mood_today, mood.today_emoji AS emoji_today,
+    agg.mood_days, agg.mood_score_total * 1.0 / NULLIF(agg.mood_days, 0) AS avg_mood,
+    week.pomodoro_today, week.pomodoro_today_time,
+    agg.pomodoro_count, agg.pomodoro_minutes AS pomodoro_total_time,
+    week.pomodoro_week_days,
+    agg.achievements_count
+'''
+
+USER_SNAPSHOT_SQL = f'''
+    WITH
+    week AS (
+        SELECT {SNAPSHOT_WEEK_COLUMNS}
+        FROM daily_rollup WHERE user_id = :user_id AND date >= :week_start
+    ),
+    mood AS (
+        SELECT MAX(mood) AS today, MAX(emoji) AS today_emoji
+        FROM mood_tracking WHERE user_id = :user_id AND date = :today
+    ),
+    mood_week AS (
+        SELECT group_concat(mood, char(31)) AS moods FROM (
+            SELECT mood, COUNT(*) AS count FROM mood_tracking
+            WHERE user_id = :user_id AND date >= :week_start
+            GROUP BY mood ORDER BY count DESC, mood
+        )
+    ),
+    recent_achievements AS (
+        SELECT group_concat(template, char(31)) AS items FROM (
+            SELECT c.template FROM user_achievements AS ua
+            JOIN achievement_catalog AS c ON c.id = ua.achievement_id
+            WHERE ua.user_id = :user_id
+            ORDER BY ua.last_at DESC, ua.achievement_id DESC
+            LIMIT :achievements_limit
+        )
+    )
+    SELECT {SNAPSHOT_COLUMNS}, mood_week.moods AS mood_week, recent_achievements.items AS recent_achievements
+    FROM (SELECT :user_id AS user_id) AS requested
+    LEFT JOIN users u ON u.user_id = requested.user_id
+    LEFT JOIN user_aggregates agg ON agg.user_id = requested.user_id
+    CROSS JOIN week, mood, mood_week, recent_achievements
+'''
+
+# Снимок для всех пользователей из временной таблицы bulk_users: по одному запросу на пачку,
+# списки (настроения недели, последние достижения) собираются отдельными запросами с ORDER BY
+BULK_SNAPSHOT_SQL = f'''
+    WITH
+    week AS (
+        SELECT user_id, {SNAPSHOT_WEEK_COLUMNS}
+        FROM daily_rollup
+        WHERE user_id IN (SELECT user_id FROM bulk_users) AND date >= :week_start
+        GROUP BY user_id
+    ),
+    mood AS (
+        SELECT user_id, MAX(mood) AS today, MAX(emoji) AS today_emoji
+        FROM mood_tracking
+        WHERE user_id IN (SELECT user_id FROM bulk_users) AND date = :today
+        GROUP BY user_id
+    )
+    SELECT requested.user_id, {SNAPSHOT_COLUMNS}
+    FROM bulk_users AS requested
+    LEFT JOIN users u ON u.user_id = requested.user_id
+    LEFT JOIN user_aggregates agg ON agg.user_id = requested.user_id
+    LEFT JOIN week ON week.user_id = requested.user_id
+    LEFT JOIN mood ON mood.user_id = requested.user_id
+'''
+
+BULK_MOOD_WEEK_SQL = '''
+    SELECT user_id, mood, COUNT(*) AS count FROM mood_tracking
+    WHERE user_id IN (SELECT user_id FROM bulk_users) AND date >= :week_start
+    GROUP BY user_id, mood
+    ORDER BY user_id, count DESC, mood
+'''
+
+BULK_ACHIEVEMENTS_SQL = '''
+    SELECT ua.user_id, c.template FROM user_achievements AS ua
+    JOIN achievement_catalog AS c ON c.id = ua.achievement_id
+    WHERE ua.user_id IN (SELECT user_id FROM bulk_users)
+    ORDER BY ua.user_id, ua.last_at DESC, ua.achievement_id DESC
+'''
+
+def _split_list(value: Optional[str]) -> List[str]:
+    return value.split('\x1f') if value else []
+
+def _chunks(values: Iterable[int], size: int) -> Iterator[List[int]]:
+    iterator = iter(values)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _streaks_from_rows(rows: Dict[str, sqlite3.Row]) -> Dict[str, Any]:
+    result = {}
+    for metric in STREAK_METRICS:
+        row = rows.get(metric)
+        result[f'{metric}_streak'] = row['streak'] if row else 0
+        result[f'best_{metric}_streak'] = row['best_streak'] if row else 0
+    return result
+
+@dataclass
+class UserSnapshot:
+    user_id: int
+    created_at: Optional[str] = None
+    last_active: Optional[str] = None
+    streak_days: int = 0
+    water_today: int = 0
+    water_total: int = 0
+    water_week_days: int = 0
+    water_week_avg: float = 0
+    sleep_hours: float = 0.0
+    sleep_quality: int = 0
+    sleep_week_avg_hours: float = 0
+    sleep_week_avg_quality: float = 0
+    steps_today: int = 0
+    steps_total: int = 0
+    workout_today: int = 0
+    steps_week_avg: float = 0
+    active_days_week: int = 0
+    mood_today: Optional[str] = None
+    emoji_today: Optional[str] = None
+    mood_days: int = 0
+    avg_mood: float = 0
+    mood_week: List[str] = field(default_factory=list)
+    pomodoro_today: int = 0
+    pomodoro_today_time: int = 0
+    pomodoro_count: int = 0
+    pomodoro_total_time: int = 0
+    pomodoro_week_days: int = 0
+    achievements_count: int = 0
+    recent_achievements: List[str] = field(default_factory=list)
+    
+    @classmethod
+    def from_row(cls, user_id: int, row: sqlite3.Row) -> 'UserSnapshot':
+        values = {key: value for key, value in zip(row.keys(), row) if value is not None and key != 'user_id'}
+        values['mood_week'] = _split_list(values.get('mood_week'))
+        values['recent_achievements'] = _split_list(values.get('recent_achievements'))
+        if 'avg_mood' in values:
+            values['avg_mood'] = round(values['avg_mood'], 2)
+        return cls(user_id=user_id, **values)
+    
+    def to_user_data(self) -> Dict[str, Any]:
+        return {
+            'user_id': self.user_id,
+            'created_at': self.created_at,
+            'last_active': self.last_active,
+            'streak_days': self.streak_days,
+            'water_today': self.water_today,
+            'water_total': self.water_total,
+            'sleep_hours': self.sleep_hours,
+            'steps_today': self.steps_today,
+            'mood_today': self.mood_today,
+            'emoji_today': self.emoji_today,
+            'pomodoro_today': self.pomodoro_today,
+            'pomodoro_count': self.pomodoro_count,
+        }
+    
+    def to_comprehensive_data(self) -> Dict[str, Any]:
+        data = self.to_user_data()
+        data.update({
+            'pomodoro_time': self.pomodoro_today_time,
+            'avg_mood': self.avg_mood,
+            'mood_days': self.mood_days,
+        })
+        return data
+    
+    def to_overview(self) -> Dict[str, Any]:
+        return {
+            'water': {
+                'today': self.water_today,
+                'total': self.water_total,
+                'days_with_goal': self.water_week_days,
+                'avg_amount': self.water_week_avg,
+            },
+            'sleep': {
+                'today_hours': self.sleep_hours,
+                'today_quality': self.sleep_quality,
+                'avg_hours': self.sleep_week_avg_hours,
+                'avg_quality': self.sleep_week_avg_quality,
+            },
+            'activity': {
+                'today_steps': self.steps_today,
+                'avg_steps': int(self.steps_week_avg),
+                'total_steps': self.steps_total,
+                'active_days': self.active_days_week,
+                'today_workout': self.workout_today,
+            },
+            'mood': {
+                'today_mood': self.mood_today,
+                'today_emoji': self.emoji_today,
+                'days_with_mood': self.mood_days,
+                'mood_history': self.mood_week,
+            },
+            'pomodoro': {
+                'today_completed': self.pomodoro_today,
+                'total_completed': self.pomodoro_count,
+                'total_time': self.pomodoro_total_time,
+                'days_with_pomodoro': self.pomodoro_week_days,
+            },
+            'streak_days': self.streak_days,
+            'last_active': self.last_active,
+            'achievements': self.recent_achievements,
+        }
+
+class ConnectionPool:
+    def __init__(self, db_path: str, size: int = 5, timeout: float = 30.0, pragmas: Optional[Dict[str, Any]] = None):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.pragmas = pragmas or {}
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        # timeout задает и busy_timeout SQLite: ожидание блокировки записи равно ожиданию соединения из пула.
+        # busy_timeout в pragmas переопределил бы его, поэтому в профилях хранения его нет
+        conn = sqlite3.connect(
+            self.db_path, timeout=self.timeout, check_same_thread=False,
+            factory=ProfilingConnection, cached_statements=DB_STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        # REPLACE должен вызывать DELETE-триггеры, иначе счетчики user_aggregates разъедутся
+        conn.execute('PRAGMA recursive_triggers = ON')
+        return conn
+    
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError('Пул соединений закрыт')
+            if len(self._connections) < self.size:
+                conn = self._create_connection()
+                self._connections.append(conn)
+                return conn
+        
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f'Нет свободных соединений в пуле за {self.timeout} с')
+    
+    def acquire(self) -> Tuple[sqlite3.Connection, bool]:
+        # Вложенные вызовы в том же потоке получают то же соединение и ту же транзакцию
+        local = self._local
+        if getattr(local, 'depth', 0):
+            local.depth += 1
+            return local.conn, False
+        
+        local.conn = self._checkout()
+        local.depth = 1
+        return local.conn, True
+    
+    def release(self, conn: sqlite3.Connection) -> None:
+        local = self._local
+        local.depth -= 1
+        if local.depth:
+            return
+        
+        local.conn = None
+        with self._lock:
+            if self._closed:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+                conn.close()
+                return
+        self._idle.put(conn)
+    
+    def close_all(self) -> None:
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if conn in self._connections:
+                    self._connections.remove(conn)
+                conn.close()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': self.size,
+            'open': len(self._connections),
+            'idle': self._idle.qsize(),
+        }
+
+def reads_own_writes(method):
+    # Перед чтением сбрасываем отложенные записи этого пользователя, чтобы он видел свои изменения
+    @functools.wraps(method)
+    def wrapper(self, user_id: int, *args, **kwargs):
+        if self.write_behind and self.write_behind.has_pending(user_id):
+            self.write_behind.flush()
+        return method(self, user_id, *args, **kwargs)
+    return wrapper
+
+def _sum_water(previous: tuple, current: tuple) -> tuple:
+    user_id, date, amount = previous
+    return user_id, date, amount + current[2]
+
+def _merge_achievement(previous: tuple, current: tuple) -> tuple:
+    user_id, achievement, first_at, last_at, count = previous
+    return user_id, achievement, min(first_at, current[2]), max(last_at, current[3]), count + current[4]
 
 class DatabaseManager:
-    def __init__(self, db_path: str = 'yaprosb_bot.db'):
+    def __init__(self, db_path: str = DB_PATH, pool_size: int = DB_POOL_SIZE, pool_timeout: float = DB_POOL_TIMEOUT,
+                 pragmas: Optional[Dict[str, Any]] = None, write_behind: bool = DB_WRITE_BEHIND):
         self.db_path = db_path
+        self.pool = ConnectionPool(db_path, pool_size, pool_timeout, DB_PRAGMAS if pragmas is None else pragmas)
         self.init_database()
+        self.write_behind = WriteBehindQueue(
+            self.get_connection, DB_WRITE_BEHIND_INTERVAL_MS, DB_WRITE_BEHIND_MAX_EVENTS
+        ) if write_behind else None
     
     @contextmanager
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn, outermost = self.pool.acquire()
         try:
             yield conn
-            conn.commit()
+            if outermost:
+                conn.commit()
         except Exception:
-            conn.rollback()
+            if outermost:
+                conn.rollback()
             raise
         finally:
-            conn.close()
+            self.pool.release(conn)
+    
+    def flush_pending_writes(self) -> int:
+        return self.write_behind.flush() if self.write_behind else 0
+    
+    def close_connections(self) -> None:
+        if self.write_behind:
+            self.write_behind.close()
+        self.pool.close_all()
     
-    def init_database(self):
+    def init_database(self) -> List[int]:
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    streak_days INTEGER DEFAULT 0
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS water_tracking (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    date DATE,
-                    amount INTEGER DEFAULT 0,
-                    goal_reached BOOLEAN DEFAULT 0,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id),
-                    UNIQUE(user_id, date)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sleep_tracking (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    date DATE,
-                    hours REAL,
-                    quality INTEGER CHECK(quality >= 1 AND quality <= 5),
-                    goal_reached BOOLEAN DEFAULT 0,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id),
-                    UNIQUE(user_id, date)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS activity_tracking (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    date DATE,
-                    steps INTEGER DEFAULT 0,
-                    workout_minutes INTEGER DEFAULT 0,
-                    goal_reached BOOLEAN DEFAULT 0,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id),
-                    UNIQUE(user_id, date)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mood_tracking (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    date DATE,
-                    mood TEXT,
-                    emoji TEXT,
-                    note TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id),
-                    UNIQUE(user_id, date)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS pomodoro_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    date DATE,
-                    duration INTEGER,
-                    session_type TEXT CHECK(session_type IN ('work', 'break')),
-                    completed BOOLEAN DEFAULT 0,
-                    actual_duration INTEGER,
-                    task_description TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS habits (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    name TEXT NOT NULL,
-                    description TEXT,
-                    frequency TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS habit_completions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    habit_id INTEGER,
-                    date DATE,
-                    completed BOOLEAN DEFAULT 0,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id),
-                    FOREIGN KEY (habit_id) REFERENCES habits (id),
-                    UNIQUE(user_id, habit_id, date)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS goals (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    name TEXT NOT NULL,
-                    description TEXT,
-                    deadline DATE,
-                    progress INTEGER DEFAULT 0,
-                    status TEXT DEFAULT 'active',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS achievements (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    achievement TEXT NOT NULL,
-                    category TEXT,
-                    date DATE,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS meditation_tracking (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    date DATE,
-                    duration INTEGER,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS breathing_practices (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    date DATE,
-                    duration INTEGER,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS workout_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    date DATE,
-                    workout_type TEXT,
-                    duration INTEGER,
-                    calories INTEGER,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS sos_usage (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    date DATE,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mood_notes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    date DATE,
-                    note TEXT,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
+            applied = migrate(conn, online=DB_MIGRATION_MODE == 'online', batch_size=DB_MIGRATION_BATCH_SIZE)
+            sync_achievement_catalog(conn, ACHIEVEMENT_CATALOG)
+            return applied
+    
+    def get_schema_version(self) -> int:
+        with self.get_connection() as conn:
+            return get_schema_version(conn)
+    
+    def create_backup(self, backup_dir: str = BACKUP_DIR, wait: bool = False) -> str:
+        # Копия идет через отдельное соединение и не занимает пул; проверка целостности - в фоне
+        self.flush_pending_writes()
+        snapshot_path = create_snapshot(self.db_path, backup_dir)
+        verification = verify_in_background(snapshot_path)
+        if wait:
+            verification.join()
+        return snapshot_path
     
     def ensure_user_exists(self, user_id: int) -> None:
         with self.get_connection() as conn:
@@ -213,116 +426,200 @@ class DatabaseManager:
                 UPDATE users SET last_active = CURRENT_TIMESTAMP WHERE user_id = ?
             ''', (user_id,))
     
-    def get_user_data(self, user_id: int) -> Dict[str, Any]:
+    @reads_own_writes
+    def get_user_snapshot(self, user_id: int, achievements_limit: int = 5) -> UserSnapshot:
+        today = datetime.date.today()
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
-            user_row = cursor.fetchone()
-            user_info = dict(user_row) if user_row else {}
-            
-            today = datetime.date.today().isoformat()
-            
-            cursor.execute('SELECT amount FROM water_tracking WHERE user_id = ? AND date = ?', (user_id, today))
-            water_row = cursor.fetchone()
-            water_today = water_row['amount'] if water_row else 0
-            
-            cursor.execute('SELECT hours FROM sleep_tracking WHERE user_id = ? AND date = ?', (user_id, today))
-            sleep_row = cursor.fetchone()
-            sleep_hours = sleep_row['hours'] if sleep_row else 0.0
-            
-            cursor.execute('SELECT steps FROM activity_tracking WHERE user_id = ? AND date = ?', (user_id, today))
-            activity_row = cursor.fetchone()
-            steps_today = activity_row['steps'] if activity_row else 0
-            
-            cursor.execute('SELECT mood, emoji FROM mood_tracking WHERE user_id = ? AND date = ?', (user_id, today))
-            mood_row = cursor.fetchone()
-            mood_today = mood_row['mood'] if mood_row else None
-            emoji_today = mood_row['emoji'] if mood_row else None
-            
-            cursor.execute('''
-                SELECT COUNT(*) as count, SUM(duration) as total_time 
-                FROM pomodoro_sessions 
-                WHERE user_id = ? AND date = ? AND completed = 1
-            ''', (user_id, today))
-            pomodoro_row = cursor.fetchone()
-            pomodoro_today = pomodoro_row['count'] if pomodoro_row else 0
-            
-            cursor.execute('''
-                SELECT COUNT(*) as total_count, SUM(duration) as total_time 
-                FROM pomodoro_sessions 
-                WHERE user_id = ?
-            ''', (user_id,))
-            pomodoro_total_row = cursor.fetchone()
-            pomodoro_count = pomodoro_total_row['total_count'] if pomodoro_total_row else 0
-            
-            return {
+            cursor.execute(USER_SNAPSHOT_SQL, {
                 'user_id': user_id,
-                'created_at': user_info.get('created_at'),
-                'last_active': user_info.get('last_active'),
-                'streak_days': user_info.get('streak_days', 0),
-                'water_today': water_today,
-                'water_total': self._get_total_water(user_id),
-                'sleep_hours': sleep_hours,
-                'steps_today': steps_today,
-                'mood_today': mood_today,
-                'emoji_today': emoji_today,
-                'pomodoro_today': pomodoro_today,
-                'pomodoro_count': pomodoro_count,
-            }
+                'today': today.isoformat(),
+                'week_start': (today - datetime.timedelta(days=7)).isoformat(),
+                'achievements_limit': achievements_limit,
+            })
+            return UserSnapshot.from_row(user_id, cursor.fetchone())
+    
+    def _load_bulk_users(self, cursor: sqlite3.Cursor, user_ids: List[int]) -> None:
+        # Временная таблица живет в соединении пула; запись в нее не блокирует основную базу
+        cursor.execute('CREATE TEMP TABLE IF NOT EXISTS bulk_users (user_id INTEGER PRIMARY KEY)')
+        cursor.execute('DELETE FROM bulk_users')
+        cursor.executemany('INSERT OR IGNORE INTO bulk_users (user_id) VALUES (?)', ((user_id,) for user_id in user_ids))
+    
+    def _flush_for(self, user_ids: List[int]) -> None:
+        if self.write_behind and any(self.write_behind.has_pending(user_id) for user_id in user_ids):
+            self.write_behind.flush()
+    
+    def iter_user_ids(self) -> Iterator[int]:
+        # Keyset по первичному ключу: соединение не держится, пока вызывающий обрабатывает пачку
+        last = -2 ** 63
+        while True:
+            with self.get_connection() as conn:
+                rows = conn.execute('''
+                    SELECT user_id FROM users
+                    WHERE user_id > ?
+                    ORDER BY user_id
+                    LIMIT ?
+                ''', (last, DB_BULK_CHUNK_SIZE)).fetchall()
+            if not rows:
+                return
+            for (user_id,) in rows:
+                yield user_id
+            last = rows[-1][0]
+    
+    def get_user_snapshots_many(self, user_ids: Iterable[int], achievements_limit: int = 5) -> Iterator[UserSnapshot]:
+        # Пачками по DB_BULK_CHUNK_SIZE: один набор запросов на пачку вместо набора на каждого пользователя
+        today = datetime.date.today()
+        params = {
+            'today': today.isoformat(),
+            'week_start': (today - datetime.timedelta(days=7)).isoformat(),
+        }
+        for chunk in _chunks(user_ids, DB_BULK_CHUNK_SIZE):
+            self._flush_for(chunk)
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                self._load_bulk_users(cursor, chunk)
+                snapshots = {
+                    row['user_id']: UserSnapshot.from_row(row['user_id'], row)
+                    for row in cursor.execute(BULK_SNAPSHOT_SQL, params)
+                }
+                for row in cursor.execute(BULK_MOOD_WEEK_SQL, params):
+                    snapshots[row['user_id']].mood_week.append(row['mood'])
+                if achievements_limit > 0:
+                    for row in cursor.execute(BULK_ACHIEVEMENTS_SQL):
+                        recent = snapshots[row['user_id']].recent_achievements
+                        if len(recent) < achievements_limit:
+                            recent.append(row['template'])
+            for user_id in dict.fromkeys(chunk):
+                yield snapshots[user_id]
     
-    def _get_total_water(self, user_id: int) -> int:
+    def get_user_data_many(self, user_ids: Iterable[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for snapshot in self.get_user_snapshots_many(user_ids, achievements_limit=0):
+            yield snapshot.user_id, snapshot.to_user_data()
+    
+    def _get_aggregates(self, cursor: sqlite3.Cursor, user_id: int) -> Dict[str, Any]:
+        cursor.execute('SELECT * FROM user_aggregates WHERE user_id = ?', (user_id,))
+        row = cursor.fetchone()
+        if row:
+            return dict(row)
+        return {column: 0 for column in AGGREGATE_COLUMNS}
+    
+    def rebuild_daily_rollup(self) -> int:
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT SUM(amount) as total FROM water_tracking WHERE user_id = ?', (user_id,))
-            result = cursor.fetchone()
-            return result['total'] if result and result['total'] else 0
+            return rebuild_daily_rollup(conn, ROLLUP_SOURCES)
+    
+    def compact_storage(self, retention_days: int = RETENTION_DAYS, vacuum_pages: int = RETENTION_VACUUM_PAGES,
+                        full_vacuum: bool = False) -> Dict[str, int]:
+        self.flush_pending_writes()
+        with self.get_connection() as conn:
+            stats = compact(conn, retention_days, RETENTION_BATCH_SIZE)
+        freed = self.reclaim_space(vacuum_pages, full_vacuum)
+        if freed is None:
+            stats['needs_vacuum'] = 1
+        else:
+            stats['freed_pages'] = freed
+        return stats
+    
+    def reclaim_space(self, pages: int = RETENTION_VACUUM_PAGES, full_vacuum: bool = False) -> Optional[int]:
+        # Отдельное соединение в autocommit: VACUUM и incremental_vacuum не работают внутри транзакции.
+        # None - база не в режиме INCREMENTAL, а полная пересборка не разрешена
+        conn = sqlite3.connect(self.db_path, timeout=self.pool.timeout, isolation_level=None)
+        try:
+            free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                # Перевод старой базы в INCREMENTAL - полная пересборка файла под эксклюзивной блокировкой,
+                # поэтому только по явной команде (manage.py compact), не из фоновой задачи бота
+                if not full_vacuum:
+                    return None
+                conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                conn.execute('VACUUM')
+            else:
+                # Прагма освобождает по странице за шаг, а execute() делает только первый шаг
+                conn.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+            return free - conn.execute('PRAGMA freelist_count').fetchone()[0]
+        finally:
+            conn.close()
+    
+    def rebuild_aggregates(self) -> int:
+        with self.get_connection() as conn:
+            return rebuild_aggregates(conn, AGGREGATE_SOURCES)
+    
+    @reads_own_writes
+    def get_user_data(self, user_id: int) -> Dict[str, Any]:
+        return self.get_user_snapshot(user_id).to_user_data()
     
     def update_water_intake(self, user_id: int, date: str, amount: int) -> None:
+        if self.write_behind:
+            self.write_behind.submit(user_id, self._write_water_intake, (user_id, date, amount),
+                                     key=('water', user_id, date), merge=_sum_water)
+            return
+        self._write_water_intake(user_id, date, amount)
+    
+    def _write_water_intake(self, user_id: int, date: str, amount: int) -> None:
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT amount FROM water_tracking WHERE user_id = ? AND date = ?', (user_id, date))
-            current_row = cursor.fetchone()
-            
-            if current_row:
-                new_amount = current_row['amount'] + amount
-                cursor.execute('''
-                    UPDATE water_tracking 
-                    SET amount = ?, goal_reached = ?
-                    WHERE user_id = ? AND date = ?
-                ''', (new_amount, 1 if new_amount >= 8 else 0, user_id, date))
-            else:
-                cursor.execute('''
-                    INSERT INTO water_tracking (user_id, date, amount, goal_reached)
-                    VALUES (?, ?, ?, ?)
-                ''', (user_id, date, amount, 1 if amount >= 8 else 0))
+            cursor.execute('''
+                INSERT INTO water_tracking (user_id, date, amount, goal_reached)
+                VALUES (:user_id, :date, :amount, :amount >= 8)
+                ON CONFLICT(user_id, date) DO UPDATE SET
+                    amount = amount + excluded.amount,
+                    goal_reached = amount + excluded.amount >= 8
+                RETURNING goal_reached
+            ''', {'user_id': user_id, 'date': date, 'amount': amount})
+            reached = cursor.fetchone()['goal_reached']
+            
+            self._advance_streak(conn, user_id, 'water', date, bool(reached))
     
     def update_sleep_data(self, user_id: int, date: str, hours: float, quality: int) -> None:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO sleep_tracking (user_id, date, hours, quality, goal_reached)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, date, hours, quality, 1 if hours >= 7 else 0))
+                INSERT INTO sleep_tracking (user_id, date, hours, quality, goal_reached)
+                VALUES (:user_id, :date, :hours, :quality, :hours >= 7)
+                ON CONFLICT(user_id, date) DO UPDATE SET
+                    hours = excluded.hours,
+                    quality = excluded.quality,
+                    goal_reached = excluded.goal_reached
+            ''', {'user_id': user_id, 'date': date, 'hours': hours, 'quality': quality})
+            
+            self._advance_streak(conn, user_id, 'sleep', date, hours >= 7)
     
     def update_activity_data(self, user_id: int, date: str, steps: int, workout_minutes: int) -> None:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO activity_tracking (user_id, date, steps, workout_minutes, goal_reached)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, date, steps, workout_minutes, 1 if steps >= 10000 else 0))
+                INSERT INTO activity_tracking (user_id, date, steps, workout_minutes, goal_reached)
+                VALUES (:user_id, :date, :steps, :workout_minutes, :steps >= 10000)
+                ON CONFLICT(user_id, date) DO UPDATE SET
+                    steps = excluded.steps,
+                    workout_minutes = excluded.workout_minutes,
+                    goal_reached = excluded.goal_reached
+            ''', {'user_id': user_id, 'date': date, 'steps': steps, 'workout_minutes': workout_minutes})
+            
+            self._advance_streak(conn, user_id, 'activity', date, steps >= 10000)
     
     def update_mood_data(self, user_id: int, date: str, mood: str, emoji: str) -> None:
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            # note не трогаем: заметка к дню переживает смену настроения
             cursor.execute('''
-                INSERT OR REPLACE INTO mood_tracking (user_id, date, mood, emoji)
+                INSERT INTO mood_tracking (user_id, date, mood, emoji)
                 VALUES (?, ?, ?, ?)
+                ON CONFLICT(user_id, date) DO UPDATE SET
+                    mood = excluded.mood,
+                    emoji = excluded.emoji
             ''', (user_id, date, mood, emoji))
     
     def save_pomodoro_session(self, user_id: int, duration: int, session_type: str, completed: bool, 
-                             task_description: str, date: str) -> int:
+                             task_description: str, date: str) -> Optional[int]:
+        args = (user_id, duration, session_type, completed, task_description, date)
+        if self.write_behind:
+            # id сессии появится только после сброса очереди
+            self.write_behind.submit(user_id, self._write_pomodoro_session, args)
+            return None
+        return self._write_pomodoro_session(*args)
+    
+    def _write_pomodoro_session(self, user_id: int, duration: int, session_type: str, completed: bool,
+                                task_description: str, date: str) -> int:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
@@ -331,6 +628,7 @@ class DatabaseManager:
             ''', (user_id, date, duration, session_type, completed, task_description))
             return cursor.lastrowid
     
+    @reads_own_writes
     def get_pomodoro_stats(self, user_id: int) -> Dict[str, Any]:
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -344,20 +642,69 @@ class DatabaseManager:
             ''', (user_id, today))
             today_result = cursor.fetchone()
             
-            cursor.execute('''
-                SELECT COUNT(*) as total_count, SUM(duration) as total_time
-                FROM pomodoro_sessions 
-                WHERE user_id = ?
-            ''', (user_id,))
-            total_result = cursor.fetchone()
+            totals = self._get_aggregates(cursor, user_id)
             
             return {
                 'today_pomodoros': today_result['today_count'],
                 'today_time': today_result['today_time'] or 0,
-                'total_pomodoros': total_result['total_count'],
-                'total_time': total_result['total_time'] or 0,
+                'total_pomodoros': totals['pomodoro_count'],
+                'total_time': totals['pomodoro_minutes'],
             }
     
+    def save_active_pomodoro(self, user_id: int, state: str, deadline: Optional[float], paused_remaining: Optional[float],
+                             task: str, chat_id: int, message_id: int) -> None:
+        # Мимо очереди отложенных записей: состояние таймера должно пережить падение процесса
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO active_pomodoros (user_id, state, deadline, paused_remaining, task, chat_id, message_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    state = excluded.state,
+                    deadline = excluded.deadline,
+                    paused_remaining = excluded.paused_remaining,
+                    task = excluded.task,
+                    chat_id = excluded.chat_id,
+                    message_id = excluded.message_id
+            ''', (user_id, state, deadline, paused_remaining, task, chat_id, message_id))
+    
+    def delete_active_pomodoro(self, user_id: int) -> None:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM active_pomodoros WHERE user_id = ?', (user_id,))
+    
+    def get_active_pomodoros(self) -> List[Dict[str, Any]]:
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM active_pomodoros ORDER BY user_id')
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def complete_overdue_pomodoros(self, now: float, work_seconds: int, break_seconds: int) -> List[Dict[str, Any]]:
+        # Все сессии с истекшим дедлайном: завершенные фазы записываются в pomodoro_sessions,
+        # незавершенный цикл переходит в перерыв - одной транзакцией
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM active_pomodoros WHERE deadline IS NOT NULL AND deadline <= ? ORDER BY user_id', (now,))
+            rows = [advance_overdue_pomodoro(dict(row), now, break_seconds) for row in cursor.fetchall()]
+            
+            minutes = {'work': work_seconds // 60, 'break': break_seconds // 60}
+            cursor.executemany('''
+                INSERT INTO pomodoro_sessions (user_id, date, duration, session_type, completed, task_description)
+                VALUES (?, ?, ?, ?, 1, ?)
+            ''', [
+                (row['user_id'], date, minutes[session_type], session_type, row['task'])
+                for row in rows for session_type, date in row['completed']
+            ])
+            cursor.executemany(
+                'DELETE FROM active_pomodoros WHERE user_id = ?',
+                [(row['user_id'],) for row in rows if row['finished']]
+            )
+            cursor.executemany(
+                'UPDATE active_pomodoros SET state = ?, deadline = ? WHERE user_id = ?',
+                [(row['state'], row['deadline'], row['user_id']) for row in rows if not row['finished']]
+            )
+            return rows
+    
     def create_habit(self, user_id: int, name: str, description: str, frequency: str) -> int:
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -367,6 +714,7 @@ class DatabaseManager:
             ''', (user_id, name, description, frequency))
             return cursor.lastrowid
     
+    @reads_own_writes
     def get_user_habits(self, user_id: int) -> List[Dict[str, Any]]:
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -380,13 +728,23 @@ class DatabaseManager:
             return [dict(row) for row in rows]
     
     def update_habit_status(self, user_id: int, habit_id: int, date: str, completed: bool) -> None:
+        if self.write_behind:
+            self.write_behind.submit(user_id, self._write_habit_status, (user_id, habit_id, date, completed),
+                                     key=('habit', user_id, habit_id, date))
+            return
+        self._write_habit_status(user_id, habit_id, date, completed)
+    
+    def _write_habit_status(self, user_id: int, habit_id: int, date: str, completed: bool) -> None:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO habit_completions (user_id, habit_id, date, completed)
+                INSERT INTO habit_completions (user_id, habit_id, date, completed)
                 VALUES (?, ?, ?, ?)
+                ON CONFLICT(user_id, habit_id, date) DO UPDATE SET
+                    completed = excluded.completed
             ''', (user_id, habit_id, date, completed))
     
+    @reads_own_writes
     def get_habit_statistics(self, user_id: int) -> Dict[str, Any]:
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -417,6 +775,7 @@ class DatabaseManager:
             ''', (user_id, name, description, deadline))
             return cursor.lastrowid
     
+    @reads_own_writes
     def get_user_goals(self, user_id: int) -> List[Dict[str, Any]]:
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -431,6 +790,7 @@ class DatabaseManager:
                 UPDATE goals SET progress = ? WHERE id = ? AND user_id = ?
             ''', (progress, goal_id, user_id))
     
+    @reads_own_writes
     def get_goal_progress(self, user_id: int, goal_id: int) -> int:
         with self.get_connection() as conn:
             cursor = conn.cursor()
@@ -438,71 +798,151 @@ class DatabaseManager:
             result = cursor.fetchone()
             return result['progress'] if result else 0
     
+    @reads_own_writes
     def get_user_achievements(self, user_id: int, limit: int = 20) -> List[str]:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT achievement FROM achievements 
-                WHERE user_id = ? 
-                ORDER BY date DESC 
+                SELECT c.template FROM user_achievements AS ua
+                JOIN achievement_catalog AS c ON c.id = ua.achievement_id
+                WHERE ua.user_id = ?
+                ORDER BY ua.last_at DESC, ua.achievement_id DESC
                 LIMIT ?
             ''', (user_id, limit))
             rows = cursor.fetchall()
-            return [row['achievement'] for row in rows]
+            return [row['template'] for row in rows]
     
-    def add_user_achievement(self, user_id: int, achievement: str, date: str) -> None:
+    @reads_own_writes
+    def get_user_achievements_page(self, user_id: int, limit: int = 10, category: Optional[str] = None,
+                                   after: Optional[Tuple[str, int]] = None) -> Dict[str, Any]:
+        # Keyset-пагинация по (last_at, achievement_id): курсор - ключ последней строки страницы
+        filters = 'AND c.category = :category' if category else ''
+        params = {'user_id': user_id, 'category': category, 'limit': limit + 1}
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO achievements (user_id, achievement, date)
-                VALUES (?, ?, ?)
-            ''', (user_id, achievement, date))
-    
-    def get_water_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
-        end_date = datetime.date.today()
-        start_date = end_date - datetime.timedelta(days=days-1)
+            total = cursor.execute(f'''
+                SELECT COUNT(*) FROM user_achievements AS ua
+                JOIN achievement_catalog AS c ON c.id = ua.achievement_id
+                WHERE ua.user_id = :user_id {filters}
+            ''', params).fetchone()[0]
+            if after:
+                filters += ' AND (ua.last_at, ua.achievement_id) < (:after_date, :after_id)'
+                params.update(after_date=after[0], after_id=after[1])
+            cursor.execute(f'''
+                SELECT ua.achievement_id AS id, c.code, c.category, c.template AS title,
+                       ua.count, ua.first_at, ua.last_at
+                FROM user_achievements AS ua
+                JOIN achievement_catalog AS c ON c.id = ua.achievement_id
+                WHERE ua.user_id = :user_id {filters}
+                ORDER BY ua.last_at DESC, ua.achievement_id DESC
+                LIMIT :limit
+            ''', params)
+            items = [dict(row) for row in cursor.fetchall()]
         
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = (items[-1]['last_at'], items[-1]['id'])
+        return {'items': items, 'total': total, 'next_cursor': next_cursor}
+    
+    def add_user_achievement(self, user_id: int, code: str, date: str) -> None:
+        args = (user_id, achievement_id(code), date, date, 1)
+        if self.write_behind:
+            self.write_behind.submit(user_id, self._write_achievement, args,
+                                     key=('achievement', user_id, args[1]), merge=_merge_achievement)
+            return
+        self._write_achievement(*args)
+    
+    def _write_achievement(self, user_id: int, achievement: int, first_at: str, last_at: str, count: int) -> None:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT date, amount, goal_reached 
-                FROM water_tracking 
-                WHERE user_id = ? AND date BETWEEN ? AND ?
-                ORDER BY date DESC
-            ''', (user_id, start_date.isoformat(), end_date.isoformat()))
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+                INSERT INTO user_achievements (user_id, achievement_id, count, first_at, last_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, achievement_id) DO UPDATE SET
+                    count = count + excluded.count,
+                    first_at = MIN(first_at, excluded.first_at),
+                    last_at = MAX(last_at, excluded.last_at)
+            ''', (user_id, achievement, count, first_at, last_at))
     
-    def get_sleep_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+    @reads_own_writes
+    def get_daily_rollup(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
         end_date = datetime.date.today()
         start_date = end_date - datetime.timedelta(days=days-1)
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT date, hours, quality, goal_reached 
-                FROM sleep_tracking 
+                SELECT * FROM daily_rollup
                 WHERE user_id = ? AND date BETWEEN ? AND ?
                 ORDER BY date DESC
             ''', (user_id, start_date.isoformat(), end_date.isoformat()))
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            return [dict(row) for row in cursor.fetchall()]
     
-    def get_activity_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
-        end_date = datetime.date.today()
-        start_date = end_date - datetime.timedelta(days=days-1)
-        
+    def _get_period_rollup(self, user_id: int, period_sql: str, start_date: datetime.date) -> List[Dict[str, Any]]:
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT date, steps, workout_minutes, goal_reached 
-                FROM activity_tracking 
-                WHERE user_id = ? AND date BETWEEN ? AND ?
-                ORDER BY date DESC
-            ''', (user_id, start_date.isoformat(), end_date.isoformat()))
-            rows = cursor.fetchall()
-            return [dict(row) for row in rows]
+            cursor.execute(f'''
+                SELECT {period_sql} AS period,
+                       MIN(date) AS start_date,
+                       MAX(date) AS end_date,
+                       COALESCE(SUM(water), 0) AS water_total,
+                       AVG(water) AS water_avg,
+                       AVG(sleep_hours) AS sleep_avg_hours,
+                       AVG(sleep_quality) AS sleep_avg_quality,
+                       COALESCE(SUM(steps), 0) AS steps_total,
+                       AVG(steps) AS steps_avg,
+                       COALESCE(SUM(workout_minutes), 0) AS workout_minutes,
+                       AVG(mood_score) AS mood_avg,
+                       SUM(pomodoros) AS pomodoros,
+                       SUM(pomodoro_minutes) AS pomodoro_minutes,
+                       SUM(meditation_minutes) AS meditation_minutes,
+                       SUM(habits_done) AS habits_done
+                FROM daily_rollup
+                WHERE user_id = ? AND date >= ?
+                GROUP BY period
+                ORDER BY period DESC
+            ''', (user_id, start_date.isoformat()))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    @reads_own_writes
+    def get_weekly_rollup(self, user_id: int, weeks: int = 4) -> List[Dict[str, Any]]:
+        today = datetime.date.today()
+        start_date = today - datetime.timedelta(days=today.weekday() + 7 * (weeks - 1))
+        # Неделя обозначается датой своего понедельника
+        return self._get_period_rollup(user_id, "date(date, '-6 days', 'weekday 1')", start_date)
+    
+    @reads_own_writes
+    def get_monthly_rollup(self, user_id: int, months: int = 6) -> List[Dict[str, Any]]:
+        today = datetime.date.today()
+        month_index = today.year * 12 + today.month - 1 - (months - 1)
+        start_date = datetime.date(month_index // 12, month_index % 12 + 1, 1)
+        return self._get_period_rollup(user_id, "strftime('%Y-%m', date)", start_date)
+    
+    @reads_own_writes
+    def get_water_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        return [
+            {'date': row['date'], 'amount': row['water'], 'goal_reached': int(row['water'] >= 8)}
+            for row in self.get_daily_rollup(user_id, days) if row['water'] is not None
+        ]
+    
+    @reads_own_writes
+    def get_sleep_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        return [
+            {'date': row['date'], 'hours': row['sleep_hours'], 'quality': row['sleep_quality'],
+             'goal_reached': int(row['sleep_hours'] >= 7)}
+            for row in self.get_daily_rollup(user_id, days) if row['sleep_hours'] is not None
+        ]
+    
+    @reads_own_writes
+    def get_activity_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        return [
+            {'date': row['date'], 'steps': row['steps'], 'workout_minutes': row['workout_minutes'],
+             'goal_reached': int(row['steps'] >= 10000)}
+            for row in self.get_daily_rollup(user_id, days) if row['steps'] is not None
+        ]
     
+    @reads_own_writes
     def get_mood_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
         end_date = datetime.date.today()
         start_date = end_date - datetime.timedelta(days=days-1)
@@ -518,22 +958,23 @@ class DatabaseManager:
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
     
+    @reads_own_writes
     def get_mood_statistics(self, user_id: int) -> Dict[str, Any]:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            cursor.execute('SELECT COUNT(*) as days_count FROM mood_tracking WHERE user_id = ?', (user_id,))
-            days_result = cursor.fetchone()
+            totals = self._get_aggregates(cursor, user_id)
             
-            cursor.execute('SELECT mood, COUNT(*) as count FROM mood_tracking WHERE user_id = ? GROUP BY mood ORDER BY count DESC LIMIT 3', (user_id,))
+            cursor.execute('SELECT mood, COUNT(*) as count FROM mood_tracking WHERE user_id = ? GROUP BY mood ORDER BY count DESC, mood LIMIT 3', (user_id,))
             mood_counts = cursor.fetchall()
             
             return {
-                'days_with_mood': days_result['days_count'],
+                'days_with_mood': totals['mood_days'],
                 'most_common_moods': [row['mood'] for row in mood_counts],
                 'total_moods': len(mood_counts),
             }
     
+    @reads_own_writes
     def get_pomodoro_history(self, user_id: int, days: int = 30) -> List[Dict[str, Any]]:
         end_date = datetime.date.today()
         start_date = end_date - datetime.timedelta(days=days-1)
@@ -549,99 +990,74 @@ class DatabaseManager:
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
     
+    @reads_own_writes
     def get_comprehensive_user_data(self, user_id: int) -> Dict[str, Any]:
-        basic_data = self.get_user_data(user_id)
+        return self.get_user_snapshot(user_id).to_comprehensive_data()
+    
+    def _advance_streak(self, conn: sqlite3.Connection, user_id: int, metric: str, date: str, reached: bool) -> None:
+        row = conn.execute(
+            'SELECT current_streak, last_goal_date, best_streak FROM user_streaks WHERE user_id = ? AND metric = ?',
+            (user_id, metric)
+        ).fetchone()
+        last_goal_date = row['last_goal_date'] if row else None
         
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            today = datetime.date.today().isoformat()
-            cursor.execute('''
-                SELECT COUNT(*) as pomodoro_today, SUM(duration) as pomodoro_time
-                FROM pomodoro_sessions 
-                WHERE user_id = ? AND date = ? AND completed = 1
-            ''', (user_id, today))
-            pomodoro_result = cursor.fetchone()
-            basic_data['pomodoro_today'] = pomodoro_result['pomodoro_today'] or 0
-            basic_data['pomodoro_time'] = pomodoro_result['pomodoro_time'] or 0
-            
-            cursor.execute('''
-                SELECT COUNT(*) as pomodoro_count, SUM(duration) as total_time
-                FROM pomodoro_sessions 
-                WHERE user_id = ?
-            ''', (user_id,))
-            pomodoro_total = cursor.fetchone()
-            basic_data['pomodoro_count'] = pomodoro_total['pomodoro_count'] or 0
-            
-            cursor.execute('''
-                SELECT AVG(CASE 
-                    WHEN mood = 'Отлично' THEN 5
-                    WHEN mood = 'Хорошо' THEN 4
-                    WHEN mood = 'Нормально' THEN 3
-                    WHEN mood = 'Не очень' THEN 2
-                    WHEN mood = 'Плохо' THEN 1
-                    ELSE 3
-                END) as avg_mood,
-                COUNT(*) as mood_days
-                FROM mood_tracking 
-                WHERE user_id = ?
-            ''', (user_id,))
-            mood_result = cursor.fetchone()
-            basic_data['avg_mood'] = round(mood_result['avg_mood'], 2) if mood_result['avg_mood'] else 0
-            basic_data['mood_days'] = mood_result['mood_days'] or 0
+        if not reached:
+            # Цель снята с дня внутри текущей серии - редкий случай, пересчитываем по истории
+            if last_goal_date and date <= last_goal_date:
+                recompute_streak(conn, user_id, metric)
+            return
         
-        return basic_data
+        if last_goal_date == date:
+            return
+        if last_goal_date and date < last_goal_date:
+            recompute_streak(conn, user_id, metric)
+            return
+        
+        previous_day = (datetime.date.fromisoformat(date) - datetime.timedelta(days=1)).isoformat()
+        current = row['current_streak'] + 1 if last_goal_date == previous_day else 1
+        best = max(row['best_streak'] if row else 0, current)
+        conn.execute('''
+            INSERT INTO user_streaks (user_id, metric, current_streak, last_goal_date, best_streak)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, metric) DO UPDATE SET
+                current_streak = excluded.current_streak,
+                last_goal_date = excluded.last_goal_date,
+                best_streak = excluded.best_streak
+        ''', (user_id, metric, current, date, best))
     
+    @reads_own_writes
     def get_user_streaks(self, user_id: int) -> Dict[str, Any]:
+        today = datetime.date.today().isoformat()
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT date FROM water_tracking 
-                WHERE user_id = ? AND goal_reached = 1
-                ORDER BY date DESC
-            ''', (user_id,))
-            water_dates = [row['date'] for row in cursor.fetchall()]
-            
-            cursor.execute('''
-                SELECT date FROM sleep_tracking 
-                WHERE user_id = ? AND goal_reached = 1
-                ORDER BY date DESC
-            ''', (user_id,))
-            sleep_dates = [row['date'] for row in cursor.fetchall()]
-            
             cursor.execute('''
-                SELECT date FROM activity_tracking 
-                WHERE user_id = ? AND goal_reached = 1
-                ORDER BY date DESC
-            ''', (user_id,))
-            activity_dates = [row['date'] for row in cursor.fetchall()]
-            
-            return {
-                'water_streak': self._calculate_streak(water_dates),
-                'sleep_streak': self._calculate_streak(sleep_dates),
-                'activity_streak': self._calculate_streak(activity_dates),
-            }
+                SELECT metric,
+                       CASE WHEN last_goal_date = ? THEN current_streak ELSE 0 END AS streak,
+                       best_streak
+                FROM user_streaks
+                WHERE user_id = ?
+            ''', (today, user_id))
+            return _streaks_from_rows({row['metric']: row for row in cursor.fetchall()})
     
-    def _calculate_streak(self, dates: List[str]) -> int:
-        if not dates:
-            return 0
-        
-        from datetime import datetime, timedelta
-        today = datetime.now().date()
-        
-        streak = 0
-        current_date = today
-        
-        for date_str in dates:
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-            if date_obj == current_date:
-                streak += 1
-                current_date -= timedelta(days=1)
-            elif date_obj < current_date:
-                break
-        
-        return streak
+    def get_user_streaks_many(self, user_ids: Iterable[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        today = datetime.date.today().isoformat()
+        for chunk in _chunks(user_ids, DB_BULK_CHUNK_SIZE):
+            self._flush_for(chunk)
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                self._load_bulk_users(cursor, chunk)
+                cursor.execute('''
+                    SELECT user_id, metric,
+                           CASE WHEN last_goal_date = ? THEN current_streak ELSE 0 END AS streak,
+                           best_streak
+                    FROM user_streaks
+                    WHERE user_id IN (SELECT user_id FROM bulk_users)
+                ''', (today,))
+                rows = {}
+                for row in cursor.fetchall():
+                    rows.setdefault(row['user_id'], {})[row['metric']] = row
+            for user_id in dict.fromkeys(chunk):
+                yield user_id, _streaks_from_rows(rows.get(user_id, {}))
     
     def add_workout_session(self, user_id: int, date: str, workout_type: str, duration: int, calories: int) -> None:
         with self.get_connection() as conn:
@@ -651,22 +1067,15 @@ class DatabaseManager:
                 VALUES (?, ?, ?, ?, ?)
             ''', (user_id, date, workout_type, duration, calories))
     
+    @reads_own_writes
     def get_workout_statistics(self, user_id: int) -> Dict[str, Any]:
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            today = datetime.date.today().isoformat()
-            
-            cursor.execute('SELECT COUNT(*) as total_workouts, SUM(duration) as total_minutes FROM workout_history WHERE user_id = ?', (user_id,))
-            total_result = cursor.fetchone()
-            
-            cursor.execute('SELECT COUNT(DISTINCT date) as days_with_workout FROM workout_history WHERE user_id = ?', (user_id,))
-            days_result = cursor.fetchone()
+            totals = self._get_aggregates(conn.cursor(), user_id)
             
             return {
-                'total_workouts': total_result['total_workouts'] or 0,
-                'total_minutes': total_result['total_minutes'] or 0,
-                'days_with_workout': days_result['days_with_workout'] or 0,
+                'total_workouts': totals['workout_count'],
+                'total_minutes': totals['workout_minutes'],
+                'days_with_workout': totals['workout_days'],
             }
     
     def record_sos_usage(self, user_id: int, date: str) -> None:
@@ -674,28 +1083,17 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute('INSERT INTO sos_usage (user_id, date) VALUES (?, ?)', (user_id, date))
     
+    @reads_own_writes
     def get_mood_patterns(self, user_id: int) -> Dict[str, Any]:
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT date, mood FROM mood_tracking WHERE user_id = ? ORDER BY date', (user_id,))
-            rows = cursor.fetchall()
-            
-            mood_transitions = {}
-            prev_mood = None
-            
-            for row in rows:
-                current_mood = row['mood']
-                if prev_mood and current_mood:
-                    key = f"{prev_mood}→{current_mood}"
-                    mood_transitions[key] = mood_transitions.get(key, 0) + 1
-                prev_mood = current_mood
-            
-            return {
-                'mood_transitions': mood_transitions,
-                'total_records': len(rows),
-            }
+            return mood_patterns(load_history(conn, user_id, metrics=()))
+    
+    @reads_own_writes
+    def get_user_trends(self, user_id: int, days: Optional[int] = 365, window: int = 7) -> Dict[str, Any]:
+        with self.get_connection() as conn:
+            return trend_report(load_history(conn, user_id, days), window)
     
+    @reads_own_writes
     def get_current_mood_data(self, user_id: int) -> Dict[str, Any]:
         today = datetime.date.today().isoformat()
         with self.get_connection() as conn:
@@ -709,6 +1107,7 @@ class DatabaseManager:
                 }
             return {'today_mood': 'Не отмечено', 'today_emoji': ''}
     
+    @reads_own_writes
     def get_current_sleep_data(self, user_id: int) -> Dict[str, Any]:
         today = datetime.date.today().isoformat()
         with self.get_connection() as conn:
@@ -731,32 +1130,24 @@ class DatabaseManager:
                 'avg_quality': avg_row['avg_quality'] or 0.0,
             }
     
+    @reads_own_writes
     def get_physical_health_overview(self, user_id: int) -> Dict[str, Any]:
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT COUNT(*) as days_with_water, SUM(amount) as total_amount FROM water_tracking WHERE user_id = ?', (user_id,))
-            water_result = cursor.fetchone()
-            
-            cursor.execute('SELECT COUNT(*) as days_with_sleep, AVG(hours) as avg_hours FROM sleep_tracking WHERE user_id = ?', (user_id,))
-            sleep_result = cursor.fetchone()
-            
-            cursor.execute('SELECT COUNT(*) as days_with_activity, AVG(steps) as avg_steps, SUM(steps) as total_steps FROM activity_tracking WHERE user_id = ?', (user_id,))
-            activity_result = cursor.fetchone()
+            totals = self._get_aggregates(conn.cursor(), user_id)
             
             return {
                 'water': {
-                    'days_with_water': water_result['days_with_water'],
-                    'total_amount': water_result['total_amount'] or 0,
+                    'days_with_water': totals['water_days'],
+                    'total_amount': totals['water_total'],
                 },
                 'sleep': {
-                    'days_with_sleep': sleep_result['days_with_sleep'],
-                    'avg_hours': sleep_result['avg_hours'] or 0.0,
+                    'days_with_sleep': totals['sleep_days'],
+                    'avg_hours': totals['sleep_hours_total'] / totals['sleep_days'] if totals['sleep_days'] else 0.0,
                 },
                 'activity': {
-                    'days_with_activity': activity_result['days_with_activity'],
-                    'avg_steps': int(activity_result['avg_steps'] or 0),
-                    'total_steps': activity_result['total_steps'] or 0,
+                    'days_with_activity': totals['activity_days'],
+                    'avg_steps': totals['steps_total'] // totals['activity_days'] if totals['activity_days'] else 0,
+                    'total_steps': totals['steps_total'],
                 },
             }
     
@@ -764,10 +1155,13 @@ class DatabaseManager:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO mood_notes (user_id, date, note)
+                INSERT INTO mood_notes (user_id, date, note)
                 VALUES (?, ?, ?)
+                ON CONFLICT(user_id, date) DO UPDATE SET
+                    note = excluded.note
             ''', (user_id, date, note))
     
+    @reads_own_writes
     def get_meditation_statistics(self, user_id: int) -> Dict[str, Any]:
         today = datetime.date.today().isoformat()
         with self.get_connection() as conn:
@@ -776,120 +1170,34 @@ class DatabaseManager:
             cursor.execute('SELECT SUM(duration) as today_minutes FROM meditation_tracking WHERE user_id = ? AND date = ?', (user_id, today))
             today_result = cursor.fetchone()
             
-            cursor.execute('SELECT COUNT(*) as total_sessions, SUM(duration) as total_minutes FROM meditation_tracking WHERE user_id = ?', (user_id,))
-            total_result = cursor.fetchone()
+            totals = self._get_aggregates(cursor, user_id)
             
             return {
                 'today_minutes': today_result['today_minutes'] or 0,
-                'total_sessions': total_result['total_sessions'] or 0,
-                'total_minutes': total_result['total_minutes'] or 0,
+                'total_sessions': totals['meditation_sessions'],
+                'total_minutes': totals['meditation_minutes'],
             }
     
+    @reads_own_writes
     def get_user_overview(self, user_id: int) -> Dict[str, Any]:
-        basic_data = self.get_user_data(user_id)
-        
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT COUNT(*) as days_with_goal, AVG(amount) as avg_amount
-                FROM water_tracking 
-                WHERE user_id = ? AND date >= date('now', '-7 days')
-            ''', (user_id,))
-            water_result = cursor.fetchone()
-            
-            cursor.execute('''
-                SELECT AVG(hours) as avg_hours, AVG(quality) as avg_quality
-                FROM sleep_tracking 
-                WHERE user_id = ? AND date >= date('now', '-7 days')
-            ''', (user_id,))
-            sleep_result = cursor.fetchone()
-            
-            cursor.execute('''
-                SELECT AVG(steps) as avg_steps, COUNT(*) as active_days
-                FROM activity_tracking 
-                WHERE user_id = ? AND date >= date('now', '-7 days')
-            ''', (user_id,))
-            activity_result = cursor.fetchone()
-            
-            cursor.execute('''
-                SELECT mood, COUNT(*) as count 
-                FROM mood_tracking 
-                WHERE user_id = ? AND date >= date('now', '-7 days')
-                GROUP BY mood
-                ORDER BY count DESC
-            ''', (user_id,))
-            mood_history = [row['mood'] for row in cursor.fetchall()]
-            
-            cursor.execute('''
-                SELECT COUNT(*) as days_with_pomodoro
-                FROM (SELECT DISTINCT date FROM pomodoro_sessions WHERE user_id = ? AND date >= date('now', '-7 days'))
-            ''', (user_id,))
-            pomodoro_result = cursor.fetchone()
-            
-            cursor.execute('SELECT COUNT(*) as achievements_count FROM achievements WHERE user_id = ?', (user_id,))
-            achievements_result = cursor.fetchone()
-            
-            return {
-                'water': {
-                    'today': basic_data['water_today'],
-                    'total': basic_data['water_total'],
-                    'days_with_goal': water_result['days_with_goal'] or 0,
-                    'avg_amount': water_result['avg_amount'] or 0,
-                },
-                'sleep': {
-                    'today_hours': basic_data['sleep_hours'],
-                    'avg_hours': sleep_result['avg_hours'] or 0,
-                    'avg_quality': sleep_result['avg_quality'] or 0,
-                },
-                'activity': {
-                    'today_steps': basic_data['steps_today'],
-                    'avg_steps': int(activity_result['avg_steps'] or 0),
-                    'total_steps': self._get_total_steps(user_id),
-                    'active_days': activity_result['active_days'] or 0,
-                    'today_workout': 0,  
-                },
-                'mood': {
-                    'today_mood': basic_data['mood_today'],
-                    'today_emoji': basic_data['emoji_today'],
-                    'days_with_mood': self._get_mood_days_count(user_id),
-                    'mood_history': mood_history,
-                },
-                'pomodoro': {
-                    'today_completed': basic_data['pomodoro_today'],
-                    'total_completed': basic_data['pomodoro_count'],
-                    'total_time': self._get_total_pomodoro_time(user_id),
-                    'days_with_pomodoro': pomodoro_result['days_with_pomodoro'] or 0,
-                },
-                'streak_days': basic_data['streak_days'],
-                'last_active': basic_data['last_active'],
-                'achievements': self.get_user_achievements(user_id, 5),
-            }
+        return self.get_user_snapshot(user_id).to_overview()
     
+    @reads_own_writes
     def get_social_overview(self, user_id: int) -> Dict[str, Any]:
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT COUNT(*) as total_pomodoros, SUM(duration) as total_duration FROM pomodoro_sessions WHERE user_id = ?', (user_id,))
-            pomodoro_result = cursor.fetchone()
-            
-            cursor.execute('SELECT COUNT(*) as total_habits FROM habits WHERE user_id = ?', (user_id,))
-            habits_result = cursor.fetchone()
-            
-            cursor.execute('SELECT COUNT(*) as total_goals, COUNT(CASE WHEN status = "completed" THEN 1 END) as completed_goals FROM goals WHERE user_id = ?', (user_id,))
-            goals_result = cursor.fetchone()
+            totals = self._get_aggregates(conn.cursor(), user_id)
             
             return {
                 'pomodoro': {
-                    'total_sessions': pomodoro_result['total_pomodoros'] or 0,
-                    'total_duration': pomodoro_result['total_duration'] or 0,
+                    'total_sessions': totals['pomodoro_count'],
+                    'total_duration': totals['pomodoro_minutes'],
                 },
                 'habits': {
-                    'total_count': habits_result['total_habits'] or 0,
+                    'total_count': totals['habits_count'],
                 },
                 'goals': {
-                    'total_count': goals_result['total_goals'] or 0,
-                    'completed_count': goals_result['completed_goals'] or 0,
+                    'total_count': totals['goals_count'],
+                    'completed_count': totals['goals_completed'],
                 },
             }
     
@@ -914,26 +1222,171 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute('DELETE FROM habits WHERE id = ? AND user_id = ?', (habit_id, user_id))
             cursor.execute('DELETE FROM habit_completions WHERE habit_id = ? AND user_id = ?', (habit_id, user_id))
+
+class HashRing:
+    # Консистентное хеширование: при смене числа шардов переезжает ~1/N пользователей
+    def __init__(self, shards: int, replicas: int = 64):
+        self.shards = shards
+        points = sorted(
+            (self._hash(f'shard-{shard}-{replica}'), shard)
+            for shard in range(shards) for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [shard for _, shard in points]
     
-    def _get_total_steps(self, user_id: int) -> int:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT SUM(steps) as total FROM activity_tracking WHERE user_id = ?', (user_id,))
-            result = cursor.fetchone()
-            return result['total'] or 0
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
     
-    def _get_mood_days_count(self, user_id: int) -> int:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT COUNT(*) as count FROM mood_tracking WHERE user_id = ?', (user_id,))
-            result = cursor.fetchone()
-            return result['count'] or 0
+    def shard_of(self, user_id: Optional[int]) -> int:
+        if user_id is None or self.shards == 1:
+            return 0
+        index = bisect.bisect(self._hashes, self._hash(str(user_id))) % len(self._hashes)
+        return self._owners[index]
+
+class ShardedDatabaseManager:
+    # Тот же API, что у DatabaseManager: методы с первым аргументом user_id уходят в шард пользователя,
+    # глобальные операции выполняются на всех шардах
+    def __init__(self, shard_paths: List[str], pool_size: int = DB_POOL_SIZE, pool_timeout: float = DB_POOL_TIMEOUT,
+                 pragmas: Optional[Dict[str, Any]] = None, write_behind: bool = DB_WRITE_BEHIND):
+        self.ring = HashRing(len(shard_paths))
+        self.shards = [
+            DatabaseManager(path, pool_size, pool_timeout, pragmas, write_behind)
+            for path in shard_paths
+        ]
     
-    def _get_total_pomodoro_time(self, user_id: int) -> int:
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT SUM(duration) as total FROM pomodoro_sessions WHERE user_id = ?', (user_id,))
-            result = cursor.fetchone()
-            return result['total'] or 0
+    def shard_for(self, user_id: int) -> DatabaseManager:
+        return self.shards[self.ring.shard_of(user_id)]
+    
+    def __getattr__(self, name: str):
+        # Вызывается только при первом обращении: готовый метод кладется в экземпляр
+        method = getattr(DatabaseManager, name, None)
+        parameters = list(inspect.signature(method).parameters)[1:2] if callable(method) else []
+        if parameters != ['user_id']:
+            raise AttributeError(f"{name} не привязан к пользователю и не поддерживается для шардов")
+        
+        shards, shard_of = self.shards, self.ring.shard_of
+        
+        def routed(user_id: int, *args, **kwargs):
+            return getattr(shards[shard_of(user_id)], name)(user_id, *args, **kwargs)
+        
+        setattr(self, name, routed)
+        return routed
+    
+    def init_database(self) -> List[int]:
+        return sorted({version for shard in self.shards for version in shard.init_database()})
+    
+    def _routed_many(self, name: str, user_ids: Iterable[int], *args) -> Iterator[Any]:
+        # Каждая пачка раскладывается по шардам; порядок результатов внутри пачки - по шардам
+        for chunk in _chunks(user_ids, DB_BULK_CHUNK_SIZE):
+            by_shard: Dict[int, List[int]] = {}
+            for user_id in chunk:
+                by_shard.setdefault(self.ring.shard_of(user_id), []).append(user_id)
+            for index, shard_ids in sorted(by_shard.items()):
+                yield from getattr(self.shards[index], name)(shard_ids, *args)
+    
+    def get_user_snapshots_many(self, user_ids: Iterable[int], achievements_limit: int = 5) -> Iterator[UserSnapshot]:
+        return self._routed_many('get_user_snapshots_many', user_ids, achievements_limit)
+    
+    def get_user_data_many(self, user_ids: Iterable[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        return self._routed_many('get_user_data_many', user_ids)
+    
+    def get_user_streaks_many(self, user_ids: Iterable[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        return self._routed_many('get_user_streaks_many', user_ids)
+    
+    def get_active_pomodoros(self) -> List[Dict[str, Any]]:
+        return sorted(
+            (row for shard in self.shards for row in shard.get_active_pomodoros()),
+            key=lambda row: row['user_id']
+        )
+    
+    def complete_overdue_pomodoros(self, now: float, work_seconds: int, break_seconds: int) -> List[Dict[str, Any]]:
+        return sorted(
+            (row for shard in self.shards for row in shard.complete_overdue_pomodoros(now, work_seconds, break_seconds)),
+            key=lambda row: row['user_id']
+        )
+    
+    def iter_user_ids(self) -> Iterator[int]:
+        return itertools.chain.from_iterable(shard.iter_user_ids() for shard in self.shards)
+    
+    def get_schema_version(self) -> int:
+        return min(shard.get_schema_version() for shard in self.shards)
+    
+    def create_backup(self, backup_dir: str = BACKUP_DIR, wait: bool = False) -> List[str]:
+        return [shard.create_backup(backup_dir, wait) for shard in self.shards]
+    
+    def compact_storage(self, *args, **kwargs) -> Dict[str, int]:
+        stats = {}
+        for shard in self.shards:
+            for name, value in shard.compact_storage(*args, **kwargs).items():
+                stats[name] = stats.get(name, 0) + value
+        return stats
+    
+    def rebuild_aggregates(self) -> int:
+        return sum(shard.rebuild_aggregates() for shard in self.shards)
+    
+    def rebuild_daily_rollup(self) -> int:
+        return sum(shard.rebuild_daily_rollup() for shard in self.shards)
+    
+    def flush_pending_writes(self) -> int:
+        return sum(shard.flush_pending_writes() for shard in self.shards)
+    
+    def close_connections(self) -> None:
+        for shard in self.shards:
+            shard.close_connections()
+
+# Производные таблицы копируются последними поверх того, что насчитали триггеры шарда:
+# после очистки в них есть история, которой уже нет в исходных таблицах
+DERIVED_TABLES = ('user_aggregates', 'daily_rollup')
+# Общие для всех пользователей таблицы копируются в каждый шард целиком
+SHARED_TABLES = ('retention_horizon',)
+
+def split_database(source_path: str, shard_paths: List[str]) -> List[int]:
+    ring = HashRing(len(shard_paths))
+    for path in shard_paths:
+        shard = DatabaseManager(path, pool_size=1, write_behind=False)
+        try:
+            with shard.get_connection() as conn:
+                if conn.execute('SELECT 1 FROM users LIMIT 1').fetchone():
+                    raise ValueError(f"Шард {path} уже содержит данные")
+        finally:
+            shard.close_connections()
+    
+    source = sqlite3.connect(source_path)
+    try:
+        source.execute('PRAGMA recursive_triggers = ON')
+        source.create_function('shard_of', 1, ring.shard_of, deterministic=True)
+        migrate(source)
+        tables = [
+            name for (name,) in source.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )
+            if name not in DERIVED_TABLES
+            and 'user_id' in [column[1] for column in source.execute(f'PRAGMA table_info({name})')]
+        ] + list(DERIVED_TABLES)
+        
+        users = []
+        for index, path in enumerate(shard_paths):
+            source.execute('ATTACH DATABASE ? AS shard', (path,))
+            try:
+                with source:
+                    for table in tables:
+                        columns = ', '.join(column[1] for column in source.execute(f'PRAGMA main.table_info({table})'))
+                        insert = 'INSERT OR REPLACE' if table in DERIVED_TABLES else 'INSERT'
+                        source.execute(f'''
+                            {insert} INTO shard.{table} ({columns})
+                            SELECT {columns} FROM main.{table} WHERE shard_of(user_id) = ?
+                        ''', (index,))
+                    for table in SHARED_TABLES:
+                        source.execute(f'INSERT OR REPLACE INTO shard.{table} SELECT * FROM main.{table}')
+                users.append(source.execute('SELECT COUNT(*) FROM shard.users').fetchone()[0])
+            finally:
+                source.execute('DETACH DATABASE shard')
+        return users
+    finally:
+        source.close()
 
-db = DatabaseManager()
\ No newline at end of file
+def create_database() -> 'DatabaseManager | ShardedDatabaseManager':
+    if DB_SHARDS > 1:
+        return ShardedDatabaseManager(DB_SHARD_PATHS, pool_size=DB_POOL_SIZE)
+    return DatabaseManager(DB_PATH, pool_size=DB_POOL_SIZE)
\ No newline at end of file
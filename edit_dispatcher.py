@@ -0,0 +1,297 @@
+import heapq
+import asyncio
+import datetime
+import logging
+from collections import OrderedDict, deque
+from itertools import count
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from telegram.error import BadRequest, RetryAfter
+
+from config import (
+    EDIT_GLOBAL_RATE, EDIT_GLOBAL_BURST, EDIT_CHAT_RATE, EDIT_CHAT_BURST, EDIT_CONCURRENCY, EDIT_MEMORY_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+MessageKey = Tuple[int, int]
+
+class TokenBucket:
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: int, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        # Сколько ждать до следующего токена; 0 - можно отправлять сейчас
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+def _retry_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    if isinstance(retry_after, datetime.timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+class EditDispatcher:
+    # Очередь исходящих правок сообщений: одна ожидающая правка на сообщение (новая заменяет старую),
+    # отправка под общим и поканальным token bucket, повтор после RetryAfter.
+    # У каждого чата своя очередь сообщений, чаты с правками лежат в куче по времени, когда их
+    # token bucket разрешит отправку: выбор следующей правки - O(log чатов).
+    # Правка с тем же текстом и клавиатурой, что уже показаны, не отправляется
+    def __init__(self, rate: float = EDIT_GLOBAL_RATE, burst: int = EDIT_GLOBAL_BURST,
+                 chat_rate: float = EDIT_CHAT_RATE, chat_burst: int = EDIT_CHAT_BURST,
+                 concurrency: int = EDIT_CONCURRENCY, memory_size: int = EDIT_MEMORY_SIZE):
+        self.rate = rate
+        self.burst = burst
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.concurrency = concurrency
+        self.memory_size = memory_size
+        self._pending: 'OrderedDict[MessageKey, Dict[str, Any]]' = OrderedDict()
+        self._shown: 'OrderedDict[MessageKey, Tuple[Any, ...]]' = OrderedDict()
+        self._inflight: Dict[MessageKey, asyncio.Task] = {}
+        self._superseded: Set[MessageKey] = set()
+        self._chats: Dict[int, TokenBucket] = {}
+        self._queues: Dict[int, Deque[MessageKey]] = {}
+        self._ready: List[Tuple[float, int, int]] = []
+        self._scheduled: Set[int] = set()
+        self._sequence = count()
+        self._global: Optional[TokenBucket] = None
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._sending: Set[asyncio.Task] = set()
+        self.counters = {'submitted': 0, 'calls': 0, 'sent': 0, 'coalesced': 0, 'unchanged': 0, 'retry_after': 0, 'failed': 0}
+        self.max_depth = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._global = TokenBucket(self.rate, self.burst, loop.time())
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+        # Время в куче - по часам цикла событий: при перезапуске на другом цикле куча строится заново
+        self._ready.clear()
+        self._scheduled.clear()
+        for chat_id in list(self._queues):
+            self._schedule_chat(chat_id, loop.time())
+        self._worker = loop.create_task(self._run())
+
+    def submit(self, bot, chat_id: int, message_id: int, text: str, reply_markup: Any = None,
+               parse_mode: Optional[str] = None) -> bool:
+        # False - правка не нужна: на экране уже этот текст
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not asyncio.get_running_loop():
+            self._start()
+        key = (chat_id, message_id)
+        content = (text, reply_markup, parse_mode)
+        self.counters['submitted'] += 1
+        if key not in self._pending and self._shown.get(key) == content:
+            self.counters['unchanged'] += 1
+            return False
+        if key in self._pending:
+            # Место в очереди сохраняется, устаревшее содержимое заменяется
+            self.counters['coalesced'] += 1
+            self._pending[key].update(bot=bot, content=content)
+        else:
+            now = asyncio.get_running_loop().time()
+            self._pending[key] = {'bot': bot, 'content': content, 'queued_at': now}
+            self._queues.setdefault(chat_id, deque()).append(key)
+            self._schedule_chat(chat_id, now)
+            self.max_depth = max(self.max_depth, len(self._pending))
+        self._wakeup.set()
+        return True
+
+    async def forget(self, chat_id: int, message_id: int) -> None:
+        # Сообщение изменяется в обход очереди: ожидающая правка отменяется, показанный текст неизвестен.
+        # Уже отправляемую правку не отозвать - дожидаемся ее, чтобы она не легла поверх прямой правки,
+        # и не запоминаем и не повторяем ее
+        key = (chat_id, message_id)
+        task = self._inflight.get(key)
+        if task is not None:
+            self._superseded.add(key)
+            await asyncio.wait([task])
+        if self._pending.pop(key, None) is not None:
+            queue = self._queues.get(chat_id)
+            if queue is not None and key in queue:
+                queue.remove(key)
+                if not queue:
+                    del self._queues[chat_id]
+        self._shown.pop(key, None)
+
+    def _remember(self, key: MessageKey, content: Tuple[Any, ...]) -> None:
+        self._shown[key] = content
+        self._shown.move_to_end(key)
+        if len(self._shown) > self.memory_size:
+            self._shown.popitem(last=False)
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.memory_size:
+                self._chats = {chat: bucket for chat, bucket in self._chats.items() if not bucket.is_full(now)}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    def _schedule_chat(self, chat_id: int, now: float) -> None:
+        # Чат попадает в кучу не больше одного раза: ко времени, когда у него появится токен
+        if chat_id in self._scheduled or not self._queues.get(chat_id):
+            return
+        self._scheduled.add(chat_id)
+        ready_at = now + self._chat_bucket(chat_id, now).delay(now)
+        heapq.heappush(self._ready, (ready_at, next(self._sequence), chat_id))
+
+    def _take(self, chat_id: int) -> Optional[MessageKey]:
+        # Первое сообщение чата, которое сейчас не отправляется; очередь пустого чата удаляется
+        queue = self._queues.get(chat_id)
+        if not queue:
+            self._queues.pop(chat_id, None)
+            return None
+        for index, key in enumerate(queue):
+            if key not in self._inflight:
+                del queue[index]
+                if not queue:
+                    del self._queues[chat_id]
+                return key
+        return None
+
+    async def _idle(self, timeout: Optional[float] = None) -> None:
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._ready:
+                await self._idle()
+                continue
+            now = loop.time()
+            wait = max(self._paused_until - now, self._global.delay(now), self._ready[0][0] - now)
+            if wait > 0:
+                await self._idle(wait)
+                continue
+            await self._slots.acquire()
+            now = loop.time()
+            if now < self._paused_until or not self._ready or self._ready[0][0] > now:
+                self._slots.release()
+                continue
+            _, _, chat_id = heapq.heappop(self._ready)
+            self._scheduled.discard(chat_id)
+            key = self._take(chat_id)
+            if key is None:
+                # В чате остались только отправляемые правки: чат вернется в кучу после отправки
+                self._slots.release()
+                continue
+            entry = self._pending.pop(key)
+            if self._shown.get(key) == entry['content']:
+                self.counters['unchanged'] += 1
+                self._slots.release()
+                self._schedule_chat(chat_id, now)
+                continue
+            self._global.take(now)
+            self._chat_bucket(chat_id, now).take(now)
+            self._schedule_chat(chat_id, now)
+            task = self._inflight[key] = loop.create_task(self._send(key, entry))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, key: MessageKey, entry: Dict[str, Any]) -> None:
+        chat_id, message_id = key
+        text, reply_markup, parse_mode = entry['content']
+        self.counters['calls'] += 1
+        try:
+            await entry['bot'].edit_message_text(
+                chat_id=chat_id,
+                message_id=message_id,
+                text=text,
+                reply_markup=reply_markup,
+                parse_mode=parse_mode
+            )
+            self.counters['sent'] += 1
+            if key not in self._superseded:
+                self._remember(key, entry['content'])
+        except RetryAfter as e:
+            # Лимит Telegram общий для бота: пауза для всей очереди, правка возвращается в начало очереди чата
+            self.counters['retry_after'] += 1
+            retry = _retry_seconds(e)
+            self._paused_until = max(self._paused_until, asyncio.get_running_loop().time() + retry)
+            logger.warning(f"Telegram ограничил частоту правок, пауза {retry:.0f} с, в очереди {len(self._pending)}")
+            if key not in self._pending and key not in self._superseded:
+                self._pending[key] = entry
+                self._pending.move_to_end(key, last=False)
+                self._queues.setdefault(chat_id, deque()).appendleft(key)
+        except BadRequest as e:
+            if 'not modified' in str(e).lower():
+                if key not in self._superseded:
+                    self._remember(key, entry['content'])
+            else:
+                self.counters['failed'] += 1
+                self._shown.pop(key, None)
+                logger.error(f"Ошибка при редактировании сообщения {chat_id}/{message_id}: {e}")
+        except Exception as e:
+            self.counters['failed'] += 1
+            logger.error(f"Ошибка при редактировании сообщения {chat_id}/{message_id}: {e}")
+        finally:
+            self._inflight.pop(key, None)
+            self._superseded.discard(key)
+            self._slots.release()
+            self._schedule_chat(chat_id, asyncio.get_running_loop().time())
+            self._wakeup.set()
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            now = asyncio.get_running_loop().time()
+        except RuntimeError:
+            now = self._paused_until
+        oldest = next(iter(self._pending.values()), None)
+        return {
+            'pending': len(self._pending),
+            'max_pending': self.max_depth,
+            'inflight': len(self._inflight),
+            'oldest_wait': round(now - oldest['queued_at'], 1) if oldest else 0.0,
+            'paused_for': round(max(0.0, self._paused_until - now), 1),
+            **self.counters,
+        }
+
+    async def close(self, timeout: float = 5.0) -> None:
+        # Ожидающие правки досылаются в пределах timeout, остальное отбрасывается
+        if self._worker is None:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (self._pending or self._sending) and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        if self._sending:
+            await asyncio.wait(list(self._sending), timeout=max(0.1, deadline - loop.time()))
+        if self._pending:
+            logger.warning(f"Не отправлено правок при остановке: {len(self._pending)}")
+        self._pending.clear()
+        self._queues.clear()
+        self._ready.clear()
+        self._scheduled.clear()
+        self._worker = None
+
+dispatcher = EditDispatcher()
@@ -97,6 +97,12 @@ from .social_handlers import (
     handle_pomodoro_task_text,
     handle_habit_name_text,
     handle_habit_description_text,
+    restore_pomodoro_sessions,
+)
+
+from .admin_handlers import (
+    dbstats_command,
+    editstats_command,
 )
 
 __all__ = [
@@ -199,4 +205,9 @@ __all__ = [
     'handle_pomodoro_task_text',
     'handle_habit_name_text',
     'handle_habit_description_text',
-]
\ No newline at end of file
+    'restore_pomodoro_sessions',
+    
+    # Admin handlers
+    'dbstats_command',
+    'editstats_command',
+]
@@ -0,0 +1,84 @@
+import io
+import logging
+import datetime
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from config import ADMIN_IDS
+from query_profiler import profiler
+from edit_dispatcher import dispatcher
+from pomodoro_timer import scheduler, refresh
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIMIT = 4000
+
+async def _deny_non_admin(update: Update, command: str) -> bool:
+    user = update.effective_user
+    if user.id in ADMIN_IDS:
+        return False
+    logger.warning(f"Пользователь {user.id} запросил /{command} без прав администратора")
+    await update.message.reply_text("⛔ Команда доступна только администраторам")
+    return True
+
+async def dbstats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await _deny_non_admin(update, 'dbstats'):
+        return
+    user = update.effective_user
+
+    action = context.args[0].lower() if context.args else 'top'
+    logger.info(f"Администратор {user.id}: /dbstats {action}")
+
+    if action == 'on':
+        profiler.enabled = True
+        await update.message.reply_text("✅ Профилирование SQL включено (для новых запросов)")
+    elif action == 'off':
+        profiler.enabled = False
+        await update.message.reply_text("⏸ Профилирование SQL выключено, накопленная статистика сохранена")
+    elif action == 'reset':
+        profiler.reset()
+        await update.message.reply_text("🧹 Статистика запросов очищена")
+    elif action == 'csv':
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        await update.message.reply_document(
+            document=io.BytesIO(profiler.to_csv().encode('utf-8')),
+            filename=f'queries-{stamp}.csv',
+            caption="📊 Статистика SQL-запросов",
+        )
+    else:
+        limit = int(action) if action.isdigit() else 10
+        report = profiler.format_report(limit)
+        if len(report) > MESSAGE_LIMIT:
+            report = report[:MESSAGE_LIMIT] + '\n…'
+        await update.message.reply_text(
+            f"📊 *SQL-запросы по суммарному времени*\n```\n{report}\n```\n"
+            f"/dbstats on | off | reset | csv | <N>",
+            parse_mode='Markdown'
+        )
+
+async def editstats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await _deny_non_admin(update, 'editstats'):
+        return
+
+    edits = dispatcher.stats()
+    timers = scheduler.stats()
+    cadence = refresh.stats(edits['calls'])
+    tick = f"каждые {cadence['tick']:.0f} с" if cadence['tick'] else "только при смене фазы"
+    await update.message.reply_text(
+        f"📨 *Очередь правок сообщений*\n"
+        f"• В очереди: {edits['pending']} (максимум {edits['max_pending']}), отправляется: {edits['inflight']}\n"
+        f"• Самая старая ждет: {edits['oldest_wait']} с, пауза Telegram: {edits['paused_for']} с\n"
+        f"• Принято: {edits['submitted']}, запросов к API: {edits['calls']}, отправлено: {edits['sent']}\n"
+        f"• Заменено новыми: {edits['coalesced']}, без изменений: {edits['unchanged']}\n"
+        f"• RetryAfter: {edits['retry_after']}, ошибок: {edits['failed']}\n\n"
+        f"⏱ *Таймеры*: запланировано {timers['scheduled']}, сработало {timers['fired']}\n"
+        f"• Обновление экрана: {tick}\n"
+        f"• Запросов на сессию в минуту: {cadence['calls_per_session_minute']} "
+        f"(лимит {cadence['max_per_minute']:g}, сессий-минут {cadence['session_minutes']})",
+        parse_mode='Markdown'
+    )
+
+__all__ = [
+    'dbstats_command',
+    'editstats_command',
+]
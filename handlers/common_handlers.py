@@ -2,9 +2,8 @@ import os
 import logging
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
-from config import LOGO_PATH
-from database import db  
-from storage import ensure_user  
+from config import LOGO_PATH, ACHIEVEMENTS_PAGE_SIZE
+from async_storage import ensure_user  
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +18,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"Пользователь {user_id} ({username}) запустил бота командой /start")
     
 
-    ensure_user(user_id)
+    await ensure_user(user_id)
     
     welcome_text = f"""
 ✨ *Привет, {username}! Добро пожаловать в YAProSB!* ✨
@@ -170,7 +169,7 @@ async def handle_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
     logger.info(f"Пользователь {user.id} запросил главное меню")
     
-    ensure_user(user.id)
+    await ensure_user(user.id)
     
     menu_text = """
 🏠 *ГЛАВНОЕ МЕНЮ YAProSB*
@@ -395,8 +394,8 @@ async def progress_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     logger.info(f"Пользователь {user_id} запросил свой прогресс")
     
-    from storage import get_all_user_data
-    user_data = get_all_user_data(user_id)
+    from async_storage import get_all_user_data
+    user_data = await get_all_user_data(user_id)
     
     water_today = user_data['water_today']
     water_progress = min(water_today, 8)
@@ -510,8 +509,8 @@ async def challenge_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info(f"Пользователь {user.id} запросил челленджи")
     
 
-    from storage import get_user_data
-    user_data = get_user_data(user_id)
+    from async_storage import get_user_data
+    user_data = await get_user_data(user_id)
     
     challenge_text = f"""
 🎯 *НЕДЕЛЬНЫЕ ЧЕЛЛЕНДЖИ*
@@ -576,8 +575,8 @@ async def detailed_stats_handler(update: Update, context: ContextTypes.DEFAULT_T
     
     user_id = query.from_user.id
     
-    from database import db
-    overview = db.get_user_overview(user_id)
+    from async_storage import get_user_overview
+    overview = await get_user_overview(user_id)
     
     if not overview:
         await query.edit_message_text(
@@ -645,22 +644,38 @@ async def all_achievements_handler(update: Update, context: ContextTypes.DEFAULT
     
     user_id = query.from_user.id
     
-    from storage import get_achievements
-    achievements = get_achievements(user_id, limit=20)
+    # callback_data: all_achievements или all_achievements:<last_at>:<id> - курсор следующей страницы
+    after = None
+    if ':' in query.data:
+        _, last_at, achievement_id = query.data.split(':')
+        after = (last_at, int(achievement_id))
     
-    if not achievements:
+    from async_storage import get_achievements_page
+    page = await get_achievements_page(user_id, limit=ACHIEVEMENTS_PAGE_SIZE, after=after)
+    
+    if not page['total']:
         achievements_text = "🎯 *ТВОИ ДОСТИЖЕНИЯ*\n\nУ тебя пока нет достижений. Начни использовать бота и получи свои первые награды!"
     else:
-        achievements_text = "🎯 *ТВОИ ДОСТИЖЕНИЯ*\n\n"
-        for i, achievement in enumerate(achievements, 1):
-            achievements_text += f"{i}. {achievement}\n"
+        achievements_text = f"🎯 *ТВОИ ДОСТИЖЕНИЯ* ({page['total']})\n\n"
+        for achievement in page['items']:
+            repeats = f" ×{achievement['count']}" if achievement['count'] > 1 else ""
+            achievements_text += f"• {achievement['title']}{repeats}\n"
     
     achievements_text += "\n*💡 Совет:* Достижения разблокируются автоматически при выполнении привычек!"
     
+    navigation = []
+    if after:
+        navigation.append(InlineKeyboardButton("⏮ В НАЧАЛО", callback_data="all_achievements"))
+    if page['next_cursor']:
+        last_at, achievement_id = page['next_cursor']
+        navigation.append(InlineKeyboardButton("ДАЛЬШЕ ➡️", callback_data=f"all_achievements:{last_at}:{achievement_id}"))
+    
     keyboard = [
         [InlineKeyboardButton("📊 МОЙ ПРОГРЕСС", callback_data="progress")],
         [InlineKeyboardButton("🔙 В ГЛАВНОЕ МЕНЮ", callback_data="back_to_main")]
     ]
+    if navigation:
+        keyboard.insert(0, navigation)
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
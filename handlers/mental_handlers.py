@@ -5,7 +5,7 @@ import random
 import logging
 from typing import Optional
 
-from storage import (
+from async_storage import (
     set_mood,
     get_mood_data,
     add_achievement,
@@ -27,10 +27,10 @@ async def mental_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     try:
-        ensure_user(user_id)
+        await ensure_user(user_id)
         
-        user_data = get_user_data(user_id)
-        mood_data = get_mood_data(user_id)
+        user_data = await get_user_data(user_id)
+        mood_data = await get_mood_data(user_id)
         
         mood_today = mood_data.get('today_mood', 'Не отмечено')
         
@@ -39,7 +39,7 @@ async def mental_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 *📊 ТВОЯ СТАТИСТИКА (из БД):*
 • 📅 Настроение сегодня: {mood_today}
-• 🔥 Дней с отметкой настроения: {get_mood_stats(user_id).get('days_with_mood', 0)}
+• 🔥 Дней с отметкой настроения: {(await get_mood_stats(user_id)).get('days_with_mood', 0)}
 
 *🎯 ВЫБЕРИ НАПРАВЛЕНИЕ:*
 
@@ -152,12 +152,12 @@ async def mood_great_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     user_id = query.from_user.id
     try:
-        set_mood(user_id, "Отлично", "😊")
+        await set_mood(user_id, "Отлично", "😊")
         
-        add_achievement(user_id, "😊 Отличное настроение")
+        await add_achievement(user_id, "mood_great")
         
-        mood_stats = get_mood_stats(user_id)
-        mood_history = get_mood_history(user_id, days=7)
+        mood_stats = await get_mood_stats(user_id)
+        mood_history = await get_mood_history(user_id, days=7)
         
         great_days = sum(1 for day in mood_history if day['mood'] == 'Отлично')
         
@@ -222,10 +222,10 @@ async def mood_good_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = query.from_user.id
     try:
-        set_mood(user_id, "Хорошо", "🙂")
+        await set_mood(user_id, "Хорошо", "🙂")
         
-        mood_stats = get_mood_stats(user_id)
-        mood_history = get_mood_history(user_id, days=7)
+        mood_stats = await get_mood_stats(user_id)
+        mood_history = await get_mood_history(user_id, days=7)
         
         good_days = sum(1 for day in mood_history if day['mood'] == 'Хорошо')
         
@@ -290,10 +290,10 @@ async def mood_ok_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = query.from_user.id
     try:
-        set_mood(user_id, "Нормально", "😐")
+        await set_mood(user_id, "Нормально", "😐")
         
-        mood_stats = get_mood_stats(user_id)
-        mood_history = get_mood_history(user_id, days=7)
+        mood_stats = await get_mood_stats(user_id)
+        mood_history = await get_mood_history(user_id, days=7)
         
         days_with_mood = mood_stats.get('days_with_mood', 0)
         ok_days = sum(1 for day in mood_history if day['mood'] == 'Нормально')
@@ -366,10 +366,10 @@ async def mood_bad_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = query.from_user.id
     try:
-        set_mood(user_id, "Не очень", "😕")
+        await set_mood(user_id, "Не очень", "😕")
         
-        mood_stats = get_mood_stats(user_id)
-        mood_history = get_mood_history(user_id, days=7)
+        mood_stats = await get_mood_stats(user_id)
+        mood_history = await get_mood_history(user_id, days=7)
         
         bad_days = sum(1 for day in mood_history if day['mood'] in ['Не очень', 'Плохо'])
         
@@ -451,12 +451,12 @@ async def mood_terrible_handler(update: Update, context: ContextTypes.DEFAULT_TY
     
     user_id = query.from_user.id
     try:
-        set_mood(user_id, "Плохо", "😢")
+        await set_mood(user_id, "Плохо", "😢")
         
-        add_achievement(user_id, "😢 Честно отметил плохое настроение")
+        await add_achievement(user_id, "mood_honest")
         
-        mood_stats = get_mood_stats(user_id)
-        mood_history = get_mood_history(user_id, days=7)
+        mood_stats = await get_mood_stats(user_id)
+        mood_history = await get_mood_history(user_id, days=7)
         
         terrible_days = sum(1 for day in mood_history if day['mood'] == 'Плохо')
         
@@ -515,10 +515,10 @@ async def mood_tired_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     user_id = query.from_user.id
     try:
-        set_mood(user_id, "Устал(а)", "😴")
+        await set_mood(user_id, "Устал(а)", "😴")
         
-        sleep_data = get_sleep_data(user_id)
-        mood_stats = get_mood_stats(user_id)
+        sleep_data = await get_sleep_data(user_id)
+        mood_stats = await get_mood_stats(user_id)
         
         response_text = f"""
 😴 *УСТАЛ(А)*
@@ -576,9 +576,9 @@ async def mood_thoughtful_handler(update: Update, context: ContextTypes.DEFAULT_
     
     user_id = query.from_user.id
     try:
-        set_mood(user_id, "Задумчивый", "🤔")
+        await set_mood(user_id, "Задумчивый", "🤔")
         
-        mood_stats = get_mood_stats(user_id)
+        mood_stats = await get_mood_stats(user_id)
         
         response_text = f"""
 🤔 *ЗАДУМЧИВЫЙ*
@@ -656,11 +656,11 @@ async def mood_calm_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = query.from_user.id
     try:
-        set_mood(user_id, "Спокойный", "😌")
+        await set_mood(user_id, "Спокойный", "😌")
         
-        add_achievement(user_id, "😌 Спокойствие и умиротворение")
+        await add_achievement(user_id, "calm")
         
-        mood_stats = get_mood_stats(user_id)
+        mood_stats = await get_mood_stats(user_id)
         
         response_text = f"""
 😌 *СПОКОЙНЫЙ*
@@ -714,8 +714,8 @@ async def mood_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     user_id = query.from_user.id
     try:
-        mood_stats = get_mood_stats(user_id)
-        mood_history = get_mood_history(user_id, days=7)
+        mood_stats = await get_mood_stats(user_id)
+        mood_history = await get_mood_history(user_id, days=7)
         
         total_days = mood_stats.get('days_with_mood', 0)
         most_common_moods = mood_stats.get('most_common_moods', [])
@@ -771,7 +771,7 @@ async def breathing_practice_handler(update: Update, context: ContextTypes.DEFAU
     
     user_id = query.from_user.id
     try:
-        add_achievement(user_id, "🎭 Выполнил дыхательную практику")
+        await add_achievement(user_id, "breathing")
         
         response_text = """
 🎭 *ДЫХАТЕЛЬНАЯ ПРАКТИКА 4-7-8*
@@ -829,8 +829,8 @@ async def sos_help_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = query.from_user.id
     try:
-        from storage import add_sos_usage
-        add_sos_usage(user_id)
+        from async_storage import add_sos_usage
+        await add_sos_usage(user_id)
         
         response_text = """
 🆘 *SOS ПОМОЩЬ - СРОЧНАЯ ПОДДЕРЖКА*
@@ -895,9 +895,9 @@ async def meditation_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     user_id = query.from_user.id
     try:
-        add_achievement(user_id, "🧘 Попробовал медитацию")
+        await add_achievement(user_id, "meditation")
         
-        meditation_data = get_meditation_data(user_id)
+        meditation_data = await get_meditation_data(user_id)
         
         response_text = f"""
 🧘 *МЕДИТАЦИИ*
@@ -980,9 +980,9 @@ async def handle_mood_note_text(update: Update, context: ContextTypes.DEFAULT_TY
     note_text = update.message.text
     
     try:
-        add_mood_note(user_id, note_text)
+        await add_mood_note(user_id, note_text)
         
-        add_achievement(user_id, "📝 Добавил заметку к настроению")
+        await add_achievement(user_id, "mood_note")
         
         response_text = f"""
 ✅ *ЗАМЕТКА СОХРАНЕНА!*
@@ -1070,11 +1070,11 @@ async def mental_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     
     user_id = query.from_user.id
     try:
-        mood_data = get_mood_data(user_id)
-        mood_stats = get_mood_stats(user_id)
-        meditation_data = get_meditation_data(user_id)
-        sleep_data = get_sleep_data(user_id)
-        workout_data = get_workout_data(user_id)
+        mood_data = await get_mood_data(user_id)
+        mood_stats = await get_mood_stats(user_id)
+        meditation_data = await get_meditation_data(user_id)
+        sleep_data = await get_sleep_data(user_id)
+        workout_data = await get_workout_data(user_id)
         
         stats_text = f"""
 📈 *ПОЛНАЯ СТАТИСТИКА МЕНТАЛЬНОГО ЗДОРОВЬЯ*
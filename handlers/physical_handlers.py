@@ -5,7 +5,7 @@ import random
 import logging
 from typing import Dict, Any
 
-from storage import (
+from async_storage import (
     get_user_data,
     update_water,
     update_sleep,
@@ -94,7 +94,7 @@ async def physical_menu_handler(update: Update, context: ContextTypes.DEFAULT_TY
     
     user_id = query.from_user.id
     try:
-        user_data = get_user_data(user_id)
+        user_data = await get_user_data(user_id)
         
         water_today = user_data['water_today']
         sleep_hours = user_data['sleep_hours']
@@ -171,21 +171,21 @@ async def water_track_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     try:
-        update_water(user_id, 1)
+        await update_water(user_id, 1)
         
-        user_data = get_user_data(user_id)
+        user_data = await get_user_data(user_id)
         water_count = user_data['water_today']
         
         if water_count == 1:
             message = "💧 Первый стакан воды сегодня! Отличное начало!"
-            achievement = "💧 Первый стакан"
+            achievement = "water_first_glass"
         elif water_count == 2:
             message = "💧 Второй стакан! Продолжай в том же духе!"
         elif water_count == 3:
             message = "💧 Третий стакан! Ты на правильном пути!"
         elif water_count == 4:
             message = "💧 Половина нормы! Молодец!"
-            achievement = "💧 Полпути к норме"
+            achievement = "water_halfway"
         elif water_count == 5:
             message = "💧 Пятый стакан! Ты супер!"
         elif water_count == 6:
@@ -194,12 +194,12 @@ async def water_track_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
             message = "💧 Седьмой стакан! Один шаг до цели!"
         elif water_count >= 8:
             message = "💧 Восемь стаканов! Норма выполнена! Поздравляем! 🎉"
-            achievement = "💧 Норма воды выполнена"
+            achievement = "water_goal"
         else:
             message = f"💧 Стакан добавлен! Всего сегодня: {water_count}/8"
         
         if 'achievement' in locals():
-            add_achievement(user_id, achievement)
+            await add_achievement(user_id, achievement)
         
         tip = random.choice(PHYSICAL_TIPS['hydration'])
         
@@ -211,7 +211,7 @@ async def water_track_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 *📊 ТВОЯ СТАТИСТИКА:*
 • 💧 Вода: {water_count}/8 стаканов сегодня
-• 💧 Всего за неделю: {sum([day['amount'] for day in get_water_history(user_id, 7)])} стаканов
+• 💧 Всего за неделю: {sum([day['amount'] for day in await get_water_history(user_id, 7)])} стаканов
 
 *🎯 РЕКОМЕНДАЦИИ:*
 • Пейте воду маленькими глотками
@@ -253,8 +253,8 @@ async def water_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     try:
-        user_data = get_user_data(user_id)
-        water_history = get_water_history(user_id, 7)
+        user_data = await get_user_data(user_id)
+        water_history = await get_water_history(user_id, 7)
         
         total_week = sum([day['amount'] for day in water_history])
         days_with_goal = sum([1 for day in water_history if day['amount'] >= 8])
@@ -267,7 +267,7 @@ async def water_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 • 💧 Всего за неделю: {total_week} стаканов
 • 💧 В среднем в день: {avg_daily:.1f} стаканов
 • 💧 Дней с нормой воды: {days_with_goal}/7
-• 💧 Текущий стрик: {get_streak_data(user_id)['water_streak']} дней
+• 💧 Текущий стрик: {(await get_streak_data(user_id))['water_streak']} дней
 
 *🎯 ТВОЙ ПРОГРЕСС:*
 """
@@ -352,11 +352,11 @@ async def sleep_less5_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     try:
-        update_sleep(user_id, 4.5, 2)  
+        await update_sleep(user_id, 4.5, 2)  
         
-        user_data = get_user_data(user_id)
-        sleep_history = get_sleep_history(user_id, days=7)
-        streak_data = get_streak_data(user_id)
+        user_data = await get_user_data(user_id)
+        sleep_history = await get_sleep_history(user_id, days=7)
+        streak_data = await get_streak_data(user_id)
         
         sleep_tip = random.choice(PHYSICAL_TIPS['sleep'])
         
@@ -415,11 +415,11 @@ async def sleep_5_6_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = query.from_user.id
     try:
-        update_sleep(user_id, 5.5, 3) 
+        await update_sleep(user_id, 5.5, 3) 
         
-        user_data = get_user_data(user_id)
-        sleep_history = get_sleep_history(user_id, days=7)
-        streak_data = get_streak_data(user_id)
+        user_data = await get_user_data(user_id)
+        sleep_history = await get_sleep_history(user_id, days=7)
+        streak_data = await get_streak_data(user_id)
         
         sleep_tip = random.choice(PHYSICAL_TIPS['sleep'])
         
@@ -476,11 +476,11 @@ async def sleep_6_7_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = query.from_user.id
     try:
-        update_sleep(user_id, 6.5, 4)  
+        await update_sleep(user_id, 6.5, 4)  
         
-        user_data = get_user_data(user_id)
-        sleep_history = get_sleep_history(user_id, days=7)
-        streak_data = get_streak_data(user_id)
+        user_data = await get_user_data(user_id)
+        sleep_history = await get_sleep_history(user_id, days=7)
+        streak_data = await get_streak_data(user_id)
         
         sleep_tip = random.choice(PHYSICAL_TIPS['sleep'])
         
@@ -537,15 +537,15 @@ async def sleep_7_8_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = query.from_user.id
     try:
-        update_sleep(user_id, 7.5, 5)  
+        await update_sleep(user_id, 7.5, 5)  
         
-        user_data = get_user_data(user_id)
-        sleep_history = get_sleep_history(user_id, days=7)
-        streak_data = get_streak_data(user_id)
+        user_data = await get_user_data(user_id)
+        sleep_history = await get_sleep_history(user_id, days=7)
+        streak_data = await get_streak_data(user_id)
         
         sleep_tip = random.choice(PHYSICAL_TIPS['sleep'])
         
-        add_achievement(user_id, "😴 Качественный сон 7-8 часов")
+        await add_achievement(user_id, "sleep_quality")
         
         response_text = f"""
 😴 *7-8 часов сна - ОТЛИЧНО!*
@@ -600,15 +600,15 @@ async def sleep_8_9_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = query.from_user.id
     try:
-        update_sleep(user_id, 8.5, 5) 
+        await update_sleep(user_id, 8.5, 5) 
         
-        user_data = get_user_data(user_id)
-        sleep_history = get_sleep_history(user_id, days=7)
-        streak_data = get_streak_data(user_id)
+        user_data = await get_user_data(user_id)
+        sleep_history = await get_sleep_history(user_id, days=7)
+        streak_data = await get_streak_data(user_id)
         
         sleep_tip = random.choice(PHYSICAL_TIPS['sleep'])
         
-        add_achievement(user_id, "😴 Длинный здоровый сон 8-9 часов")
+        await add_achievement(user_id, "sleep_long")
         
         response_text = f"""
 😴 *8-9 часов сна - ПРЕКРАСНО!*
@@ -663,11 +663,11 @@ async def sleep_9plus_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     try:
-        update_sleep(user_id, 10.0, 4)  
+        await update_sleep(user_id, 10.0, 4)  
         
-        user_data = get_user_data(user_id)
-        sleep_history = get_sleep_history(user_id, days=7)
-        streak_data = get_streak_data(user_id)
+        user_data = await get_user_data(user_id)
+        sleep_history = await get_sleep_history(user_id, days=7)
+        streak_data = await get_streak_data(user_id)
         
         sleep_tip = random.choice(PHYSICAL_TIPS['sleep'])
         
@@ -759,7 +759,7 @@ async def steps_less5k_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     
     user_id = query.from_user.id
     try:
-        update_steps(user_id, 3000, 0)
+        await update_steps(user_id, 3000, 0)
         
         exercise_tip = random.choice(PHYSICAL_TIPS['exercise'])
         
@@ -810,7 +810,7 @@ async def steps_5k_7k_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     try:
-        update_steps(user_id, 6500, 0)
+        await update_steps(user_id, 6500, 0)
         
         exercise_tip = random.choice(PHYSICAL_TIPS['exercise'])
         
@@ -861,7 +861,7 @@ async def steps_7k_9k_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     try:
-        update_steps(user_id, 8500, 0)
+        await update_steps(user_id, 8500, 0)
         
         exercise_tip = random.choice(PHYSICAL_TIPS['exercise'])
         
@@ -908,9 +908,9 @@ async def steps_10kplus_handler(update: Update, context: ContextTypes.DEFAULT_TY
     
     user_id = query.from_user.id
     try:
-        update_steps(user_id, 12000, 0)
+        await update_steps(user_id, 12000, 0)
         
-        add_achievement(user_id, "🏃 10000 шагов выполнены")
+        await add_achievement(user_id, "steps_goal")
         
         exercise_tip = random.choice(PHYSICAL_TIPS['exercise'])
         
@@ -962,7 +962,7 @@ async def quick_workout_handler(update: Update, context: ContextTypes.DEFAULT_TY
         exercise_tip = random.choice(PHYSICAL_TIPS['exercise'])
         
         user_id = query.from_user.id
-        workout_data = get_workout_data(user_id)
+        workout_data = await get_workout_data(user_id)
         
         workout_text = f"""
 ⚡ *БЫСТРАЯ 15-МИНУТНАЯ ЗАРЯДКА*
@@ -1020,9 +1020,9 @@ async def workout_completed_handler(update: Update, context: ContextTypes.DEFAUL
     
     user_id = query.from_user.id
     try:
-        add_workout(user_id, "Quick workout", 15, 100)  
+        await add_workout(user_id, "Quick workout", 15, 100)  
         
-        add_achievement(user_id, "💪 Быстрая тренировка выполнена")
+        await add_achievement(user_id, "quick_workout")
         
         exercise_tip = random.choice(PHYSICAL_TIPS['exercise'])
         
@@ -1030,9 +1030,9 @@ async def workout_completed_handler(update: Update, context: ContextTypes.DEFAUL
 💪 *ТРЕНИРОВКА ЗАВЕРШЕНА!*
 
 *📊 ТВОЯ СТАТИСТИКА ТРЕНИРОВОК:*
-• 💪 Всего тренировок: {get_workout_data(user_id)['total_workouts']}
-• ⏰ Всего минут: {get_workout_data(user_id)['total_minutes']}
-• 📅 Дней с тренировками: {get_workout_data(user_id)['days_with_workout']}
+• 💪 Всего тренировок: {(await get_workout_data(user_id))['total_workouts']}
+• ⏰ Всего минут: {(await get_workout_data(user_id))['total_minutes']}
+• 📅 Дней с тренировками: {(await get_workout_data(user_id))['days_with_workout']}
 
 *🎉 ДОСТИЖЕНИЕ ПОЛУЧЕНО:*
 • 💪 Быстрая тренировка выполнена
@@ -1136,7 +1136,7 @@ async def tips_hydration_handler(update: Update, context: ContextTypes.DEFAULT_T
 • Пейте больше в жаркую погоду
 
 *📊 ТВОЯ СТАТИСТИКА ВОДЫ:*
-• Всего стаканов за неделю: {sum([day['amount'] for day in get_water_history(query.from_user.id, 7)])}
+• Всего стаканов за неделю: {sum([day['amount'] for day in await get_water_history(query.from_user.id, 7)])}
         """
     
     keyboard = [
@@ -1179,7 +1179,7 @@ async def tips_sleep_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
 • Используйте ортопедический матрас
 
 *📊 ТВОЯ СТАТИСТИКА СНА:*
-• Среднее качество сна: {sum([day['quality'] for day in get_sleep_history(query.from_user.id, 7)]) / len(get_sleep_history(query.from_user.id, 7)) if get_sleep_history(query.from_user.id, 7) else 3:.1f}/5
+• Среднее качество сна: {sum([day['quality'] for day in await get_sleep_history(query.from_user.id, 7)]) / len(await get_sleep_history(query.from_user.id, 7)) if await get_sleep_history(query.from_user.id, 7) else 3:.1f}/5
         """
     
     keyboard = [
@@ -1223,7 +1223,7 @@ async def tips_exercise_handler(update: Update, context: ContextTypes.DEFAULT_TY
 • Слушайте свое тело
 
 *📊 ТВОЯ СТАТИСТИКА АКТИВНОСТИ:*
-• Всего шагов за неделю: {sum([day['steps'] for day in get_activity_history(query.from_user.id, 7)])}
+• Всего шагов за неделю: {sum([day['steps'] for day in await get_activity_history(query.from_user.id, 7)])}
         """
     
     keyboard = [
@@ -1267,7 +1267,7 @@ async def tips_nutrition_handler(update: Update, context: ContextTypes.DEFAULT_T
 • Пейте воду перед едой
 
 *📊 ТВОЯ СТАТИСТИКА АКТИВНОСТИ:*
-• Среднее количество шагов: {sum([day['steps'] for day in get_activity_history(query.from_user.id, 7)]) / len(get_activity_history(query.from_user.id, 7)) if get_activity_history(query.from_user.id, 7) else 0:.0f}
+• Среднее количество шагов: {sum([day['steps'] for day in await get_activity_history(query.from_user.id, 7)]) / len(await get_activity_history(query.from_user.id, 7)) if await get_activity_history(query.from_user.id, 7) else 0:.0f}
         """
     
     keyboard = [
@@ -1311,7 +1311,7 @@ async def tips_posture_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 • Избегайте тяжелых сумок на одном плече
 
 *📊 ТВОЯ СТАТИСТИКА АКТИВНОСТИ:*
-• Дней с тренировками: {get_workout_data(query.from_user.id)['days_with_workout']}
+• Дней с тренировками: {(await get_workout_data(query.from_user.id))['days_with_workout']}
         """
     
     keyboard = [
@@ -1355,7 +1355,7 @@ async def tips_recovery_handler(update: Update, context: ContextTypes.DEFAULT_TY
 • Релаксация снижает стресс
 
 *📊 ТВОЯ СТАТИСТИКА:*
-• Всего тренировок: {get_workout_data(query.from_user.id)['total_workouts']}
+• Всего тренировок: {(await get_workout_data(query.from_user.id))['total_workouts']}
         """
     
     keyboard = [
@@ -1399,7 +1399,7 @@ async def tips_motivation_handler(update: Update, context: ContextTypes.DEFAULT_
 • Будьте терпеливы к себе
 
 *📊 ТВОЯ СТАТИСТИКА:*
-• Дней подряд активность: {get_user_data(query.from_user.id)['streak_days']}
+• Дней подряд активность: {(await get_user_data(query.from_user.id))['streak_days']}
         """
     
     keyboard = [
@@ -1459,7 +1459,7 @@ async def tips_random_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
 • Не бойтесь пробовать новое
 
 *📊 ТВОЯ СТАТИСТИКА:*
-• Всего стаканов воды: {get_user_data(query.from_user.id)['water_today']}
+• Всего стаканов воды: {(await get_user_data(query.from_user.id))['water_today']}
         """
     
     keyboard = [
@@ -1487,12 +1487,12 @@ async def physical_stats_handler(update: Update, context: ContextTypes.DEFAULT_T
     
     user_id = query.from_user.id
     try:
-        user_data = get_user_data(user_id)
-        water_history = get_water_history(user_id, 7)
-        sleep_history = get_sleep_history(user_id, days=7)
-        activity_history = get_activity_history(user_id, days=7)
-        workout_data = get_workout_data(user_id)
-        streak_data = get_streak_data(user_id)
+        user_data = await get_user_data(user_id)
+        water_history = await get_water_history(user_id, 7)
+        sleep_history = await get_sleep_history(user_id, days=7)
+        activity_history = await get_activity_history(user_id, days=7)
+        workout_data = await get_workout_data(user_id)
+        streak_data = await get_streak_data(user_id)
         
         total_week_water = sum([day['amount'] for day in water_history])
         avg_daily_water = total_week_water / 7 if water_history else 0
@@ -1573,7 +1573,7 @@ async def sleep_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     try:
-        sleep_history = get_sleep_history(user_id, 7)
+        sleep_history = await get_sleep_history(user_id, 7)
         
         total_nights = len(sleep_history)
         avg_hours = sum([day['hours'] for day in sleep_history]) / total_nights if total_nights > 0 else 0
@@ -1634,7 +1634,7 @@ async def activity_stats_handler(update: Update, context: ContextTypes.DEFAULT_T
     
     user_id = query.from_user.id
     try:
-        activity_history = get_activity_history(user_id, 7)
+        activity_history = await get_activity_history(user_id, 7)
         
         total_days = len(activity_history)
         avg_steps = sum([day['steps'] for day in activity_history]) / total_days if total_days > 0 else 0
@@ -1693,7 +1693,7 @@ async def workout_stats_handler(update: Update, context: ContextTypes.DEFAULT_TY
     
     user_id = query.from_user.id
     try:
-        workout_data = get_workout_data(user_id)
+        workout_data = await get_workout_data(user_id)
         
         stats_text = f"""
 💪 *СТАТИСТИКА ТРЕНИРОВОК*
@@ -1746,23 +1746,10 @@ async def physical_achievements_handler(update: Update, context: ContextTypes.DE
     
     user_id = query.from_user.id
     try:
-        from storage import get_achievements
-        achievements = get_achievements(user_id, limit=20)
+        from async_storage import get_achievements_page
+        page = await get_achievements_page(user_id, limit=10, category='physical')
         
-        if not achievements:
-            await query.edit_message_text(
-                text="🏆 *Пока нет достижений.*\nНачни отслеживать воду, сон и активность, чтобы получить первые достижения!",
-                parse_mode='Markdown'
-            )
-            return
-        
-        physical_keywords = ['вода', 'сон', 'шаг', 'тренировк', 'зарядк', 'спорт', 'активн', 'гидра', 'норм', 'цел']
-        physical_achievements = []
-        for achievement in achievements:
-            if any(keyword in achievement.lower() for keyword in physical_keywords):
-                physical_achievements.append(achievement)
-        
-        if not physical_achievements:
+        if not page['total']:
             await query.edit_message_text(
                 text="🏆 *Пока нет достижений в физическом здоровье.*\nНачни отслеживать воду, сон и активность!",
                 parse_mode='Markdown'
@@ -1772,16 +1759,17 @@ async def physical_achievements_handler(update: Update, context: ContextTypes.DE
         stats_text = f"""
 🏆 *ТВОИ ДОСТИЖЕНИЯ В ФИЗИЧЕСКОМ ЗДОРОВЬЕ*
 
-*📊 Всего достижений: {len(physical_achievements)}*
+*📊 Всего достижений: {page['total']}*
 
 *🏅 ТВОИ НАГРАДЫ:*
 """
         
-        for i, achievement in enumerate(physical_achievements[:10], 1):
-            stats_text += f"• {achievement}\n"
+        for achievement in page['items']:
+            repeats = f" ×{achievement['count']}" if achievement['count'] > 1 else ""
+            stats_text += f"• {achievement['title']}{repeats}\n"
         
-        if len(physical_achievements) > 10:
-            stats_text += f"*...и еще {len(physical_achievements) - 10} достижений!*"
+        if page['total'] > len(page['items']):
+            stats_text += f"*...и еще {page['total'] - len(page['items'])} достижений!*"
         
         stats_text += "\n*💡 Продолжай в том же духе! Каждое достижение — это шаг к здоровью!*"
         
@@ -2,12 +2,13 @@ from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
 import datetime
 import random
+import time
 import logging
-import asyncio
+import functools
 from typing import Dict, Any, Optional
 
-from storage import (
-    add_pomodoro_session,
+from async_storage import (
+    save_pomodoro_session,
     get_pomodoro_stats,
     add_habit,
     get_habits,
@@ -22,8 +23,14 @@ from storage import (
     ensure_user,
     get_pomodoro_history,
     get_workout_data,
-    get_social_overview
+    get_social_overview,
+    save_active_pomodoro,
+    delete_active_pomodoro,
+    get_active_pomodoros,
+    complete_overdue_pomodoros
 )
+from pomodoro_timer import PomodoroSession, phase_date, scheduler, refresh, WORK_SECONDS, BREAK_SECONDS
+from edit_dispatcher import dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -93,7 +100,43 @@ SOCIAL_TIPS = {
     ]
 }
 
-pomodoro_sessions = {}  
+pomodoro_sessions: Dict[int, PomodoroSession] = {}
+
+# Экраны запущенного таймера собираются один раз: при обновлении меняется только остаток времени,
+# а один и тот же объект клавиатуры позволяет очереди правок сразу увидеть, что она не изменилась
+POMODORO_RUNNING_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("✅ ЗАВЕРИТЬ СЕССИЮ", callback_data="pomodoro_complete"),
+        InlineKeyboardButton("⏸️ ПАУЗА", callback_data="pomodoro_pause"),
+    ],
+    [
+        InlineKeyboardButton("📊 Статистика", callback_data="pomodoro_stats"),
+        InlineKeyboardButton("🎯 Назначить задачу", callback_data="pomodoro_set_task"),
+    ],
+    [
+        InlineKeyboardButton("🌱 В РАЗДЕЛ РАЗВИТИЕ", callback_data="social"),
+    ]
+])
+
+POMODORO_RUNNING_TEXT = {
+    state: f"""
+{title}
+
+*⏰ ОСТАВШЕЕСЯ ВРЕМЯ:*
+• {{remaining}}
+
+*🎯 ТЕКУЩАЯ ЗАДАЧА:*
+{{task}}
+
+{advice}
+• Не отвлекайся на другие дела
+• Используй это время эффективно
+        """
+    for state, title, advice in (
+        ('work', "🍅 *РАБОЧАЯ СЕССИЯ*", "*Фокусируйся на задаче!*"),
+        ('break', "☕ *ПЕРЕРЫВ*", "*Отдохни и восстанови силы!*"),
+    )
+}
 
 async def social_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
@@ -101,10 +144,10 @@ async def social_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     try:
-        ensure_user(user_id)
+        await ensure_user(user_id)
         
-        user_data = get_user_data(user_id)
-        social_overview = get_social_overview(user_id)
+        user_data = await get_user_data(user_id)
+        social_overview = await get_social_overview(user_id)
         
         pomodoro_count = social_overview['pomodoro']['total_sessions']
         habit_count = social_overview['habits']['total_count']
@@ -180,7 +223,7 @@ async def pomodoro_menu_handler(update: Update, context: ContextTypes.DEFAULT_TY
     
     user_id = query.from_user.id
     try:
-        pomodoro_stats = get_pomodoro_stats(user_id)
+        pomodoro_stats = await get_pomodoro_stats(user_id)
         
         menu_text = f"""
 🍅 *ТАЙМЕР POMODORO*
@@ -236,8 +279,10 @@ async def pomodoro_start_handler(update: Update, context: ContextTypes.DEFAULT_T
     await query.answer()
     
     user_id = query.from_user.id
+    # Сообщение редактируется напрямую: отложенная правка таймера не должна его перезаписать
+    await dispatcher.forget(query.message.chat_id, query.message.message_id)
     try:
-        if user_id in pomodoro_sessions and pomodoro_sessions[user_id]['is_active']:
+        if user_id in pomodoro_sessions:
             await query.edit_message_text(
                 text="⚠️ *У тебя уже есть активная Pomodoro сессия!*",
                 parse_mode='Markdown'
@@ -246,15 +291,15 @@ async def pomodoro_start_handler(update: Update, context: ContextTypes.DEFAULT_T
         
         task = context.user_data.get('current_pomodoro_task', 'Без задачи')
         
-        pomodoro_sessions[user_id] = {
-            'state': 'work',
-            'remaining': 25 * 60,  
-            'task': task,
-            'is_active': True,
-            'is_paused': False,
-            'start_time': datetime.datetime.now(),
-            'session_id': None
-        }
+        session = PomodoroSession(
+            user_id=user_id,
+            chat_id=query.message.chat_id,
+            message_id=query.message.message_id,
+            task=task,
+        )
+        session.start_phase('work', WORK_SECONDS)
+        pomodoro_sessions[user_id] = session
+        await _persist_pomodoro(session)
         
         response_text = f"""
 🍅 *POMODORO СЕССИЯ НАЧАТА!*
@@ -275,125 +320,81 @@ async def pomodoro_start_handler(update: Update, context: ContextTypes.DEFAULT_T
 • Оценить результат
         """
         
-        keyboard = [
-            [
-                InlineKeyboardButton("✅ ЗАВЕРИТЬ СЕССИЮ", callback_data="pomodoro_complete"),
-                InlineKeyboardButton("⏸️ ПАУЗА", callback_data="pomodoro_pause"),
-            ],
-            [
-                InlineKeyboardButton("📊 Статистика", callback_data="pomodoro_stats"),
-                InlineKeyboardButton("🎯 Назначить задачу", callback_data="pomodoro_set_task"),
-            ],
-            [
-                InlineKeyboardButton("🌱 В РАЗДЕЛ РАЗВИТИЕ", callback_data="social"),
-            ]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
         await query.edit_message_text(
             text=response_text,
-            reply_markup=reply_markup,
+            reply_markup=POMODORO_RUNNING_KEYBOARD,
             parse_mode='Markdown'
         )
         
-        asyncio.create_task(run_pomodoro_timer(context, query, user_id))
+        _schedule_pomodoro(context.bot, session)
         
     except Exception as e:
         logger.error(f"Ошибка в pomodoro_start_handler: {e}")
+        if pomodoro_sessions.pop(user_id, None) is not None:
+            scheduler.cancel(user_id)
+            await delete_active_pomodoro(user_id)
         await query.edit_message_text(
             text="❌ Произошла ошибка при запуске Pomodoro сессии.",
             parse_mode='Markdown'
         )
 
-async def run_pomodoro_timer(context: ContextTypes.DEFAULT_TYPE, query, user_id: int):
-    global pomodoro_sessions
-    
-    last_update_time = datetime.datetime.now()
-    
-    while user_id in pomodoro_sessions and pomodoro_sessions[user_id]['is_active']:
-        await asyncio.sleep(1)
-        
-        if pomodoro_sessions[user_id]['is_paused']:
-            continue
-            
-        pomodoro_sessions[user_id]['remaining'] -= 1
-        
-        current_time = datetime.datetime.now()
-        if (current_time - last_update_time).total_seconds() >= 10:
-            remaining_minutes = pomodoro_sessions[user_id]['remaining'] // 60
-            remaining_seconds = pomodoro_sessions[user_id]['remaining'] % 60
-            
-            state = pomodoro_sessions[user_id]['state']
-            task = pomodoro_sessions[user_id]['task']
-            
-            if state == 'work':
-                title = "🍅 *РАБОЧАЯ СЕССИЯ*"
-                advice = "*Фокусируйся на задаче!*"
-            else:
-                title = "☕ *ПЕРЕРЫВ*"
-                advice = "*Отдохни и восстанови силы!*"
-            
-            response_text = f"""
-{title}
+def _pomodoro_running_text(session: PomodoroSession) -> str:
+    remaining_minutes, remaining_seconds = divmod(session.remaining(), 60)
+    return POMODORO_RUNNING_TEXT[session.state].format(
+        remaining=f"{remaining_minutes:02d}:{remaining_seconds:02d}",
+        task=session.task,
+    )
 
-*⏰ ОСТАВШЕЕСЯ ВРЕМЯ:*
-• {remaining_minutes:02d}:{remaining_seconds:02d}
+async def _persist_pomodoro(session: PomodoroSession) -> None:
+    await save_active_pomodoro(
+        session.user_id, session.state, session.deadline, session.paused_remaining,
+        session.task, session.chat_id, session.message_id
+    )
 
-*🎯 ТЕКУЩАЯ ЗАДАЧА:*
-{task}
+def _schedule_pomodoro(bot, session: PomodoroSession, tick: Optional[float] = None) -> None:
+    # Одна задача на фазу с шагом обновления экрана (его выбирает refresh по числу таймеров и очереди
+    # правок). Первое срабатывание выровнено так, что последнее приходится ровно на конец фазы;
+    # без шага или в последнем шаге фазы - разовая задача на конец фазы
+    if tick is None:
+        tick = refresh.tick(len(scheduler), len(dispatcher))
+    when, expires = session.next_wakeup(tick=tick)
+    scheduler.schedule(
+        session.user_id, when, None if expires else tick, functools.partial(on_pomodoro_timer, bot, session.user_id)
+    )
 
-{advice}
-• Не отвлекайся на другие дела
-• Используй это время эффективно
-        """
-            
-            keyboard = [
-                [
-                    InlineKeyboardButton("✅ ЗАВЕРИТЬ СЕССИЮ", callback_data="pomodoro_complete"),
-                    InlineKeyboardButton("⏸️ ПАУЗА", callback_data="pomodoro_pause"),
-                ],
-                [
-                    InlineKeyboardButton("📊 Статистика", callback_data="pomodoro_stats"),
-                    InlineKeyboardButton("🎯 Назначить задачу", callback_data="pomodoro_set_task"),
-                ],
-                [
-                    InlineKeyboardButton("🌱 В РАЗДЕЛ РАЗВИТИЕ", callback_data="social"),
-                ]
-            ]
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            try:
-                await query.edit_message_text(
-                    text=response_text,
-                    reply_markup=reply_markup,
-                    parse_mode='Markdown'
-                )
-            except Exception as e:
-                logger.error(f"Ошибка при обновлении сообщения Pomodoro: {e}")
-            
-            last_update_time = current_time
+async def on_pomodoro_timer(bot, user_id: int):
+    session = pomodoro_sessions.get(user_id)
+    if session is None or session.is_paused:
+        scheduler.cancel(user_id)
+        return
     
-    if user_id in pomodoro_sessions:
-        if pomodoro_sessions[user_id]['state'] == 'work':
-            await complete_work_session(context, query, user_id)
-        else:
-            await complete_break_session(context, query, user_id)
+    if session.remaining() > 0:
+        tick = refresh.tick(len(scheduler), len(dispatcher))
+        if tick != scheduler.interval(user_id):
+            _schedule_pomodoro(bot, session, tick)
+        dispatcher.submit(
+            bot,
+            chat_id=session.chat_id,
+            message_id=session.message_id,
+            text=_pomodoro_running_text(session),
+            reply_markup=POMODORO_RUNNING_KEYBOARD,
+            parse_mode='Markdown'
+        )
+    elif session.state == 'work':
+        await complete_work_session(bot, session)
+    else:
+        await complete_break_session(bot, session)
 
-async def complete_work_session(context: ContextTypes.DEFAULT_TYPE, query, user_id: int):
-    global pomodoro_sessions
+async def complete_work_session(bot, session: PomodoroSession):
+    # Перерыв планируется до записей в базу: ошибка записи не должна оставить сессию без таймера
+    finished_on = phase_date(session.deadline)
+    session.start_phase('break', BREAK_SECONDS)
+    _schedule_pomodoro(bot, session)
+    await _persist_pomodoro(session)
+    await save_pomodoro_session(session.user_id, 25, 'work', True, session.task, finished_on)
     
-    if user_id in pomodoro_sessions:
-        task_description = pomodoro_sessions[user_id]['task']
-        session_id = add_pomodoro_session(user_id, 25, 'work', True, task_description, datetime.date.today().isoformat())
-        
-        pomodoro_sessions[user_id]['state'] = 'break'
-        pomodoro_sessions[user_id]['remaining'] = 5 * 60  
-        pomodoro_sessions[user_id]['session_id'] = session_id
-        
-        try:
-            response_text = """
+    try:
+        response_text = """
 🎉 *РАБОЧИЙ ИНТЕРВАЛ ЗАВЕРШЕН!*
 
 *🍅 Отличная работа! Ты сфокусировался на 25 минут!*
@@ -410,44 +411,47 @@ async def complete_work_session(context: ContextTypes.DEFAULT_TYPE, query, user_
 *Таймер перерыва запущен...*
 ⏱️ *Осталось: 05:00*
         """
-            
-            keyboard = [
-                [
-                    InlineKeyboardButton("⏸️ ПАУЗА", callback_data="pomodoro_pause"),
-                    InlineKeyboardButton("✅ ЗАВЕРИТЬ СЕССИЮ", callback_data="pomodoro_complete"),
-                ],
-                [
-                    InlineKeyboardButton("📊 Статистика", callback_data="pomodoro_stats"),
-                    InlineKeyboardButton("🎯 Назначить задачу", callback_data="pomodoro_set_task"),
-                ],
-                [
-                    InlineKeyboardButton("🌱 В РАЗДЕЛ РАЗВИТИЕ", callback_data="social"),
-                ]
-            ]
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                text=response_text,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
-        except Exception as e:
-            logger.error(f"Ошибка при завершении рабочей сессии: {e}")
-
-async def complete_break_session(context: ContextTypes.DEFAULT_TYPE, query, user_id: int):
-    global pomodoro_sessions
-    
-    if user_id in pomodoro_sessions:
-        task_description = pomodoro_sessions[user_id]['task']
-        add_pomodoro_session(user_id, 5, 'break', True, task_description, datetime.date.today().isoformat())
         
-        pomodoro_sessions[user_id]['is_active'] = False
+        keyboard = [
+            [
+                InlineKeyboardButton("⏸️ ПАУЗА", callback_data="pomodoro_pause"),
+                InlineKeyboardButton("✅ ЗАВЕРИТЬ СЕССИЮ", callback_data="pomodoro_complete"),
+            ],
+            [
+                InlineKeyboardButton("📊 Статистика", callback_data="pomodoro_stats"),
+                InlineKeyboardButton("🎯 Назначить задачу", callback_data="pomodoro_set_task"),
+            ],
+            [
+                InlineKeyboardButton("🌱 В РАЗДЕЛ РАЗВИТИЕ", callback_data="social"),
+            ]
+        ]
         
-        pomodoro_stats = get_pomodoro_stats(user_id)
+        reply_markup = InlineKeyboardMarkup(keyboard)
         
-        try:
-            response_text = f"""
+        dispatcher.submit(
+            bot,
+            chat_id=session.chat_id,
+            message_id=session.message_id,
+            text=response_text,
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при завершении рабочей сессии: {e}")
+
+async def complete_break_session(bot, session: PomodoroSession):
+    pomodoro_sessions.pop(session.user_id, None)
+    scheduler.cancel(session.user_id)
+    await save_pomodoro_session(session.user_id, 5, 'break', True, session.task, phase_date(session.deadline))
+    await delete_active_pomodoro(session.user_id)
+    
+    await _show_pomodoro_cycle_done(bot, session.user_id, session.chat_id, session.message_id)
+
+async def _show_pomodoro_cycle_done(bot, user_id: int, chat_id: int, message_id: int):
+    pomodoro_stats = await get_pomodoro_stats(user_id)
+    
+    try:
+        response_text = f"""
 ✅ *POMODORO СЕССИЯ ЗАВЕРЕНА!*
 
 *🏆 Ты выполнил(а) 1 полный цикл:*
@@ -466,30 +470,68 @@ async def complete_break_session(context: ContextTypes.DEFAULT_TYPE, query, user
 
 *Готов(а) к следующей сессии?*
         """
-            
-            keyboard = [
-                [
-                    InlineKeyboardButton("🍅 НОВАЯ СЕССИЯ", callback_data="pomodoro_start"),
-                    InlineKeyboardButton("📊 Статистика", callback_data="pomodoro_stats"),
-                ],
-                [
-                    InlineKeyboardButton("📜 История", callback_data="pomodoro_history"),
-                    InlineKeyboardButton("🎯 Назначить задачу", callback_data="pomodoro_set_task"),
-                ],
-                [
-                    InlineKeyboardButton("🌱 В РАЗДЕЛ РАЗВИТИЕ", callback_data="social"),
-                ]
+        
+        keyboard = [
+            [
+                InlineKeyboardButton("🍅 НОВАЯ СЕССИЯ", callback_data="pomodoro_start"),
+                InlineKeyboardButton("📊 Статистика", callback_data="pomodoro_stats"),
+            ],
+            [
+                InlineKeyboardButton("📜 История", callback_data="pomodoro_history"),
+                InlineKeyboardButton("🎯 Назначить задачу", callback_data="pomodoro_set_task"),
+            ],
+            [
+                InlineKeyboardButton("🌱 В РАЗДЕЛ РАЗВИТИЕ", callback_data="social"),
             ]
-            
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await query.edit_message_text(
-                text=response_text,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
-        except Exception as e:
-            logger.error(f"Ошибка при завершении перерыва: {e}")
+        ]
+        
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        dispatcher.submit(
+            bot,
+            chat_id=chat_id,
+            message_id=message_id,
+            text=response_text,
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при завершении перерыва: {e}")
+
+async def restore_pomodoro_sessions(bot) -> Dict[str, int]:
+    # Вызывается при старте: фазы, истекшие пока бот не работал, записываются одной пачкой,
+    # остальные сессии возвращаются в планировщик
+    completed = await complete_overdue_pomodoros(time.time(), WORK_SECONDS, BREAK_SECONDS)
+    for row in completed:
+        if row['finished']:
+            await _show_pomodoro_cycle_done(bot, row['user_id'], row['chat_id'], row['message_id'])
+    
+    restored = 0
+    for row in await get_active_pomodoros():
+        session = PomodoroSession(
+            user_id=row['user_id'],
+            chat_id=row['chat_id'],
+            message_id=row['message_id'],
+            task=row['task'],
+            state=row['state'],
+            deadline=row['deadline'],
+            paused_remaining=row['paused_remaining'],
+        )
+        pomodoro_sessions[session.user_id] = session
+        if not session.is_paused:
+            _schedule_pomodoro(bot, session)
+        restored += 1
+    
+    stats = {
+        'restored': restored,
+        'completed': sum(1 for row in completed if row['finished']),
+        'phases': sum(len(row['completed']) for row in completed),
+    }
+    logger.info(
+        f"Pomodoro после перезапуска: восстановлено {stats['restored']}, "
+        f"завершено {stats['completed']}, записано фаз {stats['phases']}"
+    )
+    return stats
 
 async def pomodoro_set_task_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
@@ -570,11 +612,15 @@ async def pomodoro_pause_handler(update: Update, context: ContextTypes.DEFAULT_T
     await query.answer()
     
     user_id = query.from_user.id
+    await dispatcher.forget(query.message.chat_id, query.message.message_id)
     
-    if user_id in pomodoro_sessions and pomodoro_sessions[user_id]['is_active']:
-        paused_time = pomodoro_sessions[user_id]['remaining']
-        pomodoro_sessions[user_id]['paused_remaining'] = paused_time
-        pomodoro_sessions[user_id]['is_paused'] = True
+    session = pomodoro_sessions.get(user_id)
+    if session is not None:
+        session.pause()
+        session.message_id = query.message.message_id
+        scheduler.cancel(user_id)
+        await _persist_pomodoro(session)
+        paused_time = session.remaining()
         
         response_text = """
 ⏸️ *POMODORO НА ПАУЗЕ*
@@ -632,11 +678,14 @@ async def pomodoro_resume_handler(update: Update, context: ContextTypes.DEFAULT_
     await query.answer()
     
     user_id = query.from_user.id
+    await dispatcher.forget(query.message.chat_id, query.message.message_id)
     
-    if user_id in pomodoro_sessions and 'paused_remaining' in pomodoro_sessions[user_id]:
-        pomodoro_sessions[user_id]['remaining'] = pomodoro_sessions[user_id]['paused_remaining']
-        del pomodoro_sessions[user_id]['paused_remaining']
-        pomodoro_sessions[user_id]['is_paused'] = False
+    session = pomodoro_sessions.get(user_id)
+    if session is not None and session.is_paused:
+        session.resume()
+        session.message_id = query.message.message_id
+        _schedule_pomodoro(context.bot, session)
+        await _persist_pomodoro(session)
         
         response_text = """
 ▶️ *POMODORO ВОЗОБНОВЛЕНО!*
@@ -644,11 +693,10 @@ async def pomodoro_resume_handler(update: Update, context: ContextTypes.DEFAULT_
 *Продолжай работать над задачей:*
         """
         
-        if pomodoro_sessions[user_id].get('task'):
-            response_text += f"\n\n*Текущая задача:*\n{pomodoro_sessions[user_id]['task']}"
+        if session.task:
+            response_text += f"\n\n*Текущая задача:*\n{session.task}"
         
-        remaining_minutes = pomodoro_sessions[user_id]['remaining'] // 60
-        remaining_seconds = pomodoro_sessions[user_id]['remaining'] % 60
+        remaining_minutes, remaining_seconds = divmod(session.remaining(), 60)
         response_text += f"\n\n*⏰ ОСТАВШЕЕСЯ ВРЕМЯ: {remaining_minutes:02d}:{remaining_seconds:02d}*"
         
     else:
@@ -685,9 +733,11 @@ async def pomodoro_stop_handler(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer()
     
     user_id = query.from_user.id
+    await dispatcher.forget(query.message.chat_id, query.message.message_id)
     
-    if user_id in pomodoro_sessions:
-        pomodoro_sessions[user_id]['is_active'] = False
+    pomodoro_sessions.pop(user_id, None)
+    scheduler.cancel(user_id)
+    await delete_active_pomodoro(user_id)
     
     response_text = """
 ⏹️ *POMODORO СЕССИЯ ОСТАНОВЛЕНА*
@@ -727,22 +777,23 @@ async def pomodoro_complete_handler(update: Update, context: ContextTypes.DEFAUL
     await query.answer()
     
     user_id = query.from_user.id
+    await dispatcher.forget(query.message.chat_id, query.message.message_id)
     try:
-        if user_id in pomodoro_sessions and pomodoro_sessions[user_id]['is_active']:
-            task_description = pomodoro_sessions[user_id]['task']
-            duration = 25 if pomodoro_sessions[user_id]['state'] == 'work' else 5
-            session_type = pomodoro_sessions[user_id]['state']
-            
-            session_id = add_pomodoro_session(user_id, duration, session_type, True, task_description, datetime.date.today().isoformat())
+        session = pomodoro_sessions.pop(user_id, None)
+        scheduler.cancel(user_id)
+        if session is not None:
+            await delete_active_pomodoro(user_id)
+            task_description = session.task
+            duration = 25 if session.state == 'work' else 5
             
-            pomodoro_sessions[user_id]['is_active'] = False
+            session_id = await save_pomodoro_session(user_id, duration, session.state, True, task_description, datetime.date.today().isoformat())
         else:
             task_description = context.user_data.get('current_pomodoro_task', 'Без задачи')
-            session_id = add_pomodoro_session(user_id, 25, 'work', True, task_description, datetime.date.today().isoformat())
+            session_id = await save_pomodoro_session(user_id, 25, 'work', True, task_description, datetime.date.today().isoformat())
         
-        add_achievement(user_id, "🍅 Pomodoro сессия завершена")
+        await add_achievement(user_id, "pomodoro")
         
-        pomodoro_stats = get_pomodoro_stats(user_id)
+        pomodoro_stats = await get_pomodoro_stats(user_id)
         
         response_text = f"""
 ✅ *POMODORO СЕССИЯ ЗАВЕРЕНА!*
@@ -794,8 +845,8 @@ async def pomodoro_stats_handler(update: Update, context: ContextTypes.DEFAULT_T
     
     user_id = query.from_user.id
     try:
-        pomodoro_stats = get_pomodoro_stats(user_id)
-        pomodoro_history = get_pomodoro_history(user_id, days=7)
+        pomodoro_stats = await get_pomodoro_stats(user_id)
+        pomodoro_history = await get_pomodoro_history(user_id, days=7)
         
         total_sessions = pomodoro_stats['total_pomodoros']
         total_time = pomodoro_stats['total_time']
@@ -857,7 +908,7 @@ async def pomodoro_history_handler(update: Update, context: ContextTypes.DEFAULT
     
     user_id = query.from_user.id
     try:
-        pomodoro_history = get_pomodoro_history(user_id, days=30)
+        pomodoro_history = await get_pomodoro_history(user_id, days=30)
         
         if not pomodoro_history:
             response_text = "📋 *ИСТОРИЯ POMODORO*\n\nПока нет завершенных сессий. Начни Pomodoro сессию!"
@@ -909,8 +960,8 @@ async def habits_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     try:
-        habits = get_habits(user_id)
-        habit_streaks = get_habit_streaks(user_id)
+        habits = await get_habits(user_id)
+        habit_streaks = await get_habit_streaks(user_id)
         
         menu_text = f"""
 🎯 *ТРЕКЕР ПРИВЫЧЕК(В разработке)*
@@ -1055,9 +1106,9 @@ async def handle_habit_description_text(update: Update, context: ContextTypes.DE
             )
             return
         
-        habit_id = add_habit(user_id, habit_name, habit_description, "daily")
+        habit_id = await add_habit(user_id, habit_name, habit_description, "daily")
         
-        add_achievement(user_id, f"🎯 Создал привычку: {habit_name}")
+        await add_achievement(user_id, "habit_created")
         
         response_text = f"""
 ✅ *ПРИВЫЧКА СОЗДАНА!*
@@ -1128,9 +1179,9 @@ async def habit_toggle_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     
     try:
         today = datetime.date.today().isoformat()
-        update_habit_completion(user_id, habit_id, today, True)
+        await update_habit_completion(user_id, habit_id, True)
         
-        habits = get_habits(user_id)
+        habits = await get_habits(user_id)
         habit = next((h for h in habits if h['id'] == habit_id), None)
         
         if habit:
@@ -1181,8 +1232,8 @@ async def habit_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     try:
-        habit_stats = get_habit_streaks(user_id)
-        habits = get_habits(user_id)
+        habit_stats = await get_habit_streaks(user_id)
+        habits = await get_habits(user_id)
         
         stats_text = f"""
 📊 *СТАТИСТИКА ПРИВЫЧЕК*
@@ -1232,7 +1283,7 @@ async def goals_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     user_id = query.from_user.id
     try:
-        goals = get_goals(user_id)
+        goals = await get_goals(user_id)
         
         menu_text = f"""
 🎯 *SMART ЦЕЛИ*
@@ -1430,9 +1481,9 @@ async def social_stats_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     
     user_id = query.from_user.id
     try:
-        social_overview = get_social_overview(user_id)
-        pomodoro_stats = get_pomodoro_stats(user_id)
-        workout_data = get_workout_data(user_id)
+        social_overview = await get_social_overview(user_id)
+        pomodoro_stats = await get_pomodoro_stats(user_id)
+        workout_data = await get_workout_data(user_id)
         
         stats_text = f"""
 📈 *СТАТИСТИКА РАЗВИТИЯ*
@@ -1867,4 +1918,5 @@ __all__ = [
     'handle_pomodoro_task_text',
     'handle_habit_name_text',
     'handle_habit_description_text',
+    'restore_pomodoro_sessions',
 ]
@@ -0,0 +1,101 @@
+import os
+import sys
+import logging
+import argparse
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+def migrate_command(args: argparse.Namespace) -> None:
+    from database import create_database
+    db = create_database()
+    
+    print(f"✅ Версия схемы базы данных: {db.get_schema_version()}")
+
+def rebuild_aggregates_command(args: argparse.Namespace) -> None:
+    from database import create_database
+    db = create_database()
+    
+    count = db.rebuild_aggregates()
+    print(f"✅ Агрегаты пересобраны для {count} пользователей")
+
+def rebuild_rollup_command(args: argparse.Namespace) -> None:
+    from database import create_database
+    db = create_database()
+    
+    count = db.rebuild_daily_rollup()
+    print(f"✅ Дневные сводки пересобраны: {count} строк")
+
+def split_shards_command(args: argparse.Namespace) -> None:
+    from config import DB_PATH, DB_SHARD_PATH
+    from database import split_database
+    
+    shard_paths = [DB_SHARD_PATH.format(shard=shard) for shard in range(args.shards)]
+    users = split_database(args.source or DB_PATH, shard_paths)
+    for path, count in zip(shard_paths, users):
+        print(f"✅ {path}: {count} пользователей")
+
+def backup_command(args: argparse.Namespace) -> None:
+    from database import create_database
+    db = create_database()
+    
+    from config import BACKUP_DIR
+    paths = db.create_backup(args.dir or BACKUP_DIR, wait=True)
+    for path in paths if isinstance(paths, list) else [paths]:
+        if os.path.exists(path):
+            print(f"✅ Резервная копия: {path}")
+        else:
+            print(f"❌ Резервная копия не прошла проверку: {path}.corrupt")
+
+def verify_backup_command(args: argparse.Namespace) -> None:
+    from backup import verify_snapshot
+    
+    if not verify_snapshot(args.path):
+        print(f"❌ Резервная копия повреждена: {args.path}")
+        sys.exit(1)
+    print(f"✅ Резервная копия цела: {args.path}")
+
+def compact_command(args: argparse.Namespace) -> None:
+    from config import RETENTION_DAYS
+    from database import create_database
+    db = create_database()
+    
+    # Ручной запуск может один раз перевести старую базу в auto_vacuum=INCREMENTAL полным VACUUM
+    days = RETENTION_DAYS if args.days is None else args.days
+    stats = db.compact_storage(days, full_vacuum=True)
+    for name, count in stats.items():
+        print(f"✅ {name}: {count}")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Обслуживание базы данных YAProSB_bot')
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    commands.add_parser('migrate', help='применить миграции схемы').set_defaults(func=migrate_command)
+    commands.add_parser('rebuild-aggregates', help='пересчитать user_aggregates из исходных таблиц').set_defaults(func=rebuild_aggregates_command)
+    commands.add_parser('rebuild-rollup', help='пересчитать daily_rollup из исходных таблиц').set_defaults(func=rebuild_rollup_command)
+    
+    split = commands.add_parser('split-shards', help='разложить базу по шардам (DB_SHARD_PATH)')
+    split.add_argument('shards', type=int, help='число шардов')
+    split.add_argument('--source', help='исходная база, по умолчанию DB_PATH')
+    split.set_defaults(func=split_shards_command)
+    
+    backup = commands.add_parser('backup', help='сделать сжатый снимок базы в BACKUP_DIR')
+    backup.add_argument('--dir', help='каталог для снимков, по умолчанию BACKUP_DIR')
+    backup.set_defaults(func=backup_command)
+    
+    compact = commands.add_parser('compact', help='удалить старые записи append-only таблиц и освободить место (старую базу один раз пересобирает VACUUM)')
+    compact.add_argument('--days', type=int, help='хранить записи за N дней, по умолчанию RETENTION_DAYS (0 - не удалять)')
+    compact.set_defaults(func=compact_command)
+    
+    verify = commands.add_parser('verify-backup', help='проверить снимок через PRAGMA integrity_check')
+    verify.add_argument('path', help='путь к файлу .db.gz')
+    verify.set_defaults(func=verify_backup_command)
+    
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    args.func(args)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
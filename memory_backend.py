@@ -0,0 +1,710 @@
+import bisect
+import datetime
+import functools
+import threading
+from collections import Counter
+from itertools import count
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from achievements import ACHIEVEMENTS_BY_ID, achievement_id
+from analytics import build_history, history_since, mood_patterns, trend_report, TREND_METRICS
+from database import UserSnapshot, AGGREGATE_COLUMNS
+from migrations import MOOD_SCORES, DEFAULT_MOOD_SCORE, STREAK_METRICS, streak_runs
+from pomodoro_timer import advance_overdue_pomodoro
+
+STREAK_GOALS = {
+    'water': ('amount', 8),
+    'sleep': ('hours', 7),
+    'activity': ('steps', 10000),
+}
+
+class DayIndex:
+    # Одна запись на день: даты и строки хранятся в параллельных отсортированных массивах
+    __slots__ = ('dates', 'rows')
+
+    def __init__(self):
+        self.dates: List[str] = []
+        self.rows: List[Dict[str, Any]] = []
+
+    def get(self, date: str) -> Optional[Dict[str, Any]]:
+        index = bisect.bisect_left(self.dates, date)
+        if index < len(self.dates) and self.dates[index] == date:
+            return self.rows[index]
+        return None
+
+    def put(self, date: str, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        index = bisect.bisect_left(self.dates, date)
+        if index < len(self.dates) and self.dates[index] == date:
+            previous, self.rows[index] = self.rows[index], row
+            return previous
+        self.dates.insert(index, date)
+        self.rows.insert(index, row)
+        return None
+
+    def range(self, start: str, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        low = bisect.bisect_left(self.dates, start)
+        high = bisect.bisect_right(self.dates, end) if end is not None else len(self.dates)
+        return self.rows[low:high]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+class EventLog:
+    # Несколько записей на день, порядок (date, id)
+    __slots__ = ('keys', 'rows')
+
+    def __init__(self):
+        self.keys: List[Tuple[str, int]] = []
+        self.rows: List[Dict[str, Any]] = []
+
+    def add(self, row: Dict[str, Any]) -> None:
+        key = (row['date'], row['id'])
+        index = bisect.bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.rows.insert(index, row)
+
+    def range(self, start: str, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        low = bisect.bisect_left(self.keys, (start,))
+        high = bisect.bisect_left(self.keys, (end, float('inf'))) if end is not None else len(self.keys)
+        return self.rows[low:high]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+class UserData:
+    def __init__(self):
+        self.profile: Optional[Dict[str, Any]] = None
+        self.water = DayIndex()
+        self.sleep = DayIndex()
+        self.activity = DayIndex()
+        self.mood = DayIndex()
+        self.mood_notes = DayIndex()
+        self.pomodoro = EventLog()
+        self.workouts = EventLog()
+        self.meditation = EventLog()
+        self.achievements: Dict[int, Dict[str, Any]] = {}
+        self.sos = EventLog()
+        self.habits: Dict[int, Dict[str, Any]] = {}
+        self.completions: Dict[int, DayIndex] = {}
+        self.goals: Dict[int, Dict[str, Any]] = {}
+        self.streaks: Dict[str, Dict[str, Any]] = {}
+        self.totals: Dict[str, Any] = {column: 0 for column in AGGREGATE_COLUMNS}
+
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _timestamp() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def _average(values: List[Any]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+def _mood_score(mood: Optional[str]) -> int:
+    return MOOD_SCORES.get(mood, DEFAULT_MOOD_SCORE)
+
+class MemoryBackend:
+    # Хранилище целиком в памяти процесса: та же семантика, что у DatabaseManager, без диска.
+    # Для бенчмарков и нагрузочных прогонов обработчиков; данные теряются при перезапуске.
+    def __init__(self):
+        self._users: Dict[int, UserData] = {}
+        self._ids = {table: count(1) for table in ('pomodoro', 'habits', 'goals', 'workouts', 'meditation', 'sos')}
+        self._active_pomodoros: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+
+    def _user(self, user_id: int) -> UserData:
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = UserData()
+        return user
+
+    def init_database(self) -> List[int]:
+        return []
+
+    def flush_pending_writes(self) -> int:
+        return 0
+
+    def close_connections(self) -> None:
+        pass
+
+    @_locked
+    def ensure_user_exists(self, user_id: int) -> None:
+        user = self._user(user_id)
+        now = _timestamp()
+        if user.profile is None:
+            user.profile = {'created_at': now, 'last_active': now, 'streak_days': 0}
+        user.profile['last_active'] = now
+
+    def _rollup_rows(self, user_id: int, start: str, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        user = self._user(user_id)
+        days: Dict[str, Dict[str, Any]] = {}
+
+        def day(date: str) -> Dict[str, Any]:
+            row = days.get(date)
+            if row is None:
+                row = days[date] = {
+                    'user_id': user_id, 'date': date, 'water': None, 'sleep_hours': None, 'sleep_quality': None,
+                    'steps': None, 'workout_minutes': None, 'mood_score': None,
+                    'pomodoros': 0, 'pomodoro_minutes': 0, 'meditation_minutes': 0, 'habits_done': 0,
+                }
+            return row
+
+        for row in user.water.range(start, end):
+            day(row['date'])['water'] = row['amount']
+        for row in user.sleep.range(start, end):
+            target = day(row['date'])
+            target['sleep_hours'] = row['hours']
+            target['sleep_quality'] = row['quality']
+        for row in user.activity.range(start, end):
+            target = day(row['date'])
+            target['steps'] = row['steps']
+            target['workout_minutes'] = row['workout_minutes']
+        for row in user.mood.range(start, end):
+            day(row['date'])['mood_score'] = _mood_score(row['mood'])
+        for row in user.pomodoro.range(start, end):
+            target = day(row['date'])
+            if row['completed'] == 1:
+                target['pomodoros'] += 1
+                target['pomodoro_minutes'] += row['duration'] or 0
+        for row in user.meditation.range(start, end):
+            day(row['date'])['meditation_minutes'] += row['duration'] or 0
+        for completions in user.completions.values():
+            for row in completions.range(start, end):
+                day(row['date'])['habits_done'] += row['completed'] == 1
+        return [days[date] for date in sorted(days)]
+
+    @_locked
+    def get_user_snapshot(self, user_id: int, achievements_limit: int = 5) -> UserSnapshot:
+        user = self._user(user_id)
+        today = datetime.date.today().isoformat()
+        week_start = (datetime.date.today() - datetime.timedelta(days=7)).isoformat()
+        week = self._rollup_rows(user_id, week_start)
+        current = next((row for row in week if row['date'] == today), {})
+
+        def present(column: str) -> List[Any]:
+            return [row[column] for row in week if row[column] is not None]
+
+        moods = Counter(row['mood'] for row in user.mood.range(week_start) if row['mood'] is not None)
+        mood_today = user.mood.get(today) or {}
+        totals = user.totals
+        profile = user.profile or {}
+        values = {
+            'created_at': profile.get('created_at'),
+            'last_active': profile.get('last_active'),
+            'streak_days': profile.get('streak_days'),
+            'water_today': current.get('water'),
+            'water_total': totals['water_total'],
+            'water_week_days': len(present('water')),
+            'water_week_avg': _average(present('water')),
+            'sleep_hours': current.get('sleep_hours'),
+            'sleep_quality': current.get('sleep_quality'),
+            'sleep_week_avg_hours': _average(present('sleep_hours')),
+            'sleep_week_avg_quality': _average(present('sleep_quality')),
+            'steps_today': current.get('steps'),
+            'steps_total': totals['steps_total'],
+            'workout_today': current.get('workout_minutes'),
+            'steps_week_avg': _average(present('steps')),
+            'active_days_week': len(present('steps')),
+            'mood_today': mood_today.get('mood'),
+            'emoji_today': mood_today.get('emoji'),
+            'mood_days': totals['mood_days'],
+            'avg_mood': round(totals['mood_score_total'] / totals['mood_days'], 2) if totals['mood_days'] else None,
+            'mood_week': [mood for mood, _ in sorted(moods.items(), key=lambda item: (-item[1], item[0]))],
+            'pomodoro_today': current.get('pomodoros'),
+            'pomodoro_today_time': current.get('pomodoro_minutes'),
+            'pomodoro_count': totals['pomodoro_count'],
+            'pomodoro_total_time': totals['pomodoro_minutes'],
+            'pomodoro_week_days': sum(1 for row in week if row['pomodoros'] > 0),
+            'achievements_count': totals['achievements_count'],
+            'recent_achievements': [row['title'] for row in self._achievement_rows(user)[:max(achievements_limit, 0)]],
+        }
+        return UserSnapshot(user_id=user_id, **{key: value for key, value in values.items() if value is not None})
+
+    def get_user_snapshots_many(self, user_ids: Iterable[int], achievements_limit: int = 5) -> Iterator[UserSnapshot]:
+        for user_id in dict.fromkeys(user_ids):
+            yield self.get_user_snapshot(user_id, achievements_limit)
+
+    def get_user_data(self, user_id: int) -> Dict[str, Any]:
+        return self.get_user_snapshot(user_id).to_user_data()
+
+    def get_user_data_many(self, user_ids: Iterable[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for snapshot in self.get_user_snapshots_many(user_ids, achievements_limit=0):
+            yield snapshot.user_id, snapshot.to_user_data()
+
+    def iter_user_ids(self) -> Iterator[int]:
+        with self._lock:
+            user_ids = sorted(user_id for user_id, user in self._users.items() if user.profile is not None)
+        return iter(user_ids)
+
+    def get_comprehensive_user_data(self, user_id: int) -> Dict[str, Any]:
+        return self.get_user_snapshot(user_id).to_comprehensive_data()
+
+    def get_user_overview(self, user_id: int) -> Dict[str, Any]:
+        return self.get_user_snapshot(user_id).to_overview()
+
+    def _advance_streak(self, user: UserData, metric: str, date: str, reached: bool) -> None:
+        state = user.streaks.get(metric)
+        last_goal_date = state['last_goal_date'] if state else None
+        if not reached and not (last_goal_date and date <= last_goal_date):
+            return
+        if reached and last_goal_date == date:
+            return
+        if not reached or (last_goal_date and date < last_goal_date):
+            column, goal = STREAK_GOALS[metric]
+            index = getattr(user, metric)
+            dates = [row['date'] for row in index.rows if row[column] >= goal]
+            current, last_goal_date, best = streak_runs(dates)
+            user.streaks[metric] = {'current_streak': current, 'last_goal_date': last_goal_date, 'best_streak': best}
+            return
+
+        previous_day = (datetime.date.fromisoformat(date) - datetime.timedelta(days=1)).isoformat()
+        current = state['current_streak'] + 1 if last_goal_date == previous_day else 1
+        best = max(state['best_streak'] if state else 0, current)
+        user.streaks[metric] = {'current_streak': current, 'last_goal_date': date, 'best_streak': best}
+
+    @_locked
+    def update_water_intake(self, user_id: int, date: str, amount: int) -> None:
+        user = self._user(user_id)
+        row = user.water.get(date)
+        if row is None:
+            row = {'date': date, 'amount': 0}
+            user.water.put(date, row)
+            user.totals['water_days'] += 1
+        row['amount'] += amount
+        row['goal_reached'] = int(row['amount'] >= 8)
+        user.totals['water_total'] += amount
+        self._advance_streak(user, 'water', date, row['amount'] >= 8)
+
+    @_locked
+    def update_sleep_data(self, user_id: int, date: str, hours: float, quality: int) -> None:
+        user = self._user(user_id)
+        previous = user.sleep.put(date, {'date': date, 'hours': hours, 'quality': quality, 'goal_reached': int(hours >= 7)})
+        user.totals['sleep_days'] += previous is None
+        user.totals['sleep_hours_total'] += hours - (previous['hours'] if previous else 0)
+        self._advance_streak(user, 'sleep', date, hours >= 7)
+
+    @_locked
+    def update_activity_data(self, user_id: int, date: str, steps: int, workout_minutes: int) -> None:
+        user = self._user(user_id)
+        previous = user.activity.put(date, {
+            'date': date, 'steps': steps, 'workout_minutes': workout_minutes, 'goal_reached': int(steps >= 10000),
+        })
+        user.totals['activity_days'] += previous is None
+        user.totals['steps_total'] += steps - (previous['steps'] if previous else 0)
+        self._advance_streak(user, 'activity', date, steps >= 10000)
+
+    @_locked
+    def update_mood_data(self, user_id: int, date: str, mood: str, emoji: str) -> None:
+        user = self._user(user_id)
+        previous = user.mood.get(date)
+        user.mood.put(date, {'date': date, 'mood': mood, 'emoji': emoji, 'note': previous['note'] if previous else None})
+        user.totals['mood_days'] += previous is None
+        user.totals['mood_score_total'] += _mood_score(mood) - (_mood_score(previous['mood']) if previous else 0)
+
+    @_locked
+    def save_pomodoro_session(self, user_id: int, duration: int, session_type: str, completed: bool,
+                              task_description: str, date: str) -> Optional[int]:
+        user = self._user(user_id)
+        session_id = next(self._ids['pomodoro'])
+        user.pomodoro.add({
+            'id': session_id, 'date': date, 'duration': duration, 'session_type': session_type,
+            'completed': int(completed), 'task_description': task_description,
+        })
+        user.totals['pomodoro_count'] += 1
+        user.totals['pomodoro_minutes'] += duration or 0
+        return session_id
+
+    @_locked
+    def save_active_pomodoro(self, user_id: int, state: str, deadline: Optional[float], paused_remaining: Optional[float],
+                             task: str, chat_id: int, message_id: int) -> None:
+        self._active_pomodoros[user_id] = {
+            'user_id': user_id, 'state': state, 'deadline': deadline, 'paused_remaining': paused_remaining,
+            'task': task, 'chat_id': chat_id, 'message_id': message_id,
+        }
+
+    @_locked
+    def delete_active_pomodoro(self, user_id: int) -> None:
+        self._active_pomodoros.pop(user_id, None)
+
+    @_locked
+    def get_active_pomodoros(self) -> List[Dict[str, Any]]:
+        return [dict(self._active_pomodoros[user_id]) for user_id in sorted(self._active_pomodoros)]
+
+    @_locked
+    def complete_overdue_pomodoros(self, now: float, work_seconds: int, break_seconds: int) -> List[Dict[str, Any]]:
+        minutes = {'work': work_seconds // 60, 'break': break_seconds // 60}
+        rows = []
+        for user_id in sorted(self._active_pomodoros):
+            active = self._active_pomodoros[user_id]
+            if active['deadline'] is None or active['deadline'] > now:
+                continue
+            row = advance_overdue_pomodoro(active, now, break_seconds)
+            for session_type, date in row['completed']:
+                self.save_pomodoro_session(user_id, minutes[session_type], session_type, True, row['task'], date)
+            if row['finished']:
+                del self._active_pomodoros[user_id]
+            else:
+                active.update(state=row['state'], deadline=row['deadline'])
+            rows.append(row)
+        return rows
+
+    @_locked
+    def get_pomodoro_stats(self, user_id: int) -> Dict[str, Any]:
+        user = self._user(user_id)
+        today = datetime.date.today().isoformat()
+        completed = [row for row in user.pomodoro.range(today, today) if row['completed'] == 1]
+        return {
+            'today_pomodoros': len(completed),
+            'today_time': sum(row['duration'] or 0 for row in completed),
+            'total_pomodoros': user.totals['pomodoro_count'],
+            'total_time': user.totals['pomodoro_minutes'],
+        }
+
+    @_locked
+    def get_pomodoro_history(self, user_id: int, days: int = 30) -> List[Dict[str, Any]]:
+        rows = self._user(user_id).pomodoro.range(history_since(days), datetime.date.today().isoformat())
+        return [
+            {key: row[key] for key in ('date', 'duration', 'session_type', 'completed', 'task_description')}
+            for row in reversed(rows)
+        ]
+
+    @_locked
+    def create_habit(self, user_id: int, name: str, description: str, frequency: str) -> int:
+        habit_id = next(self._ids['habits'])
+        self._user(user_id).habits[habit_id] = {
+            'id': habit_id, 'user_id': user_id, 'name': name, 'description': description,
+            'frequency': frequency, 'created_at': _timestamp(),
+        }
+        self._user(user_id).totals['habits_count'] += 1
+        return habit_id
+
+    @_locked
+    def get_user_habits(self, user_id: int) -> List[Dict[str, Any]]:
+        user = self._user(user_id)
+        return [
+            dict(habit, completion_count=sum(
+                row['completed'] == 1 for row in user.completions.get(habit_id, DayIndex()).rows
+            ))
+            for habit_id, habit in sorted(user.habits.items())
+        ]
+
+    @_locked
+    def update_habit_status(self, user_id: int, habit_id: int, date: str, completed: bool) -> None:
+        completions = self._user(user_id).completions.setdefault(habit_id, DayIndex())
+        completions.put(date, {'date': date, 'completed': int(completed)})
+
+    @_locked
+    def get_habit_statistics(self, user_id: int) -> Dict[str, Any]:
+        user = self._user(user_id)
+        habits = []
+        for habit_id, habit in sorted(user.habits.items()):
+            rows = user.completions.get(habit_id, DayIndex()).rows
+            done = sum(1 for row in rows if row['completed'])
+            habits.append({
+                'name': habit['name'],
+                'total_attempts': len(rows),
+                'completed_count': done,
+                'success_rate': done * 100.0 / len(rows) if rows else None,
+            })
+        return {
+            'habits': habits,
+            'total_habits': len(habits),
+        }
+
+    @_locked
+    def update_habit_info(self, user_id: int, habit_id: int, **kwargs) -> None:
+        habit = self._user(user_id).habits.get(habit_id)
+        if habit:
+            habit.update({key: value for key, value in kwargs.items() if key in ['name', 'description', 'frequency']})
+
+    @_locked
+    def delete_user_habit(self, user_id: int, habit_id: int) -> None:
+        user = self._user(user_id)
+        if user.habits.pop(habit_id, None):
+            user.totals['habits_count'] -= 1
+        user.completions.pop(habit_id, None)
+
+    @_locked
+    def create_goal(self, user_id: int, name: str, description: str, deadline: str) -> int:
+        goal_id = next(self._ids['goals'])
+        self._user(user_id).goals[goal_id] = {
+            'id': goal_id, 'user_id': user_id, 'name': name, 'description': description,
+            'deadline': deadline, 'progress': 0, 'status': 'active', 'created_at': _timestamp(),
+        }
+        self._user(user_id).totals['goals_count'] += 1
+        return goal_id
+
+    @_locked
+    def get_user_goals(self, user_id: int) -> List[Dict[str, Any]]:
+        return [dict(goal) for _, goal in sorted(self._user(user_id).goals.items())]
+
+    @_locked
+    def update_goal_progress(self, user_id: int, goal_id: int, progress: int) -> None:
+        goal = self._user(user_id).goals.get(goal_id)
+        if goal:
+            goal['progress'] = progress
+
+    @_locked
+    def get_goal_progress(self, user_id: int, goal_id: int) -> int:
+        goal = self._user(user_id).goals.get(goal_id)
+        return goal['progress'] if goal else 0
+
+    def _achievement_rows(self, user: UserData, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = []
+        for key, state in user.achievements.items():
+            achievement = ACHIEVEMENTS_BY_ID[key]
+            if category is None or achievement.category == category:
+                rows.append({
+                    'id': key, 'code': achievement.code, 'category': achievement.category,
+                    'title': achievement.template, **state,
+                })
+        rows.sort(key=lambda row: (row['last_at'], row['id']), reverse=True)
+        return rows
+
+    @_locked
+    def get_user_achievements(self, user_id: int, limit: int = 20) -> List[str]:
+        return [row['title'] for row in self._achievement_rows(self._user(user_id))[:max(limit, 0)]]
+
+    @_locked
+    def get_user_achievements_page(self, user_id: int, limit: int = 10, category: Optional[str] = None,
+                                   after: Optional[Tuple[str, int]] = None) -> Dict[str, Any]:
+        rows = self._achievement_rows(self._user(user_id), category)
+        total = len(rows)
+        if after:
+            rows = [row for row in rows if (row['last_at'], row['id']) < tuple(after)]
+        items = rows[:limit]
+        next_cursor = (items[-1]['last_at'], items[-1]['id']) if len(rows) > limit else None
+        return {'items': items, 'total': total, 'next_cursor': next_cursor}
+
+    @_locked
+    def add_user_achievement(self, user_id: int, code: str, date: str) -> None:
+        user = self._user(user_id)
+        key = achievement_id(code)
+        state = user.achievements.get(key)
+        if state is None:
+            user.achievements[key] = {'count': 1, 'first_at': date, 'last_at': date}
+        else:
+            state['count'] += 1
+            state['first_at'] = min(state['first_at'], date)
+            state['last_at'] = max(state['last_at'], date)
+        user.totals['achievements_count'] += 1
+
+    @_locked
+    def get_daily_rollup(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        rows = self._rollup_rows(user_id, history_since(days), datetime.date.today().isoformat())
+        return rows[::-1]
+
+    def _get_period_rollup(self, user_id: int, period, start_date: datetime.date) -> List[Dict[str, Any]]:
+        periods: Dict[str, List[Dict[str, Any]]] = {}
+        for row in self._rollup_rows(user_id, start_date.isoformat()):
+            periods.setdefault(period(datetime.date.fromisoformat(row['date'])), []).append(row)
+
+        result = []
+        for key in sorted(periods, reverse=True):
+            rows = periods[key]
+
+            def present(column: str) -> List[Any]:
+                return [row[column] for row in rows if row[column] is not None]
+
+            result.append({
+                'period': key,
+                'start_date': rows[0]['date'],
+                'end_date': rows[-1]['date'],
+                'water_total': sum(present('water')),
+                'water_avg': _average(present('water')),
+                'sleep_avg_hours': _average(present('sleep_hours')),
+                'sleep_avg_quality': _average(present('sleep_quality')),
+                'steps_total': sum(present('steps')),
+                'steps_avg': _average(present('steps')),
+                'workout_minutes': sum(present('workout_minutes')),
+                'mood_avg': _average(present('mood_score')),
+                'pomodoros': sum(row['pomodoros'] for row in rows),
+                'pomodoro_minutes': sum(row['pomodoro_minutes'] for row in rows),
+                'meditation_minutes': sum(row['meditation_minutes'] for row in rows),
+                'habits_done': sum(row['habits_done'] for row in rows),
+            })
+        return result
+
+    @_locked
+    def get_weekly_rollup(self, user_id: int, weeks: int = 4) -> List[Dict[str, Any]]:
+        today = datetime.date.today()
+        start_date = today - datetime.timedelta(days=today.weekday() + 7 * (weeks - 1))
+        return self._get_period_rollup(
+            user_id, lambda day: (day - datetime.timedelta(days=day.weekday())).isoformat(), start_date
+        )
+
+    @_locked
+    def get_monthly_rollup(self, user_id: int, months: int = 6) -> List[Dict[str, Any]]:
+        today = datetime.date.today()
+        month_index = today.year * 12 + today.month - 1 - (months - 1)
+        start_date = datetime.date(month_index // 12, month_index % 12 + 1, 1)
+        return self._get_period_rollup(user_id, lambda day: day.strftime('%Y-%m'), start_date)
+
+    def get_water_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        return [
+            {'date': row['date'], 'amount': row['water'], 'goal_reached': int(row['water'] >= 8)}
+            for row in self.get_daily_rollup(user_id, days) if row['water'] is not None
+        ]
+
+    def get_sleep_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        return [
+            {'date': row['date'], 'hours': row['sleep_hours'], 'quality': row['sleep_quality'],
+             'goal_reached': int(row['sleep_hours'] >= 7)}
+            for row in self.get_daily_rollup(user_id, days) if row['sleep_hours'] is not None
+        ]
+
+    def get_activity_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        return [
+            {'date': row['date'], 'steps': row['steps'], 'workout_minutes': row['workout_minutes'],
+             'goal_reached': int(row['steps'] >= 10000)}
+            for row in self.get_daily_rollup(user_id, days) if row['steps'] is not None
+        ]
+
+    @_locked
+    def get_mood_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        rows = self._user(user_id).mood.range(history_since(days), datetime.date.today().isoformat())
+        return [dict(row) for row in reversed(rows)]
+
+    @_locked
+    def get_mood_statistics(self, user_id: int) -> Dict[str, Any]:
+        user = self._user(user_id)
+        moods = Counter(row['mood'] for row in user.mood.rows)
+        most_common = [mood for mood, _ in sorted(moods.items(), key=lambda item: (-item[1], item[0]))[:3]]
+        return {
+            'days_with_mood': user.totals['mood_days'],
+            'most_common_moods': most_common,
+            'total_moods': len(most_common),
+        }
+
+    @_locked
+    def get_user_streaks(self, user_id: int) -> Dict[str, Any]:
+        today = datetime.date.today().isoformat()
+        streaks = self._user(user_id).streaks
+        result = {}
+        for metric in STREAK_METRICS:
+            state = streaks.get(metric)
+            result[f'{metric}_streak'] = state['current_streak'] if state and state['last_goal_date'] == today else 0
+            result[f'best_{metric}_streak'] = state['best_streak'] if state else 0
+        return result
+
+    def get_user_streaks_many(self, user_ids: Iterable[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for user_id in dict.fromkeys(user_ids):
+            yield user_id, self.get_user_streaks(user_id)
+
+    @_locked
+    def add_workout_session(self, user_id: int, date: str, workout_type: str, duration: int, calories: int) -> None:
+        user = self._user(user_id)
+        user.totals['workout_days'] += not user.workouts.range(date, date)
+        user.workouts.add({
+            'id': next(self._ids['workouts']), 'date': date, 'workout_type': workout_type,
+            'duration': duration, 'calories': calories,
+        })
+        user.totals['workout_count'] += 1
+        user.totals['workout_minutes'] += duration or 0
+
+    @_locked
+    def get_workout_statistics(self, user_id: int) -> Dict[str, Any]:
+        totals = self._user(user_id).totals
+        return {
+            'total_workouts': totals['workout_count'],
+            'total_minutes': totals['workout_minutes'],
+            'days_with_workout': totals['workout_days'],
+        }
+
+    @_locked
+    def record_sos_usage(self, user_id: int, date: str) -> None:
+        self._user(user_id).sos.add({'id': next(self._ids['sos']), 'date': date})
+
+    def _history(self, user_id: int, days: Optional[int], metrics) -> Any:
+        user = self._user(user_id)
+        since = history_since(days)
+        rows = [
+            (row['date'],) + tuple(row[metric] for metric in metrics)
+            for row in self._rollup_rows(user_id, since)
+        ] if metrics else []
+        moods = (row['mood'] for row in user.mood.range(since) if row['mood'] is not None)
+        return build_history(rows, moods, metrics)
+
+    @_locked
+    def get_mood_patterns(self, user_id: int) -> Dict[str, Any]:
+        return mood_patterns(self._history(user_id, None, ()))
+
+    @_locked
+    def get_user_trends(self, user_id: int, days: Optional[int] = 365, window: int = 7) -> Dict[str, Any]:
+        return trend_report(self._history(user_id, days, TREND_METRICS), window)
+
+    @_locked
+    def get_current_mood_data(self, user_id: int) -> Dict[str, Any]:
+        row = self._user(user_id).mood.get(datetime.date.today().isoformat())
+        if row:
+            return {
+                'today_mood': row['mood'],
+                'today_emoji': row['emoji'],
+            }
+        return {'today_mood': 'Не отмечено', 'today_emoji': ''}
+
+    @_locked
+    def get_current_sleep_data(self, user_id: int) -> Dict[str, Any]:
+        user = self._user(user_id)
+        today = datetime.date.today()
+        row = user.sleep.get(today.isoformat())
+        week = user.sleep.range((today - datetime.timedelta(days=7)).isoformat())
+        return {
+            'today_hours': row['hours'] if row else 0.0,
+            'today_quality': row['quality'] if row else 0,
+            'avg_hours': _average([day['hours'] for day in week if day['hours'] is not None]) or 0.0,
+            'avg_quality': _average([day['quality'] for day in week if day['quality'] is not None]) or 0.0,
+        }
+
+    @_locked
+    def get_physical_health_overview(self, user_id: int) -> Dict[str, Any]:
+        totals = self._user(user_id).totals
+        return {
+            'water': {
+                'days_with_water': totals['water_days'],
+                'total_amount': totals['water_total'],
+            },
+            'sleep': {
+                'days_with_sleep': totals['sleep_days'],
+                'avg_hours': totals['sleep_hours_total'] / totals['sleep_days'] if totals['sleep_days'] else 0.0,
+            },
+            'activity': {
+                'days_with_activity': totals['activity_days'],
+                'avg_steps': totals['steps_total'] // totals['activity_days'] if totals['activity_days'] else 0,
+                'total_steps': totals['steps_total'],
+            },
+        }
+
+    @_locked
+    def add_mood_note(self, user_id: int, date: str, note: str) -> None:
+        self._user(user_id).mood_notes.put(date, {'date': date, 'note': note})
+
+    @_locked
+    def get_meditation_statistics(self, user_id: int) -> Dict[str, Any]:
+        user = self._user(user_id)
+        today = datetime.date.today().isoformat()
+        return {
+            'today_minutes': sum(row['duration'] or 0 for row in user.meditation.range(today, today)),
+            'total_sessions': user.totals['meditation_sessions'],
+            'total_minutes': user.totals['meditation_minutes'],
+        }
+
+    @_locked
+    def get_social_overview(self, user_id: int) -> Dict[str, Any]:
+        totals = self._user(user_id).totals
+        return {
+            'pomodoro': {
+                'total_sessions': totals['pomodoro_count'],
+                'total_duration': totals['pomodoro_minutes'],
+            },
+            'habits': {
+                'total_count': totals['habits_count'],
+            },
+            'goals': {
+                'total_count': totals['goals_count'],
+                'completed_count': totals['goals_completed'],
+            },
+        }
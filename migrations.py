@@ -0,0 +1,805 @@
+import sqlite3
+import logging
+import datetime
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from achievements import ACHIEVEMENT_CATALOG, legacy_achievement_id
+
+logger = logging.getLogger(__name__)
+
+Migration = namedtuple('Migration', ['version', 'name', 'upgrade'])
+
+ONE_DAY = datetime.timedelta(days=1)
+
+SCHEMA_V1 = [
+    '''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_active TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            streak_days INTEGER DEFAULT 0
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS water_tracking (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            amount INTEGER DEFAULT 0,
+            goal_reached BOOLEAN DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (user_id),
+            UNIQUE(user_id, date)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS sleep_tracking (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            hours REAL,
+            quality INTEGER CHECK(quality >= 1 AND quality <= 5),
+            goal_reached BOOLEAN DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (user_id),
+            UNIQUE(user_id, date)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS activity_tracking (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            steps INTEGER DEFAULT 0,
+            workout_minutes INTEGER DEFAULT 0,
+            goal_reached BOOLEAN DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (user_id),
+            UNIQUE(user_id, date)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS mood_tracking (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            mood TEXT,
+            emoji TEXT,
+            note TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (user_id),
+            UNIQUE(user_id, date)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS pomodoro_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            duration INTEGER,
+            session_type TEXT CHECK(session_type IN ('work', 'break')),
+            completed BOOLEAN DEFAULT 0,
+            actual_duration INTEGER,
+            task_description TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS habits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            name TEXT NOT NULL,
+            description TEXT,
+            frequency TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS habit_completions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            habit_id INTEGER,
+            date DATE,
+            completed BOOLEAN DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (user_id),
+            FOREIGN KEY (habit_id) REFERENCES habits (id),
+            UNIQUE(user_id, habit_id, date)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            name TEXT NOT NULL,
+            description TEXT,
+            deadline DATE,
+            progress INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS achievements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            achievement TEXT NOT NULL,
+            category TEXT,
+            date DATE,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS meditation_tracking (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            duration INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS breathing_practices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            duration INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS workout_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            workout_type TEXT,
+            duration INTEGER,
+            calories INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS sos_usage (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+    '''
+        CREATE TABLE IF NOT EXISTS mood_notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date DATE,
+            note TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''',
+]
+
+INDEXES_V1 = [
+    'CREATE INDEX IF NOT EXISTS idx_pomodoro_sessions_user_date ON pomodoro_sessions (user_id, date, completed, duration)',
+    'CREATE INDEX IF NOT EXISTS idx_achievements_user_date ON achievements (user_id, date)',
+    'CREATE INDEX IF NOT EXISTS idx_workout_history_user_date ON workout_history (user_id, date, duration)',
+    'CREATE INDEX IF NOT EXISTS idx_meditation_tracking_user_date ON meditation_tracking (user_id, date, duration)',
+    'CREATE INDEX IF NOT EXISTS idx_breathing_practices_user_date ON breathing_practices (user_id, date)',
+    'CREATE INDEX IF NOT EXISTS idx_sos_usage_user_date ON sos_usage (user_id, date)',
+    'CREATE INDEX IF NOT EXISTS idx_mood_notes_user_date ON mood_notes (user_id, date)',
+    'CREATE INDEX IF NOT EXISTS idx_habits_user ON habits (user_id)',
+    'CREATE INDEX IF NOT EXISTS idx_habit_completions_habit ON habit_completions (habit_id, completed)',
+    'CREATE INDEX IF NOT EXISTS idx_goals_user ON goals (user_id, status)',
+    'CREATE INDEX IF NOT EXISTS idx_water_tracking_goal ON water_tracking (user_id, date) WHERE goal_reached = 1',
+    'CREATE INDEX IF NOT EXISTS idx_sleep_tracking_goal ON sleep_tracking (user_id, date) WHERE goal_reached = 1',
+    'CREATE INDEX IF NOT EXISTS idx_activity_tracking_goal ON activity_tracking (user_id, date) WHERE goal_reached = 1',
+]
+
+MOOD_NOTES_V3 = '''
+    CREATE TABLE {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date DATE,
+        note TEXT,
+        FOREIGN KEY (user_id) REFERENCES users (user_id),
+        UNIQUE(user_id, date)
+    )
+'''
+
+MOOD_NOTES_V3_COPY = '''
+    INSERT INTO {target} (id, user_id, date, note)
+    SELECT id, user_id, date, note FROM {source}
+    WHERE id > ? AND id <= ?
+    ORDER BY id
+    ON CONFLICT(user_id, date) DO UPDATE SET id = excluded.id, note = excluded.note
+'''
+
+MOOD_SCORES = {
+    'Отлично': 5,
+    'Хорошо': 4,
+    'Нормально': 3,
+    'Не очень': 2,
+    'Плохо': 1,
+}
+DEFAULT_MOOD_SCORE = 3
+
+MOOD_SCORE_SQL = 'CASE {mood}\n' + ''.join(
+    f"    WHEN '{mood}' THEN {score}\n" for mood, score in MOOD_SCORES.items()
+) + f'    ELSE {DEFAULT_MOOD_SCORE}\nEND'
+
+USER_AGGREGATES_V4 = '''
+    CREATE TABLE IF NOT EXISTS user_aggregates (
+        user_id INTEGER PRIMARY KEY,
+        water_days INTEGER NOT NULL DEFAULT 0,
+        water_total INTEGER NOT NULL DEFAULT 0,
+        sleep_days INTEGER NOT NULL DEFAULT 0,
+        sleep_hours_total REAL NOT NULL DEFAULT 0,
+        activity_days INTEGER NOT NULL DEFAULT 0,
+        steps_total INTEGER NOT NULL DEFAULT 0,
+        mood_days INTEGER NOT NULL DEFAULT 0,
+        mood_score_total INTEGER NOT NULL DEFAULT 0,
+        pomodoro_count INTEGER NOT NULL DEFAULT 0,
+        pomodoro_minutes INTEGER NOT NULL DEFAULT 0,
+        workout_count INTEGER NOT NULL DEFAULT 0,
+        workout_minutes INTEGER NOT NULL DEFAULT 0,
+        workout_days INTEGER NOT NULL DEFAULT 0,
+        meditation_sessions INTEGER NOT NULL DEFAULT 0,
+        meditation_minutes INTEGER NOT NULL DEFAULT 0,
+        habits_count INTEGER NOT NULL DEFAULT 0,
+        goals_count INTEGER NOT NULL DEFAULT 0,
+        goals_completed INTEGER NOT NULL DEFAULT 0,
+        achievements_count INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+# Источник -> (изменяемые строки, [(колонка, выражение над строкой {row}, агрегат для пересборки)]).
+# Для append-only таблиц счетчики только растут: удаление старых строк не уменьшает итоги за все время.
+AGGREGATE_SOURCES_V4 = {
+    'water_tracking': (True, [
+        ('water_days', '1', None),
+        ('water_total', '{row}.amount', None),
+    ]),
+    'sleep_tracking': (True, [
+        ('sleep_days', '1', None),
+        ('sleep_hours_total', '{row}.hours', None),
+    ]),
+    'activity_tracking': (True, [
+        ('activity_days', '1', None),
+        ('steps_total', '{row}.steps', None),
+    ]),
+    'mood_tracking': (True, [
+        ('mood_days', '1', None),
+        ('mood_score_total', MOOD_SCORE_SQL.format(mood='{row}.mood'), None),
+    ]),
+    'habits': (True, [
+        ('habits_count', '1', None),
+    ]),
+    'goals': (True, [
+        ('goals_count', '1', None),
+        ('goals_completed', "{row}.status = 'completed'", None),
+    ]),
+    'pomodoro_sessions': (False, [
+        ('pomodoro_count', '1', None),
+        ('pomodoro_minutes', '{row}.duration', None),
+    ]),
+    'workout_history': (False, [
+        ('workout_count', '1', None),
+        ('workout_minutes', '{row}.duration', None),
+        ('workout_days',
+         'NOT EXISTS (SELECT 1 FROM workout_history w WHERE w.user_id = {row}.user_id AND w.date = {row}.date AND w.id <> {row}.id)',
+         'COUNT(DISTINCT {row}.date)'),
+    ]),
+    'meditation_tracking': (False, [
+        ('meditation_sessions', '1', None),
+        ('meditation_minutes', '{row}.duration', None),
+    ]),
+    'achievements': (False, [
+        ('achievements_count', '1', None),
+    ]),
+}
+
+DAILY_ROLLUP_V6 = '''
+    CREATE TABLE IF NOT EXISTS daily_rollup (
+        user_id INTEGER NOT NULL,
+        date DATE NOT NULL,
+        water INTEGER,
+        sleep_hours REAL,
+        sleep_quality INTEGER,
+        steps INTEGER,
+        workout_minutes INTEGER,
+        mood_score INTEGER,
+        pomodoros INTEGER NOT NULL DEFAULT 0,
+        pomodoro_minutes INTEGER NOT NULL DEFAULT 0,
+        meditation_minutes INTEGER NOT NULL DEFAULT 0,
+        habits_done INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, date)
+    ) WITHOUT ROWID
+'''
+
+# Таблица -> (режим, [(колонка daily_rollup, выражение над {row})]).
+# 'set' - в исходной таблице одна строка на день, значение копируется (NULL - нет данных);
+# 'add' - строк за день несколько, значения суммируются.
+ROLLUP_SOURCES_V6 = {
+    'water_tracking': ('set', [('water', '{row}.amount')]),
+    'sleep_tracking': ('set', [('sleep_hours', '{row}.hours'), ('sleep_quality', '{row}.quality')]),
+    'activity_tracking': ('set', [('steps', '{row}.steps'), ('workout_minutes', '{row}.workout_minutes')]),
+    'mood_tracking': ('set', [('mood_score', MOOD_SCORE_SQL.format(mood='{row}.mood'))]),
+    'pomodoro_sessions': ('add', [
+        ('pomodoros', '{row}.completed = 1'),
+        ('pomodoro_minutes', 'CASE WHEN {row}.completed = 1 THEN {row}.duration ELSE 0 END'),
+    ]),
+    'meditation_tracking': ('add', [('meditation_minutes', '{row}.duration')]),
+    'habit_completions': ('add', [('habits_done', '{row}.completed = 1')]),
+}
+
+STREAK_METRICS = {
+    'water': 'water_tracking',
+    'sleep': 'sleep_tracking',
+    'activity': 'activity_tracking',
+}
+
+USER_STREAKS_V5 = '''
+    CREATE TABLE IF NOT EXISTS user_streaks (
+        user_id INTEGER NOT NULL,
+        metric TEXT NOT NULL,
+        current_streak INTEGER NOT NULL DEFAULT 0,
+        last_goal_date DATE,
+        best_streak INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, metric)
+    ) WITHOUT ROWID
+'''
+
+# Граница архива: строки RETENTION_TABLES старше нее удалены, их вклад остается
+# в archived_aggregates (итоги за все время) и в daily_rollup (история по дням)
+RETENTION_HORIZON_V7 = '''
+    CREATE TABLE IF NOT EXISTS retention_horizon (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        archived_before DATE NOT NULL
+    )
+'''
+
+ARCHIVED_AGGREGATES_V7 = USER_AGGREGATES_V4.replace('user_aggregates', 'archived_aggregates')
+
+ACHIEVEMENTS_COUNT_V7 = 'ALTER TABLE achievements ADD COLUMN count INTEGER NOT NULL DEFAULT 1'
+
+RETENTION_TABLES = (
+    'pomodoro_sessions', 'workout_history', 'meditation_tracking',
+    'breathing_practices', 'sos_usage', 'mood_notes',
+)
+
+ARCHIVED_BEFORE_SQL = "COALESCE((SELECT archived_before FROM retention_horizon), '')"
+
+ACHIEVEMENT_CATALOG_V8 = '''
+    CREATE TABLE IF NOT EXISTS achievement_catalog (
+        id INTEGER PRIMARY KEY,
+        code TEXT NOT NULL UNIQUE,
+        category TEXT NOT NULL,
+        template TEXT NOT NULL
+    )
+'''
+
+# Одна строка на пару (пользователь, достижение) вместо строки на каждое получение
+USER_ACHIEVEMENTS_V8 = '''
+    CREATE TABLE IF NOT EXISTS user_achievements (
+        user_id INTEGER NOT NULL,
+        achievement_id INTEGER NOT NULL REFERENCES achievement_catalog (id),
+        count INTEGER NOT NULL DEFAULT 1,
+        first_at DATE NOT NULL,
+        last_at DATE NOT NULL,
+        PRIMARY KEY (user_id, achievement_id)
+    ) WITHOUT ROWID
+'''
+
+# Запущенные Pomodoro: дедлайн фазы в секундах Unix или замороженный остаток на паузе
+ACTIVE_POMODOROS_V9 = '''
+    CREATE TABLE IF NOT EXISTS active_pomodoros (
+        user_id INTEGER PRIMARY KEY,
+        state TEXT NOT NULL CHECK(state IN ('work', 'break')),
+        deadline REAL,
+        paused_remaining REAL,
+        task TEXT,
+        chat_id INTEGER NOT NULL,
+        message_id INTEGER NOT NULL,
+        CHECK((deadline IS NULL) != (paused_remaining IS NULL))
+    )
+'''
+
+ACTIVE_POMODOROS_DEADLINE_V9 = '''
+    CREATE INDEX IF NOT EXISTS idx_active_pomodoros_deadline ON active_pomodoros (deadline) WHERE deadline IS NOT NULL
+'''
+
+AGGREGATE_SOURCES_V8 = {
+    **{table: source for table, source in AGGREGATE_SOURCES_V4.items() if table != 'achievements'},
+    'user_achievements': (True, [
+        ('achievements_count', '{row}.count', None),
+    ]),
+}
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def _set_schema_version(conn: sqlite3.Connection, version: int) -> None:
+    conn.execute(f'PRAGMA user_version = {int(version)}')
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection):
+    # Внутри общей транзакции офлайн-миграции отдельные шаги не коммитятся
+    if conn.in_transaction:
+        yield
+        return
+    
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def _execute_all(conn: sqlite3.Connection, statements: List[str]) -> None:
+    with _transaction(conn):
+        for statement in statements:
+            conn.execute(statement)
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+def archived_before(conn: sqlite3.Connection) -> str:
+    if not _table_exists(conn, 'retention_horizon'):
+        return ''
+    return conn.execute(f'SELECT {ARCHIVED_BEFORE_SQL}').fetchone()[0]
+
+def rebuild_table(conn: sqlite3.Connection, table: str, create_sql: str, copy_sql: str,
+                  batch_size: int, indexes: List[str] = ()) -> None:
+    # Пересборка append-only таблицы: копирование пачками по id короткими транзакциями,
+    # затем догоняющее копирование и подмена таблицы в одной транзакции
+    new_table = f'{table}_rebuild'
+    with _transaction(conn):
+        conn.execute(f'DROP TABLE IF EXISTS {new_table}')
+        conn.execute(create_sql.format(table=new_table))
+    
+    last_id = 0
+    copy = copy_sql.format(source=table, target=new_table)
+    while True:
+        with _transaction(conn):
+            row = conn.execute(
+                f'SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)',
+                (last_id, batch_size)
+            ).fetchone()
+            if row[0] is None:
+                break
+            conn.execute(copy, (last_id, row[0]))
+            last_id = row[0]
+    
+    with _transaction(conn):
+        conn.execute(copy, (last_id, 2 ** 63 - 1))
+        conn.execute(f'DROP TABLE {table}')
+        conn.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+        for statement in indexes:
+            conn.execute(statement)
+
+def aggregate_triggers(sources: Dict[str, Tuple[bool, list]]) -> List[str]:
+    statements = []
+    for table, (mutable, columns) in sources.items():
+        def delta(row: str, sign: str) -> str:
+            return ', '.join(
+                f'{column} = {column} {sign} COALESCE(({expression.format(row=row)}), 0)'
+                for column, expression, _ in columns
+            )
+        
+        # Без OR IGNORE: внутри триггера его подменила бы политика внешнего INSERT OR REPLACE
+        ensure_new = (
+            'INSERT INTO user_aggregates (user_id) SELECT NEW.user_id '
+            'WHERE NOT EXISTS (SELECT 1 FROM user_aggregates WHERE user_id = NEW.user_id);'
+        )
+        statements.append(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_aggregates_insert AFTER INSERT ON {table} WHEN NEW.user_id IS NOT NULL
+            BEGIN
+                {ensure_new}
+                UPDATE user_aggregates SET {delta('NEW', '+')} WHERE user_id = NEW.user_id;
+            END
+        ''')
+        if not mutable:
+            continue
+        statements.append(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_aggregates_delete AFTER DELETE ON {table}
+            BEGIN
+                UPDATE user_aggregates SET {delta('OLD', '-')} WHERE user_id = OLD.user_id;
+            END
+        ''')
+        statements.append(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_aggregates_update AFTER UPDATE ON {table} WHEN NEW.user_id IS NOT NULL
+            BEGIN
+                UPDATE user_aggregates SET {delta('OLD', '-')} WHERE user_id = OLD.user_id;
+                {ensure_new}
+                UPDATE user_aggregates SET {delta('NEW', '+')} WHERE user_id = NEW.user_id;
+            END
+        ''')
+    return statements
+
+def _aggregate_upsert(target: str, table: str, columns: list, where: str = '') -> str:
+    names = ', '.join(column for column, _, _ in columns)
+    values = ', '.join(
+        (rebuild or 'SUM(COALESCE(({expression}), 0))').format(expression=expression.format(row='src'), row='src')
+        for _, expression, rebuild in columns
+    )
+    updates = ', '.join(f'{column} = {column} + excluded.{column}' for column, _, _ in columns)
+    return f'''
+        INSERT INTO {target} (user_id, {names})
+        SELECT src.user_id, {values} FROM {table} AS src
+        WHERE src.user_id IS NOT NULL {where}
+        GROUP BY src.user_id
+        ON CONFLICT(user_id) DO UPDATE SET {updates}
+    '''
+
+def rebuild_aggregates(conn: sqlite3.Connection, sources: Dict[str, Tuple[bool, list]]) -> int:
+    with _transaction(conn):
+        conn.execute('DELETE FROM user_aggregates')
+        if _table_exists(conn, 'archived_aggregates'):
+            # Вклад строк, удаленных при очистке: без него итоги за все время уменьшились бы
+            conn.execute('INSERT INTO user_aggregates SELECT * FROM archived_aggregates')
+        for table, (_, columns) in sources.items():
+            conn.execute(_aggregate_upsert('user_aggregates', table, columns))
+        return conn.execute('SELECT COUNT(*) FROM user_aggregates').fetchone()[0]
+
+def rollup_triggers(sources: Dict[str, Tuple[str, list]], retention: bool = False) -> List[str]:
+    statements = []
+    for table, (mode, columns) in sources.items():
+        # Удаление строк старше границы архива - это очистка, а не правка истории: сводку не откатываем
+        archived = f' WHEN OLD.date >= {ARCHIVED_BEFORE_SQL}' if retention and table in RETENTION_TABLES else ''
+        def apply(row: str) -> str:
+            if mode == 'set':
+                assignments = ', '.join(f'{column} = {expression.format(row=row)}' for column, expression in columns)
+            else:
+                assignments = ', '.join(
+                    f'{column} = {column} + COALESCE(({expression.format(row=row)}), 0)' for column, expression in columns
+                )
+            return f'UPDATE daily_rollup SET {assignments} WHERE user_id = {row}.user_id AND date = {row}.date;'
+        
+        def revert(row: str) -> str:
+            if mode == 'set':
+                assignments = ', '.join(f'{column} = NULL' for column, _ in columns)
+            else:
+                assignments = ', '.join(
+                    f'{column} = {column} - COALESCE(({expression.format(row=row)}), 0)' for column, expression in columns
+                )
+            return f'UPDATE daily_rollup SET {assignments} WHERE user_id = {row}.user_id AND date = {row}.date;'
+        
+        ensure_new = (
+            'INSERT INTO daily_rollup (user_id, date) SELECT NEW.user_id, NEW.date '
+            'WHERE NOT EXISTS (SELECT 1 FROM daily_rollup WHERE user_id = NEW.user_id AND date = NEW.date);'
+        )
+        has_key = 'NEW.user_id IS NOT NULL AND NEW.date IS NOT NULL'
+        statements.append(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_insert AFTER INSERT ON {table} WHEN {has_key}
+            BEGIN
+                {ensure_new}
+                {apply('NEW')}
+            END
+        ''')
+        statements.append(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_delete AFTER DELETE ON {table}{archived}
+            BEGIN
+                {revert('OLD')}
+            END
+        ''')
+        statements.append(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_update AFTER UPDATE ON {table} WHEN {has_key}
+            BEGIN
+                {revert('OLD')}
+                {ensure_new}
+                {apply('NEW')}
+            END
+        ''')
+    return statements
+
+def rebuild_daily_rollup(conn: sqlite3.Connection, sources: Dict[str, Tuple[str, list]]) -> int:
+    with _transaction(conn):
+        # Дни старше границы архива для RETENTION_TABLES есть только в сводке - их не пересчитываем
+        horizon = archived_before(conn)
+        conn.execute('DELETE FROM daily_rollup WHERE date >= ?', (horizon,))
+        for table, (mode, columns) in sources.items():
+            names = ', '.join(column for column, _ in columns)
+            template = 'MAX({expression})' if mode == 'set' else 'SUM(COALESCE(({expression}), 0))'
+            values = ', '.join(template.format(expression=expression.format(row='src')) for _, expression in columns)
+            updates = ', '.join(f'{column} = excluded.{column}' for column, _ in columns)
+            since = horizon if table in RETENTION_TABLES else ''
+            conn.execute(f'''
+                INSERT INTO daily_rollup (user_id, date, {names})
+                SELECT src.user_id, src.date, {values} FROM {table} AS src
+                WHERE src.user_id IS NOT NULL AND src.date IS NOT NULL AND src.date >= ?
+                GROUP BY src.user_id, src.date
+                ON CONFLICT(user_id, date) DO UPDATE SET {updates}
+            ''', (since,))
+        return conn.execute('SELECT COUNT(*) FROM daily_rollup').fetchone()[0]
+
+def streak_runs(dates: List[str]) -> Tuple[int, Optional[str], int]:
+    # dates - дни с выполненной целью по возрастанию; возвращает (текущая серия, последний день, лучшая серия)
+    current = best = 0
+    previous = None
+    for value in dates:
+        day = datetime.date.fromisoformat(value)
+        current = current + 1 if previous and day - previous == ONE_DAY else 1
+        best = max(best, current)
+        previous = day
+    return current, dates[-1] if dates else None, best
+
+def recompute_streak(conn: sqlite3.Connection, user_id: int, metric: str) -> None:
+    table = STREAK_METRICS[metric]
+    dates = [row[0] for row in conn.execute(
+        f'SELECT date FROM {table} WHERE user_id = ? AND goal_reached = 1 ORDER BY date', (user_id,)
+    )]
+    current, last_goal_date, best = streak_runs(dates)
+    conn.execute('''
+        INSERT INTO user_streaks (user_id, metric, current_streak, last_goal_date, best_streak)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(user_id, metric) DO UPDATE SET
+            current_streak = excluded.current_streak,
+            last_goal_date = excluded.last_goal_date,
+            best_streak = excluded.best_streak
+    ''', (user_id, metric, current, last_goal_date, best))
+
+def sync_achievement_catalog(conn: sqlite3.Connection, catalog: list) -> None:
+    conn.executemany('''
+        INSERT INTO achievement_catalog (id, code, category, template) VALUES (?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET code = excluded.code, category = excluded.category, template = excluded.template
+    ''', catalog)
+
+def _archive_rows(conn: sqlite3.Connection, table: str, ids: List[int]) -> None:
+    # Вклад удаляемых строк переносится в archived_aggregates; в user_aggregates он уже учтен
+    # триггерами вставки, а DELETE-триггеров у append-only источников нет
+    placeholders = ', '.join('?' * len(ids))
+    if table in AGGREGATE_SOURCES:
+        _, columns = AGGREGATE_SOURCES[table]
+        conn.execute(_aggregate_upsert('archived_aggregates', table, columns, f'AND src.id IN ({placeholders})'), ids)
+    conn.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', ids)
+
+def compact_table(conn: sqlite3.Connection, table: str, before: str, batch_size: int) -> int:
+    # Пачки по id, как в rebuild_table. В пачку целиком входят дни пользователей из ее строк,
+    # иначе COUNT(DISTINCT date) в archived_aggregates учел бы разрезанный день дважды
+    archived = 0
+    last_id = 0
+    while True:
+        with _transaction(conn):
+            row = conn.execute(
+                f'SELECT MAX(id) FROM (SELECT id FROM {table} WHERE id > ? AND date < ? ORDER BY id LIMIT ?)',
+                (last_id, before, batch_size)
+            ).fetchone()
+            if row[0] is None:
+                break
+            ids = [row[0] for row in conn.execute(f'''
+                SELECT src.id
+                FROM (SELECT DISTINCT user_id, date FROM {table} WHERE id > ? AND id <= ? AND date < ?) AS day
+                JOIN {table} AS src ON src.user_id IS day.user_id AND src.date = day.date
+            ''', (last_id, row[0], before))]
+            _archive_rows(conn, table, ids)
+            archived += len(ids)
+            last_id = row[0]
+    return archived
+
+def compact(conn: sqlite3.Connection, retention_days: int, batch_size: int,
+            today: Optional[datetime.date] = None) -> Dict[str, int]:
+    today = today or datetime.date.today()
+    stats = {}
+    if retention_days:
+        with _transaction(conn):
+            # Граница только сдвигается вперед: уменьшение RETENTION_DAYS не вернет удаленное
+            conn.execute('''
+                INSERT INTO retention_horizon (id, archived_before) VALUES (1, ?)
+                ON CONFLICT(id) DO UPDATE SET archived_before = MAX(archived_before, excluded.archived_before)
+            ''', ((today - datetime.timedelta(days=retention_days)).isoformat(),))
+            before = archived_before(conn)
+        for table in RETENTION_TABLES:
+            stats[table] = compact_table(conn, table, before, batch_size)
+    return stats
+
+def _upgrade_v1(conn: sqlite3.Connection, batch_size: int) -> None:
+    _execute_all(conn, SCHEMA_V1)
+
+def _upgrade_v2(conn: sqlite3.Connection, batch_size: int) -> None:
+    _execute_all(conn, INDEXES_V1)
+
+def _upgrade_v3(conn: sqlite3.Connection, batch_size: int) -> None:
+    # UNIQUE(user_id, date) заменяет idx_mood_notes_user_date, поэтому индекс не пересоздается
+    rebuild_table(conn, 'mood_notes', MOOD_NOTES_V3, MOOD_NOTES_V3_COPY, batch_size)
+
+def _upgrade_v4(conn: sqlite3.Connection, batch_size: int) -> None:
+    _execute_all(conn, [USER_AGGREGATES_V4] + aggregate_triggers(AGGREGATE_SOURCES_V4))
+    rebuild_aggregates(conn, AGGREGATE_SOURCES_V4)
+
+def _upgrade_v5(conn: sqlite3.Connection, batch_size: int) -> None:
+    _execute_all(conn, [USER_STREAKS_V5])
+    for metric, table in STREAK_METRICS.items():
+        user_ids = [row[0] for row in conn.execute(
+            f'SELECT DISTINCT user_id FROM {table} WHERE goal_reached = 1 AND user_id IS NOT NULL'
+        )]
+        for start in range(0, len(user_ids), batch_size):
+            with _transaction(conn):
+                for user_id in user_ids[start:start + batch_size]:
+                    recompute_streak(conn, user_id, metric)
+
+def _upgrade_v6(conn: sqlite3.Connection, batch_size: int) -> None:
+    _execute_all(conn, [DAILY_ROLLUP_V6] + rollup_triggers(ROLLUP_SOURCES_V6))
+    rebuild_daily_rollup(conn, ROLLUP_SOURCES_V6)
+
+def _upgrade_v7(conn: sqlite3.Connection, batch_size: int) -> None:
+    drops = [f'DROP TRIGGER IF EXISTS trg_{table}_rollup_delete' for table in ROLLUP_SOURCES_V6 if table in RETENTION_TABLES]
+    _execute_all(
+        conn,
+        [RETENTION_HORIZON_V7, ARCHIVED_AGGREGATES_V7, ACHIEVEMENTS_COUNT_V7] + drops
+        + rollup_triggers(ROLLUP_SOURCES_V6, retention=True)
+    )
+
+def _upgrade_v8(conn: sqlite3.Connection, batch_size: int) -> None:
+    with _transaction(conn):
+        conn.execute(ACHIEVEMENT_CATALOG_V8)
+        conn.execute(USER_ACHIEVEMENTS_V8)
+        sync_achievement_catalog(conn, ACHIEVEMENT_CATALOG)
+        
+        # Свободный текст старых строк сопоставляется с каталогом в Python, соответствие - во временной таблице
+        conn.execute('CREATE TEMP TABLE achievement_legacy (achievement TEXT PRIMARY KEY, achievement_id INTEGER NOT NULL)')
+        texts = [row[0] for row in conn.execute('SELECT DISTINCT achievement FROM achievements')]
+        conn.executemany(
+            'INSERT INTO temp.achievement_legacy VALUES (?, ?)',
+            [(text, legacy_achievement_id(text)) for text in texts]
+        )
+        conn.execute('''
+            INSERT INTO user_achievements (user_id, achievement_id, count, first_at, last_at)
+            SELECT a.user_id, l.achievement_id, SUM(a.count),
+                   COALESCE(MIN(a.date), date('now')), COALESCE(MAX(a.date), date('now'))
+            FROM achievements AS a
+            JOIN temp.achievement_legacy AS l ON l.achievement = a.achievement
+            WHERE a.user_id IS NOT NULL
+            GROUP BY a.user_id, l.achievement_id
+        ''')
+        conn.execute('DROP TABLE temp.achievement_legacy')
+        conn.execute('DROP TABLE achievements')
+        
+        # Свернутые при очистке повторы теперь учтены в user_achievements.count
+        conn.execute('UPDATE archived_aggregates SET achievements_count = 0')
+        for statement in aggregate_triggers(AGGREGATE_SOURCES_V8):
+            conn.execute(statement)
+    rebuild_aggregates(conn, AGGREGATE_SOURCES_V8)
+
+def _upgrade_v9(conn: sqlite3.Connection, batch_size: int) -> None:
+    _execute_all(conn, [ACTIVE_POMODOROS_V9, ACTIVE_POMODOROS_DEADLINE_V9])
+
+MIGRATIONS = [
+    Migration(1, 'baseline schema', _upgrade_v1),
+    Migration(2, 'per-user indexes', _upgrade_v2),
+    Migration(3, 'mood_notes unique per day', _upgrade_v3),
+    Migration(4, 'user aggregates', _upgrade_v4),
+    Migration(5, 'incremental streaks', _upgrade_v5),
+    Migration(6, 'daily rollup', _upgrade_v6),
+    Migration(7, 'retention and compaction', _upgrade_v7),
+    Migration(8, 'achievement catalog', _upgrade_v8),
+    Migration(9, 'active pomodoros', _upgrade_v9),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+AGGREGATE_SOURCES = AGGREGATE_SOURCES_V8
+ROLLUP_SOURCES = ROLLUP_SOURCES_V6
+
+def _pending(conn: sqlite3.Connection) -> List[Migration]:
+    current = get_schema_version(conn)
+    return [migration for migration in MIGRATIONS if migration.version > current]
+
+def migrate(conn: sqlite3.Connection, online: bool = False, batch_size: int = 1000) -> List[int]:
+    if not _pending(conn):
+        return []
+    
+    if online:
+        applied = []
+        for migration in _pending(conn):
+            logger.info(f"Миграция схемы {migration.version}: {migration.name} (online)")
+            migration.upgrade(conn, batch_size)
+            with _transaction(conn):
+                _set_schema_version(conn, migration.version)
+            applied.append(migration.version)
+        return applied
+    
+    with _transaction(conn):
+        pending = _pending(conn)
+        for migration in pending:
+            logger.info(f"Миграция схемы {migration.version}: {migration.name}")
+            migration.upgrade(conn, batch_size)
+        if pending:
+            _set_schema_version(conn, pending[-1].version)
+    return [migration.version for migration in pending]
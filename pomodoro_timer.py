@@ -0,0 +1,210 @@
+import time
+import asyncio
+import logging
+import datetime
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from apscheduler.jobstores.base import JobLookupError
+from telegram.ext import CallbackContext, JobQueue
+
+from config import (
+    POMODORO_DISPLAY_TICKS, POMODORO_MAX_EDITS_PER_MINUTE, POMODORO_EDIT_SHARE, POMODORO_JOB_CONCURRENCY,
+    EDIT_GLOBAL_RATE,
+)
+
+logger = logging.getLogger(__name__)
+
+WORK_SECONDS = 25 * 60
+BREAK_SECONDS = 5 * 60
+JOB_PREFIX = 'pomodoro:'
+
+@dataclass
+class PomodoroSession:
+    # Таймер хранит только дедлайн (время по часам системы); оставшееся время вычисляется.
+    # На паузе дедлайна нет, замороженный остаток лежит в paused_remaining
+    user_id: int
+    chat_id: int
+    message_id: int
+    task: str
+    state: str = 'work'
+    deadline: Optional[float] = None
+    paused_remaining: Optional[float] = None
+
+    @property
+    def is_paused(self) -> bool:
+        return self.paused_remaining is not None
+
+    def start_phase(self, state: str, seconds: float, now: Optional[float] = None) -> None:
+        self.state = state
+        self.deadline = (time.time() if now is None else now) + seconds
+        self.paused_remaining = None
+
+    def remaining(self, now: Optional[float] = None) -> int:
+        if self.is_paused:
+            return round(self.paused_remaining)
+        return max(0, round(self.deadline - (time.time() if now is None else now)))
+
+    def pause(self, now: Optional[float] = None) -> None:
+        if not self.is_paused:
+            self.paused_remaining = max(0.0, self.deadline - (time.time() if now is None else now))
+            self.deadline = None
+
+    def resume(self, now: Optional[float] = None) -> None:
+        if self.is_paused:
+            self.deadline = (time.time() if now is None else now) + self.paused_remaining
+            self.paused_remaining = None
+
+    def next_wakeup(self, now: Optional[float] = None, tick: Optional[float] = None) -> Tuple[float, bool]:
+        # Ближайший момент, когда остаток кратен tick (обновление экрана), или дедлайн.
+        # tick=None - экран обновляется только при смене фазы.
+        # Возвращает (время, истек ли таймер к этому моменту)
+        now = time.time() if now is None else now
+        left = self.deadline - now
+        if tick is None or left <= tick:
+            return self.deadline, True
+        steps = int(left // tick)
+        wakeup = self.deadline - steps * tick
+        if wakeup <= now:
+            wakeup += tick
+        return wakeup, False
+
+def phase_date(deadline: float) -> str:
+    # Фаза засчитывается в день своего окончания, в том числе когда она завершается после полуночи
+    return datetime.date.fromtimestamp(deadline).isoformat()
+
+def advance_overdue_pomodoro(row: Dict[str, Any], now: float, break_seconds: float) -> Dict[str, Any]:
+    # Фазы, истекшие пока бот не работал: completed - [(тип, дата окончания)], finished - цикл завершен целиком
+    row = dict(row, completed=[], finished=False)
+    if row['state'] == 'work':
+        row['completed'].append(('work', phase_date(row['deadline'])))
+        row['state'], row['deadline'] = 'break', row['deadline'] + break_seconds
+    if row['deadline'] <= now:
+        row['completed'].append(('break', phase_date(row['deadline'])))
+        row['finished'] = True
+    return row
+
+class RefreshPolicy:
+    # Частота обновления экрана по нагрузке: самый частый шаг из ticks, при котором все сессии
+    # укладываются в долю share общего лимита правок, очередь правок успевает разойтись за шаг
+    # и одна сессия делает не больше max_per_minute правок в минуту. Иначе - только смена фазы (None)
+    def __init__(self, ticks: List[float] = POMODORO_DISPLAY_TICKS, max_per_minute: float = POMODORO_MAX_EDITS_PER_MINUTE,
+                 edit_rate: float = EDIT_GLOBAL_RATE, share: float = POMODORO_EDIT_SHARE):
+        self.ticks = [tick for tick in ticks if 60 / tick <= max_per_minute]
+        self.budget = edit_rate * share
+        self.current: Optional[float] = self.ticks[0] if self.ticks else None
+        self.sessions = 0
+        self.session_seconds = 0.0
+        self._observed_at: Optional[float] = None
+
+    def _observe(self, sessions: int, now: float) -> None:
+        if self._observed_at is not None:
+            self.session_seconds += self.sessions * (now - self._observed_at)
+        self.sessions = sessions
+        self._observed_at = now
+
+    def tick(self, sessions: int, backlog: int = 0, now: Optional[float] = None) -> Optional[float]:
+        self._observe(sessions, time.time() if now is None else now)
+        chosen = None
+        for tick in self.ticks:
+            if sessions / tick <= self.budget and backlog / self.budget <= tick:
+                chosen = tick
+                break
+        if chosen != self.current:
+            mode = f"каждые {chosen:.0f} с" if chosen else "только при смене фазы"
+            logger.info(f"Обновление таймеров Pomodoro: {mode} (сессий {sessions}, в очереди правок {backlog})")
+            self.current = chosen
+        return chosen
+
+    def stats(self, api_calls: int) -> Dict[str, Any]:
+        # api_calls - запросы к Telegram за время работы; делятся на суммарные минуты запущенных сессий
+        self._observe(self.sessions, time.time())
+        session_minutes = self.session_seconds / 60
+        return {
+            'tick': self.current,
+            'sessions': self.sessions,
+            'session_minutes': round(session_minutes, 1),
+            'calls_per_session_minute': round(api_calls / session_minutes, 2) if session_minutes else 0.0,
+            'max_per_minute': POMODORO_MAX_EDITS_PER_MINUTE,
+        }
+
+class PomodoroJobs:
+    # Таймер Pomodoro - одна задача JobQueue с id "pomodoro:<ключ>" на фазу: повторяется с шагом
+    # interval или срабатывает один раз, если шага нет. Повторное планирование заменяет задачу,
+    # отмена идет по id без перебора очереди. Одновременно выполняется не больше concurrency
+    # колбэков, остальные сработавшие ждут слота. Колбэки - корутины без аргументов
+    def __init__(self, concurrency: int = POMODORO_JOB_CONCURRENCY):
+        self.job_queue: Optional[JobQueue] = None
+        self._scheduled: Dict[Hashable, Optional[float]] = {}
+        self._slots = asyncio.Semaphore(concurrency)
+        self.running = 0
+        self.fired = 0
+
+    def attach(self, job_queue: JobQueue) -> None:
+        self.job_queue = job_queue
+
+    def __len__(self) -> int:
+        return len(self._scheduled)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._scheduled
+
+    @staticmethod
+    def job_id(key: Hashable) -> str:
+        return f"{JOB_PREFIX}{key}"
+
+    def interval(self, key: Hashable) -> Optional[float]:
+        return self._scheduled.get(key)
+
+    def schedule(self, key: Hashable, when: float, interval: Optional[float],
+                 callback: Callable[[], Awaitable[Any]]) -> None:
+        # when - первое срабатывание по time.time(); просроченная задача выполняется сразу.
+        # Пропущенные из-за занятого цикла событий повторы сливаются в одно срабатывание
+        if self.job_queue is None:
+            raise RuntimeError("JobQueue не подключена: таймеры Pomodoro недоступны")
+        job_id = self.job_id(key)
+        first = datetime.datetime.fromtimestamp(when, datetime.timezone.utc)
+        job_kwargs = {'id': job_id, 'replace_existing': True, 'misfire_grace_time': None, 'coalesce': True}
+        if interval is None:
+            self.job_queue.run_once(self._run, when=first, data=(key, callback), name=job_id, job_kwargs=job_kwargs)
+        else:
+            self.job_queue.run_repeating(
+                self._run, interval=interval, first=first, data=(key, callback), name=job_id, job_kwargs=job_kwargs
+            )
+        self._scheduled[key] = interval
+
+    def cancel(self, key: Hashable) -> bool:
+        self._scheduled.pop(key, None)
+        if self.job_queue is None:
+            return False
+        try:
+            self.job_queue.scheduler.remove_job(self.job_id(key))
+        except JobLookupError:
+            return False
+        return True
+
+    async def _run(self, context: CallbackContext) -> None:
+        # Ошибки колбэка уходят в общий обработчик ошибок приложения
+        key, callback = context.job.data
+        if self._scheduled.get(key) is None:
+            self._scheduled.pop(key, None)
+        self.fired += 1
+        async with self._slots:
+            self.running += 1
+            try:
+                await callback()
+            finally:
+                self.running -= 1
+
+    def pending(self) -> List[Tuple[str, datetime.datetime]]:
+        if self.job_queue is None:
+            return []
+        return sorted(
+            (job.name, job.next_t) for job in self.job_queue.jobs(f"^{JOB_PREFIX}") if job.next_t is not None
+        )
+
+    def stats(self) -> Dict[str, int]:
+        return {'scheduled': len(self._scheduled), 'running': self.running, 'fired': self.fired}
+
+scheduler = PomodoroJobs()
+refresh = RefreshPolicy()
@@ -0,0 +1,218 @@
+import io
+import os
+import csv
+import sys
+import logging
+import sqlite3
+import threading
+from collections import deque
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import DB_PROFILE, DB_PROFILE_SAMPLES, DB_STATEMENT_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+_THIS_FILE = os.path.abspath(__file__)
+_SKIPPED_FRAMES = {'get_connection', 'wrapper', 'routed', '__exit__', '__enter__'}
+
+def normalize_sql(sql: str) -> str:
+    return ' '.join(sql.split())
+
+class StatementStats:
+    def __init__(self, statement_id: int, caller: str, sql: str, samples: int):
+        self.id = statement_id
+        self.caller = caller
+        self.sql = sql
+        self.calls = 0
+        self.total = 0.0
+        self.rows = 0
+        self.durations = deque(maxlen=samples)
+
+    def add(self, duration: float, rows: int) -> None:
+        self.calls += 1
+        self.total += duration
+        self.rows += rows
+        self.durations.append(duration)
+
+    def as_dict(self) -> Dict[str, Any]:
+        durations = sorted(self.durations)
+        p99 = durations[min(len(durations) - 1, int(len(durations) * 0.99))] if durations else 0.0
+        return {
+            'id': self.id,
+            'caller': self.caller,
+            'calls': self.calls,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total * 1000 / self.calls, 3) if self.calls else 0.0,
+            'p99_ms': round(p99 * 1000, 3),
+            'rows': self.rows,
+            'sql': self.sql,
+        }
+
+class QueryProfiler:
+    # Статистика выполненных запросов: каждый текст SQL получает номер до следующего reset(), статистика
+    # копится по паре (метод, запрос). Число разных текстов сверяется с размером кэша
+    # подготовленных выражений sqlite3: если их больше, выражения вытесняются и компилируются заново
+    def __init__(self, enabled: bool = DB_PROFILE, samples: int = DB_PROFILE_SAMPLES,
+                 cache_size: int = DB_STATEMENT_CACHE_SIZE):
+        self.enabled = enabled
+        self.samples = samples
+        self.cache_size = cache_size
+        self.statements: Dict[str, int] = {}
+        self.stats: Dict[Tuple[str, str], StatementStats] = {}
+        self._lock = threading.Lock()
+        self._cache_warned = False
+
+    def _caller(self) -> str:
+        frame = sys._getframe(2)
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename != _THIS_FILE and code.co_name not in _SKIPPED_FRAMES \
+                    and not code.co_filename.endswith('contextlib.py'):
+                return f"{os.path.splitext(os.path.basename(code.co_filename))[0]}.{code.co_name}"
+            frame = frame.f_back
+        return '?'
+
+    def key(self, sql: str) -> Tuple[str, str]:
+        return self._caller(), sql
+
+    def record(self, key: Tuple[str, str], duration: float, rows: int) -> None:
+        caller, sql = key
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                text = normalize_sql(sql)
+                statement_id = self.statements.setdefault(text, len(self.statements) + 1)
+                if len(self.statements) > self.cache_size and not self._cache_warned:
+                    self._cache_warned = True
+                    logger.warning(
+                        f"Разных SQL-запросов больше, чем размер кэша выражений ({self.cache_size}): "
+                        f"увеличьте DB_STATEMENT_CACHE_SIZE"
+                    )
+                stats = self.stats[key] = StatementStats(statement_id, caller, text, self.samples)
+            stats.add(duration, rows)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+            self.statements.clear()
+            self._cache_warned = False
+
+    def report(self, limit: Optional[int] = None, order_by: str = 'total_ms') -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = [stats.as_dict() for stats in self.stats.values()]
+        rows.sort(key=lambda row: row[order_by], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def format_report(self, limit: int = 10, sql_width: int = 70) -> str:
+        rows = self.report(limit)
+        if not rows:
+            return 'Статистика запросов пуста' + ('' if self.enabled else ' (профилирование выключено)')
+        lines = [f"{'#':>3} {'вызовов':>8} {'всего мс':>10} {'сред мс':>8} {'p99 мс':>8} {'строк':>8}  метод / запрос"]
+        for row in rows:
+            lines.append(
+                f"{row['id']:>3} {row['calls']:>8} {row['total_ms']:>10.1f} {row['mean_ms']:>8.3f} "
+                f"{row['p99_ms']:>8.3f} {row['rows']:>8}  {row['caller']}"
+            )
+            lines.append(f"{'':>50}{row['sql'][:sql_width]}")
+        lines.append(f"Разных запросов: {len(self.statements)} (кэш выражений: {self.cache_size})")
+        return '\n'.join(lines)
+
+    def to_csv(self) -> str:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=['id', 'caller', 'calls', 'total_ms', 'mean_ms', 'p99_ms', 'rows', 'sql'])
+        writer.writeheader()
+        writer.writerows(self.report())
+        return buffer.getvalue()
+
+    def export(self, path: str) -> str:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(self.to_csv())
+        return path
+
+profiler = QueryProfiler()
+
+class ProfilingCursor(sqlite3.Cursor):
+    # Время вызова = execute + все выборки строк; вызов закрывается на следующем execute,
+    # на исчерпании результата, close или при удалении курсора
+    _call: Optional[list] = None
+
+    def _finish(self) -> None:
+        call, self._call = self._call, None
+        if call is not None:
+            key, duration, rows = call
+            profiler.record(key, duration, rows if rows or self.rowcount < 0 else self.rowcount)
+
+    def execute(self, sql: str, parameters: Any = ()) -> 'ProfilingCursor':
+        self._finish()
+        key = profiler.key(sql)
+        started = perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._call = [key, perf_counter() - started, 0]
+
+    def executemany(self, sql: str, parameters: Any) -> 'ProfilingCursor':
+        self._finish()
+        key = profiler.key(sql)
+        started = perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            self._call = [key, perf_counter() - started, 0]
+            self._finish()
+
+    def _fetched(self, started: float, rows: int, done: bool) -> None:
+        if self._call is not None:
+            self._call[1] += perf_counter() - started
+            self._call[2] += rows
+            if done:
+                self._finish()
+
+    def fetchone(self) -> Any:
+        started = perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> list:
+        size = self.arraysize if size is None else size
+        started = perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self) -> list:
+        started = perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self) -> Any:
+        started = perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self) -> None:
+        self._finish()
+        super().close()
+
+    def __del__(self) -> None:
+        self._finish()
+
+class ProfilingConnection(sqlite3.Connection):
+    # Курсор с замерами выдается только при включенном профилировании: без него накладных расходов
+    # на строку нет. Connection.execute в CPython не вызывает переопределенный cursor(), поэтому он тоже здесь
+    def cursor(self, factory: Any = None) -> sqlite3.Cursor:
+        return super().cursor(factory or (ProfilingCursor if profiler.enabled else sqlite3.Cursor))
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, parameters: Any) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, parameters)
@@ -1,35 +1,53 @@
 import datetime
-from typing import Dict, Any, List, Optional
-from database import db
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from cache import UserDataCache
+from config import CACHE_TTL, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES
+from storage_backend import StorageBackend, create_backend
+
+cache = UserDataCache(CACHE_TTL, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES)
+db: StorageBackend = create_backend()
+
+def set_backend(backend: StorageBackend) -> StorageBackend:
+    # Подмена хранилища (бенчмарки, нагрузочные прогоны); возвращает предыдущее
+    global db
+    previous, db = db, backend
+    cache.clear()
+    return previous
 
 def ensure_user(user_id: int) -> None:
     db.ensure_user_exists(user_id)
 
 def get_user_data(user_id: int) -> Dict[str, Any]:
-    return db.get_user_data(user_id)
+    return cache.get_or_load('user_data', user_id, lambda: db.get_user_data(user_id))
 
 def update_water(user_id: int, amount: int) -> None:
     today = datetime.date.today().isoformat()
     db.update_water_intake(user_id, today, amount)
+    cache.invalidate(user_id, 'user_data', 'streaks', 'physical_overview')
 
 def update_sleep(user_id: int, hours: float, quality: int) -> None:
     today = datetime.date.today().isoformat()
     db.update_sleep_data(user_id, today, hours, quality)
+    cache.invalidate(user_id, 'user_data', 'streaks', 'physical_overview')
 
 def update_steps(user_id: int, steps: int, workout_minutes: int) -> None:
     today = datetime.date.today().isoformat()
     db.update_activity_data(user_id, today, steps, workout_minutes)
+    cache.invalidate(user_id, 'user_data', 'streaks', 'physical_overview')
 
 def set_mood(user_id: int, mood: str, emoji: str) -> None:
     today = datetime.date.today().isoformat()
     db.update_mood_data(user_id, today, mood, emoji)
+    cache.invalidate(user_id, 'user_data')
 
 def add_pomodoro_session(user_id: int, duration: int, session_type: str, completed: bool, task_description: str) -> int:
     today = datetime.date.today().isoformat()
-    return db.save_pomodoro_session(user_id, duration, session_type, completed, task_description, today)
+    session_id = db.save_pomodoro_session(user_id, duration, session_type, completed, task_description, today)
+    cache.invalidate(user_id, 'user_data', 'pomodoro_stats')
+    return session_id
 
 def get_pomodoro_stats(user_id: int) -> Dict[str, Any]:
-    return db.get_pomodoro_stats(user_id)
+    return cache.get_or_load('pomodoro_stats', user_id, lambda: db.get_pomodoro_stats(user_id))
 
 def add_habit(user_id: int, name: str, description: str, frequency: str) -> int:
     return db.create_habit(user_id, name, description, frequency)
@@ -56,9 +74,13 @@ def update_goal_progress(user_id: int, goal_id: int, progress: int) -> None:
 def get_achievements(user_id: int, limit: int = 20) -> List[str]:
     return db.get_user_achievements(user_id, limit)
 
-def add_achievement(user_id: int, achievement: str) -> None:
+def get_achievements_page(user_id: int, limit: int = 10, category: Optional[str] = None,
+                          after: Optional[Tuple[str, int]] = None) -> Dict[str, Any]:
+    return db.get_user_achievements_page(user_id, limit, category, after)
+
+def add_achievement(user_id: int, code: str) -> None:
     today = datetime.date.today().isoformat()
-    db.add_user_achievement(user_id, achievement, today)
+    db.add_user_achievement(user_id, code, today)
 
 def get_water_history(user_id: int, days: int = 7) -> List[Dict[str, Any]]:
     return db.get_water_history(user_id, days)
@@ -72,6 +94,15 @@ def get_activity_history(user_id: int, days: int = 7) -> List[Dict[str, Any]]:
 def get_mood_history(user_id: int, days: int = 7) -> List[Dict[str, Any]]:
     return db.get_mood_history(user_id, days)
 
+def get_daily_rollup(user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+    return db.get_daily_rollup(user_id, days)
+
+def get_weekly_rollup(user_id: int, weeks: int = 4) -> List[Dict[str, Any]]:
+    return db.get_weekly_rollup(user_id, weeks)
+
+def get_monthly_rollup(user_id: int, months: int = 6) -> List[Dict[str, Any]]:
+    return db.get_monthly_rollup(user_id, months)
+
 def get_mood_stats(user_id: int) -> Dict[str, Any]:
     return db.get_mood_statistics(user_id)
 
@@ -82,7 +113,17 @@ def get_all_user_data(user_id: int) -> Dict[str, Any]:
     return db.get_comprehensive_user_data(user_id)
 
 def get_streak_data(user_id: int) -> Dict[str, Any]:
-    return db.get_user_streaks(user_id)
+    return cache.get_or_load('streaks', user_id, lambda: db.get_user_streaks(user_id))
+
+# Массовые чтения идут мимо кэша: проход по всем пользователям вытеснил бы из него активных
+def iter_user_ids() -> Iterator[int]:
+    return db.iter_user_ids()
+
+def get_user_data_many(user_ids: Iterable[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    return db.get_user_data_many(user_ids)
+
+def get_streak_data_many(user_ids: Iterable[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    return db.get_user_streaks_many(user_ids)
 
 def add_workout(user_id: int, workout_type: str, duration: int, calories: int) -> None:
     today = datetime.date.today().isoformat()
@@ -98,6 +139,9 @@ def add_sos_usage(user_id: int) -> None:
 def get_mood_patterns(user_id: int) -> Dict[str, Any]:
     return db.get_mood_patterns(user_id)
 
+def get_user_trends(user_id: int, days: Optional[int] = 365) -> Dict[str, Any]:
+    return db.get_user_trends(user_id, days)
+
 def get_mood_data(user_id: int) -> Dict[str, Any]:
     return db.get_current_mood_data(user_id)
 
@@ -105,7 +149,7 @@ def get_sleep_data(user_id: int) -> Dict[str, Any]:
     return db.get_current_sleep_data(user_id)
 
 def get_physical_overview(user_id: int) -> Dict[str, Any]:
-    return db.get_physical_health_overview(user_id)
+    return cache.get_or_load('physical_overview', user_id, lambda: db.get_physical_health_overview(user_id))
 
 def add_mood_note(user_id: int, note: str) -> None:
     today = datetime.date.today().isoformat()
@@ -127,4 +171,25 @@ def delete_habit(user_id: int, habit_id: int) -> None:
     db.delete_user_habit(user_id, habit_id)
 
 def save_pomodoro_session(user_id: int, duration: int, session_type: str, completed: bool, task_description: str, date: str) -> int:
-    return db.save_pomodoro_session(user_id, duration, session_type, completed, task_description, date)
\ No newline at end of file
+    session_id = db.save_pomodoro_session(user_id, duration, session_type, completed, task_description, date)
+    cache.invalidate(user_id, 'user_data', 'pomodoro_stats')
+    return session_id
+
+def save_active_pomodoro(user_id: int, state: str, deadline: Optional[float], paused_remaining: Optional[float],
+                         task: str, chat_id: int, message_id: int) -> None:
+    db.save_active_pomodoro(user_id, state, deadline, paused_remaining, task, chat_id, message_id)
+
+def delete_active_pomodoro(user_id: int) -> None:
+    db.delete_active_pomodoro(user_id)
+
+def get_active_pomodoros() -> List[Dict[str, Any]]:
+    return db.get_active_pomodoros()
+
+def complete_overdue_pomodoros(now: float, work_seconds: int, break_seconds: int) -> List[Dict[str, Any]]:
+    rows = db.complete_overdue_pomodoros(now, work_seconds, break_seconds)
+    for row in rows:
+        cache.invalidate(row['user_id'], 'user_data', 'pomodoro_stats')
+    return rows
+
+def get_user_overview(user_id: int) -> Dict[str, Any]:
+    return db.get_user_overview(user_id)
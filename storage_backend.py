@@ -0,0 +1,191 @@
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Iterator, List, Optional, Protocol, Tuple, runtime_checkable
+
+from config import STORAGE_BACKEND
+
+if TYPE_CHECKING:
+    from database import UserSnapshot
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    # Публичный API хранилища, на который опирается storage.py.
+    # Реализации: DatabaseManager / ShardedDatabaseManager (SQLite) и MemoryBackend (в памяти процесса)
+    def init_database(self) -> List[int]:
+        ...
+    
+    def flush_pending_writes(self) -> int:
+        ...
+    
+    def close_connections(self) -> None:
+        ...
+    
+    def ensure_user_exists(self, user_id: int) -> None:
+        ...
+    
+    def get_user_snapshot(self, user_id: int, achievements_limit: int = 5) -> 'UserSnapshot':
+        ...
+    
+    def get_user_snapshots_many(self, user_ids: Iterable[int], achievements_limit: int = 5) -> Iterator['UserSnapshot']:
+        ...
+    
+    def get_user_data(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def get_user_data_many(self, user_ids: Iterable[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        ...
+    
+    def iter_user_ids(self) -> Iterator[int]:
+        ...
+    
+    def get_comprehensive_user_data(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def get_user_overview(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def update_water_intake(self, user_id: int, date: str, amount: int) -> None:
+        ...
+    
+    def update_sleep_data(self, user_id: int, date: str, hours: float, quality: int) -> None:
+        ...
+    
+    def update_activity_data(self, user_id: int, date: str, steps: int, workout_minutes: int) -> None:
+        ...
+    
+    def update_mood_data(self, user_id: int, date: str, mood: str, emoji: str) -> None:
+        ...
+    
+    def save_pomodoro_session(self, user_id: int, duration: int, session_type: str, completed: bool,
+                              task_description: str, date: str) -> Optional[int]:
+        ...
+    
+    def save_active_pomodoro(self, user_id: int, state: str, deadline: Optional[float], paused_remaining: Optional[float],
+                             task: str, chat_id: int, message_id: int) -> None:
+        ...
+    
+    def delete_active_pomodoro(self, user_id: int) -> None:
+        ...
+    
+    def get_active_pomodoros(self) -> List[Dict[str, Any]]:
+        ...
+    
+    def complete_overdue_pomodoros(self, now: float, work_seconds: int, break_seconds: int) -> List[Dict[str, Any]]:
+        ...
+    
+    def get_pomodoro_stats(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def get_pomodoro_history(self, user_id: int, days: int = 30) -> List[Dict[str, Any]]:
+        ...
+    
+    def create_habit(self, user_id: int, name: str, description: str, frequency: str) -> int:
+        ...
+    
+    def get_user_habits(self, user_id: int) -> List[Dict[str, Any]]:
+        ...
+    
+    def update_habit_status(self, user_id: int, habit_id: int, date: str, completed: bool) -> None:
+        ...
+    
+    def get_habit_statistics(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def update_habit_info(self, user_id: int, habit_id: int, **kwargs) -> None:
+        ...
+    
+    def delete_user_habit(self, user_id: int, habit_id: int) -> None:
+        ...
+    
+    def create_goal(self, user_id: int, name: str, description: str, deadline: str) -> int:
+        ...
+    
+    def get_user_goals(self, user_id: int) -> List[Dict[str, Any]]:
+        ...
+    
+    def update_goal_progress(self, user_id: int, goal_id: int, progress: int) -> None:
+        ...
+    
+    def get_goal_progress(self, user_id: int, goal_id: int) -> int:
+        ...
+    
+    def get_user_achievements(self, user_id: int, limit: int = 20) -> List[str]:
+        ...
+    
+    def get_user_achievements_page(self, user_id: int, limit: int = 10, category: Optional[str] = None,
+                                   after: Optional[Tuple[str, int]] = None) -> Dict[str, Any]:
+        ...
+    
+    def add_user_achievement(self, user_id: int, code: str, date: str) -> None:
+        ...
+    
+    def get_daily_rollup(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        ...
+    
+    def get_weekly_rollup(self, user_id: int, weeks: int = 4) -> List[Dict[str, Any]]:
+        ...
+    
+    def get_monthly_rollup(self, user_id: int, months: int = 6) -> List[Dict[str, Any]]:
+        ...
+    
+    def get_water_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        ...
+    
+    def get_sleep_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        ...
+    
+    def get_activity_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        ...
+    
+    def get_mood_history(self, user_id: int, days: int = 7) -> List[Dict[str, Any]]:
+        ...
+    
+    def get_mood_statistics(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def get_user_streaks(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def get_user_streaks_many(self, user_ids: Iterable[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        ...
+    
+    def add_workout_session(self, user_id: int, date: str, workout_type: str, duration: int, calories: int) -> None:
+        ...
+    
+    def get_workout_statistics(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def record_sos_usage(self, user_id: int, date: str) -> None:
+        ...
+    
+    def get_mood_patterns(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def get_user_trends(self, user_id: int, days: Optional[int] = 365, window: int = 7) -> Dict[str, Any]:
+        ...
+    
+    def get_current_mood_data(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def get_current_sleep_data(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def get_physical_health_overview(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def add_mood_note(self, user_id: int, date: str, note: str) -> None:
+        ...
+    
+    def get_meditation_statistics(self, user_id: int) -> Dict[str, Any]:
+        ...
+    
+    def get_social_overview(self, user_id: int) -> Dict[str, Any]:
+        ...
+
+def create_backend(name: str = STORAGE_BACKEND) -> StorageBackend:
+    # Импорт внутри, чтобы выбранный в памяти бэкенд не создавал файл базы
+    if name == 'sqlite':
+        from database import create_database
+        return create_database()
+    if name == 'memory':
+        from memory_backend import MemoryBackend
+        return MemoryBackend()
+    raise ValueError(f"Неизвестный бэкенд хранилища: {name}")
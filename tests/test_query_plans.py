@@ -0,0 +1,77 @@
+import os
+import re
+import sys
+import inspect
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+
+USER_ID = 1
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+TABLE_REF = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.I)
+# Читаются целиком намеренно: активные Pomodoro загружаются один раз при старте
+FULL_READ_TABLES = {'active_pomodoros'}
+
+def seed(db: DatabaseManager) -> None:
+    today = datetime.date.today().isoformat()
+    db.ensure_user_exists(USER_ID)
+    db.update_water_intake(USER_ID, today, 8)
+    db.update_sleep_data(USER_ID, today, 7.5, 4)
+    db.update_activity_data(USER_ID, today, 11000, 20)
+    db.update_mood_data(USER_ID, today, 'Хорошо', '🙂')
+    db.add_mood_note(USER_ID, today, 'заметка')
+    db.save_pomodoro_session(USER_ID, 25, 'work', True, 'задача', today)
+    db.add_user_achievement(USER_ID, 'pomodoro', today)
+    db.add_workout_session(USER_ID, today, 'Quick workout', 15, 100)
+    db.record_sos_usage(USER_ID, today)
+    habit_id = db.create_habit(USER_ID, 'Чтение', '20 минут', 'daily')
+    db.update_habit_status(USER_ID, habit_id, today, True)
+    db.update_habit_info(USER_ID, habit_id, name='Чтение книг')
+    goal_id = db.create_goal(USER_ID, 'Цель', 'описание', today)
+    db.update_goal_progress(USER_ID, goal_id, 50)
+    db.save_active_pomodoro(USER_ID, 'work', 0.0, None, 'задача', USER_ID, 1)
+    db.complete_overdue_pomodoros(1.0, 25 * 60, 5 * 60)
+
+def call_read_methods(db: DatabaseManager) -> None:
+    for name, method in inspect.getmembers(db, inspect.ismethod):
+        if not name.startswith('get_') or name == 'get_connection':
+            continue
+        args = []
+        for param in list(inspect.signature(method).parameters.values()):
+            if param.default is not inspect.Parameter.empty or param.kind != param.POSITIONAL_OR_KEYWORD:
+                break
+            args.append([USER_ID] if param.name == 'user_ids' else USER_ID)
+        result = method(*args)
+        if inspect.isgenerator(result):
+            list(result)
+
+def test_no_full_table_scans(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'plans.db'), pool_size=1)
+    statements = []
+    
+    with db.get_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        seed(db)
+        call_read_methods(db)
+        conn.set_trace_callback(None)
+        
+        tables = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        failures = []
+        checked = 0
+        for sql in dict.fromkeys(s.strip() for s in statements):
+            if not re.match(r'(SELECT|WITH|UPDATE|DELETE)\b', sql, re.I):
+                continue
+            checked += 1
+            aliases = {alias or table: table for table, alias in TABLE_REF.findall(sql)}
+            for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}'):
+                match = FULL_SCAN.match(row['detail'])
+                table = aliases.get(match.group(1), match.group(1)) if match else None
+                if table in tables and table not in FULL_READ_TABLES:
+                    failures.append(f"{row['detail']}: {' '.join(sql.split())}")
+    
+    db.close_connections()
+    
+    assert checked > 0
+    assert not failures, '\n'.join(failures)
@@ -0,0 +1,73 @@
+import os
+import sys
+import datetime
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DatabaseManager
+
+THREADS = 16
+INCREMENTS_PER_THREAD = 200
+USERS = 3
+TODAY = datetime.date.today().isoformat()
+
+def make_db(tmp_path, pool_size: int = 1) -> DatabaseManager:
+    db = DatabaseManager(str(tmp_path / 'upserts.db'), pool_size=pool_size, write_behind=False)
+    for user_id in range(USERS):
+        db.ensure_user_exists(user_id)
+    return db
+
+def row(db: DatabaseManager, table: str, user_id: int):
+    with db.get_connection() as conn:
+        return conn.execute(f'SELECT * FROM {table} WHERE user_id = ? AND date = ?', (user_id, TODAY)).fetchone()
+
+def test_concurrent_water_increments_are_not_lost(tmp_path):
+    db = make_db(tmp_path, pool_size=THREADS)
+    errors = []
+    barrier = threading.Barrier(THREADS)
+    
+    def worker(index: int) -> None:
+        barrier.wait()
+        for step in range(INCREMENTS_PER_THREAD):
+            try:
+                db.update_water_intake((index + step) % USERS, TODAY, 1)
+            except Exception as e:
+                errors.append(e)
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    with db.get_connection() as conn:
+        amounts = conn.execute('SELECT COUNT(*), SUM(amount) FROM water_tracking WHERE date = ?', (TODAY,)).fetchone()
+    db.close_connections()
+    
+    assert not errors
+    assert tuple(amounts) == (USERS, THREADS * INCREMENTS_PER_THREAD)
+
+def test_sleep_upsert_keeps_row_id(tmp_path):
+    db = make_db(tmp_path)
+    db.update_sleep_data(0, TODAY, 6.0, 2)
+    first = row(db, 'sleep_tracking', 0)
+    db.update_sleep_data(0, TODAY, 8.0, 4)
+    second = row(db, 'sleep_tracking', 0)
+    db.close_connections()
+    
+    assert second['id'] == first['id']
+    assert (second['hours'], second['quality'], second['goal_reached']) == (8.0, 4, 1)
+
+def test_mood_upsert_keeps_row_id_and_note(tmp_path):
+    db = make_db(tmp_path)
+    db.update_mood_data(0, TODAY, 'neutral', '😐')
+    with db.get_connection() as conn:
+        conn.execute("UPDATE mood_tracking SET note = 'заметка' WHERE user_id = 0 AND date = ?", (TODAY,))
+    first = row(db, 'mood_tracking', 0)
+    db.update_mood_data(0, TODAY, 'happy', '😊')
+    second = row(db, 'mood_tracking', 0)
+    db.close_connections()
+    
+    assert second['id'] == first['id']
+    assert (second['mood'], second['emoji'], second['note']) == ('happy', '😊', 'заметка')
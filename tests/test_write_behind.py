@@ -0,0 +1,79 @@
+import os
+import sys
+import sqlite3
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from write_behind import WriteBehindQueue
+
+class Store:
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.conn.execute('CREATE TABLE events (id INTEGER PRIMARY KEY, value TEXT NOT NULL)')
+        self.busy = False
+
+    @contextmanager
+    def transaction(self):
+        if self.busy:
+            raise sqlite3.OperationalError('database is locked')
+        with self.conn:
+            yield self.conn
+
+    def insert(self, event_id, value):
+        self.conn.execute('INSERT INTO events (id, value) VALUES (?, ?)', (event_id, value))
+
+    def rows(self):
+        return self.conn.execute('SELECT id, value FROM events ORDER BY id').fetchall()
+
+def make_queue(store):
+    # Интервал больше времени теста: сбросы только явные
+    return WriteBehindQueue(store.transaction, interval_ms=60000, max_events=1000)
+
+def test_failing_event_does_not_drop_batch():
+    store = Store()
+    queue = make_queue(store)
+    queue.submit(1, store.insert, (1, 'a'))
+    queue.submit(2, store.insert, (2, None))
+    queue.submit(3, store.insert, (3, 'c'))
+
+    assert queue.flush() == 2
+    assert store.rows() == [(1, 'a'), (3, 'c')]
+    stats = queue.stats()
+    assert stats['dropped'] == 1
+    assert stats['flushed_events'] == 2
+    assert stats['pending'] == 0
+    assert not queue.has_pending(1)
+    queue.close()
+
+def test_busy_database_requeues_batch():
+    store = Store()
+    queue = make_queue(store)
+    queue.submit(1, store.insert, (1, 'a'))
+    queue.submit(2, store.insert, (2, 'b'))
+
+    store.busy = True
+    assert queue.flush() == 0
+    assert queue.stats()['pending'] == 2
+    assert queue.has_pending(1)
+
+    store.busy = False
+    assert queue.flush() == 2
+    assert store.rows() == [(1, 'a'), (2, 'b')]
+    assert queue.stats()['dropped'] == 0
+    queue.close()
+
+def test_permanent_operational_error_is_not_retried_forever():
+    store = Store()
+    queue = make_queue(store)
+    store.conn.execute('DROP TABLE events')
+    queue.submit(1, store.insert, (1, 'a'))
+    queue.submit(2, store.insert, (2, 'b'))
+
+    assert queue.flush() == 0
+    stats = queue.stats()
+    assert stats['dropped'] == 2
+    assert stats['pending'] == 0
+    assert not queue.has_pending(1)
+    assert queue.flush() == 0
+    queue.close()
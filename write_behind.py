@@ -0,0 +1,141 @@
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+def _is_busy(error: Exception) -> bool:
+    # Временная ошибка: база занята другим писателем. Остальные OperationalError (нет таблицы,
+    # ошибка диска) при повторе не исчезнут
+    return isinstance(error, sqlite3.OperationalError) and any(
+        word in str(error).lower() for word in ('locked', 'busy')
+    )
+
+class WriteBehindQueue:
+    # Отложенная запись: события копятся в памяти и сбрасываются одной транзакцией.
+    # Повторные события с одинаковым ключом сливаются через merge (или последнее побеждает).
+    # interval_ms - верхняя граница времени, которое подтвержденная запись живет только в памяти.
+    def __init__(self, transaction: Callable[[], Any], interval_ms: int = 200, max_events: int = 100):
+        self.transaction = transaction
+        self.interval = interval_ms / 1000
+        self.max_events = max_events
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: 'OrderedDict[Hashable, Tuple[Callable, tuple, Optional[Callable]]]' = OrderedDict()
+        self._users: Set[int] = set()
+        self._inflight: Set[int] = set()
+        self._sequence = count()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._stats = {'events': 0, 'coalesced': 0, 'flushes': 0, 'flushed_events': 0, 'errors': 0, 'dropped': 0}
+        self._thread = threading.Thread(target=self._run, name='db-write-behind', daemon=True)
+        self._thread.start()
+
+    def submit(self, user_id: int, write: Callable, args: tuple, key: Optional[Hashable] = None,
+               merge: Optional[Callable[[tuple, tuple], tuple]] = None) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Очередь отложенной записи закрыта')
+            self._stats['events'] += 1
+            if key is None:
+                key = ('event', next(self._sequence))
+            elif key in self._pending:
+                _, previous, _ = self._pending[key]
+                args = merge(previous, args) if merge else args
+                self._stats['coalesced'] += 1
+            self._pending[key] = (write, args, merge)
+            self._users.add(user_id)
+            full = len(self._pending) >= self.max_events
+        if full:
+            self._wakeup.set()
+
+    def has_pending(self, user_id: int) -> bool:
+        # Пока пакет пишется, его пользователи тоже считаются ожидающими: flush() дождется коммита
+        return user_id in self._users or user_id in self._inflight
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, OrderedDict()
+                users, self._users = self._users, set()
+            if not batch:
+                return 0
+            self._inflight = users
+            try:
+                with self.transaction():
+                    for write, args, _ in batch.values():
+                        write(*args)
+            except Exception as e:
+                if _is_busy(e):
+                    # База занята - возвращаем события в очередь до следующего сброса
+                    logger.warning(f"Сброс отложенных записей не удался, повтор: {e}")
+                    self._stats['errors'] += 1
+                    self._requeue(batch, users)
+                    return 0
+                # Пакет отклонен: пишем по одному, отбрасываются только ошибочные события
+                logger.warning(f"Пакет отложенных записей отклонен, запись по одной: {e}")
+                self._stats['errors'] += 1
+                return self._flush_each(batch, users)
+            finally:
+                self._inflight = set()
+            self._stats['flushes'] += 1
+            self._stats['flushed_events'] += len(batch)
+            return len(batch)
+
+    def _flush_each(self, batch: 'OrderedDict', users: Set[int]) -> int:
+        written = 0
+        keys = list(batch)
+        for index, key in enumerate(keys):
+            write, args, _ = batch[key]
+            try:
+                with self.transaction():
+                    write(*args)
+            except Exception as e:
+                if _is_busy(e):
+                    logger.warning(f"Сброс отложенных записей не удался, повтор: {e}")
+                    self._requeue(OrderedDict((key, batch[key]) for key in keys[index:]), users)
+                    break
+                logger.error(f"Отброшена отложенная запись {key}: {e}")
+                self._stats['dropped'] += 1
+            else:
+                written += 1
+        self._stats['flushes'] += 1
+        self._stats['flushed_events'] += written
+        return written
+
+    def _requeue(self, batch: 'OrderedDict', users: Set[int]) -> None:
+        with self._lock:
+            for key, (write, args, merge) in self._pending.items():
+                if key in batch:
+                    _, failed, _ = batch[key]
+                    args = merge(failed, args) if merge else args
+                batch[key] = (write, args, merge)
+            self._pending = batch
+            self._users |= users
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._closed:
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Ошибка фонового сброса отложенных записей: {e}")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))